@@ -0,0 +1,171 @@
+# product_categories.py is the category cube behind the Category Analysis tab of streamlit_app.py.
+# Every '|'-delimited category path is parsed once into a tree. Each node keeps, per rating value,
+# the product count, the sums and a histogram sketch of the measures over its whole subtree, so
+# a drill-down or a rating/category filter is answered by adding up rollups, not by a rescan.
+# Kane Williams 2024-Dec-15.
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ['rating', 'rating_count', 'discount_percentage', 'actual_price']
+SKETCH_BINS = 64
+
+# Display names, matching product_charts.category_stats
+COLUMN_NAMES = {
+    'rating': 'Avg Rating',
+    'rating_count': 'Avg Review Count',
+    'discount_percentage': 'Avg Discount %',
+    'actual_price': 'Avg Price',
+}
+
+# Skewed measures are sketched on a log scale
+LOG_MEASURES = {'rating_count', 'actual_price'}
+
+
+def to_sketch_scale(measure, values):
+    return np.log1p(np.maximum(values, 0)) if measure in LOG_MEASURES else values
+
+
+def from_sketch_scale(measure, values):
+    return np.expm1(values) if measure in LOG_MEASURES else values
+
+
+class CategoryCube:
+    """Category tree with per-node, per-rating rollups of MEASURES.
+
+    counts[node, r], sums/mins/maxs[node, r, m] and sketches[node, r, m, bin] cover every product
+    in the node's subtree whose rating is rating_values[r].
+    """
+
+    def __init__(self, nodes, rating_values, edges, counts, sums, mins, maxs, sketches):
+        self.nodes = nodes  # DataFrame indexed by node id: path, name, parent (-1 at the top), depth
+        self.rating_values = rating_values
+        self.edges = edges  # per measure, the sketch bin edges on its sketch scale
+        self.counts, self.sums, self.mins, self.maxs, self.sketches = counts, sums, mins, maxs, sketches
+        self.node_of_path = dict(zip(nodes['path'], nodes.index))
+        self.children_of = nodes.groupby('parent').groups
+
+    @classmethod
+    def build(cls, df, template=None):
+        """Cube over the products in df; with a template cube, reuse its tree, ratings and bins"""
+        df = df[np.isfinite(df['rating'].to_numpy(dtype=float)) & df['category'].notna().to_numpy()]
+        path_codes, paths = pd.factorize(df['category'])
+
+        if template is None:
+            nodes = tree(paths)
+            rating_values = np.unique(df['rating'].to_numpy(dtype=np.result_type(df['rating'].dtype, np.float32)))
+            edges = {}
+            for measure in MEASURES:
+                scaled = to_sketch_scale(measure, df[measure].to_numpy(dtype=float))
+                scaled = scaled[np.isfinite(scaled)]
+                low, high = (scaled.min(), scaled.max()) if len(scaled) else (0.0, 1.0)
+                edges[measure] = np.linspace(low, high if high > low else low + 1, SKETCH_BINS + 1)
+        else:
+            nodes, rating_values, edges = template.nodes, template.rating_values, template.edges
+        node_of_path = dict(zip(nodes['path'], nodes.index))
+
+        n_nodes, n_ratings, n_measures = len(nodes), len(rating_values), len(MEASURES)
+        node = np.array([node_of_path[path] for path in paths], dtype=np.int64)[path_codes]
+        rating = np.searchsorted(rating_values, df['rating'].to_numpy(dtype=float))
+        cell = node * n_ratings + rating
+
+        n_cells = n_nodes * n_ratings
+        counts = np.bincount(cell, minlength=n_cells).reshape(n_nodes, n_ratings)
+        sums = np.zeros((n_nodes, n_ratings, n_measures))
+        mins = np.full((n_nodes, n_ratings, n_measures), np.inf)
+        maxs = np.full((n_nodes, n_ratings, n_measures), -np.inf)
+        sketches = np.zeros((n_nodes, n_ratings, n_measures, SKETCH_BINS), dtype=np.int32)
+        for m, measure in enumerate(MEASURES):
+            values = df[measure].to_numpy(dtype=float)
+            present = np.isfinite(values)
+            sums[:, :, m] = np.bincount(cell[present], weights=values[present], minlength=n_cells).reshape(
+                n_nodes, n_ratings)
+            np.minimum.at(mins[:, :, m].reshape(-1), cell[present], values[present])
+            np.maximum.at(maxs[:, :, m].reshape(-1), cell[present], values[present])
+            bins = np.clip(np.searchsorted(edges[measure], to_sketch_scale(measure, values[present]), side='right') - 1,
+                           0, SKETCH_BINS - 1)
+            sketches[:, :, m, :] = np.bincount(cell[present] * SKETCH_BINS + bins,
+                                               minlength=n_cells * SKETCH_BINS).reshape(n_nodes, n_ratings, SKETCH_BINS)
+
+        # Roll each level up into its parents, deepest first
+        for depth in range(int(nodes['depth'].max()) if n_nodes else 0, 0, -1):
+            level = nodes.index[nodes['depth'] == depth].to_numpy()
+            parents = nodes['parent'].to_numpy()[level]
+            np.add.at(counts, parents, counts[level])
+            np.add.at(sums, parents, sums[level])
+            np.minimum.at(mins, parents, mins[level])
+            np.maximum.at(maxs, parents, maxs[level])
+            np.add.at(sketches, parents, sketches[level])
+        return cls(nodes, rating_values, edges, counts, sums, mins, maxs, sketches)
+
+    def children(self, node=None):
+        """Ids of the nodes directly below node (None for the top-level categories)"""
+        return np.asarray(self.children_of.get(-1 if node is None else node, []), dtype=np.int64)
+
+    def rating_slice(self, rating_range=None):
+        if rating_range is None:
+            return slice(None)
+        # Bounds in the ratings' own dtype, so a float32 rating of 4.3 is within (4.0, 4.3)
+        low, high = (self.rating_values.dtype.type(bound) for bound in rating_range)
+        lo = np.searchsorted(self.rating_values, low, side='left')
+        hi = np.searchsorted(self.rating_values, high, side='right')
+        return slice(lo, hi)
+
+    def quantile(self, sketches, measure, q, low, high):
+        """Quantile q of a measure from (nodes, bins) sketches, interpolated within the bin and
+        kept within each node's [low, high]"""
+        edges = self.edges[measure]
+        cumulative = np.cumsum(sketches, axis=1)
+        totals = cumulative[:, -1]
+        target = q * totals
+        bins = np.minimum((cumulative < target[:, None]).sum(axis=1), SKETCH_BINS - 1)
+        rows = np.arange(len(sketches))
+        before = np.where(bins > 0, cumulative[rows, np.maximum(bins - 1, 0)], 0)
+        in_bin = sketches[rows, bins]
+        fraction = np.where(in_bin > 0, (target - before) / np.maximum(in_bin, 1), 0)
+        scaled = edges[bins] + fraction * (edges[bins + 1] - edges[bins])
+        value = np.clip(from_sketch_scale(measure, scaled), low, high)
+        return np.where(totals > 0, value, np.nan)
+
+    def stats(self, node_ids, rating_range=None):
+        """Products, means and medians of MEASURES for each node, within the rating range"""
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        ratings = self.rating_slice(rating_range)
+        counts = self.counts[node_ids, ratings].sum(axis=1)
+        sums = self.sums[node_ids, ratings].sum(axis=1)
+        sketches = self.sketches[node_ids, ratings].sum(axis=1)
+        mins = self.mins[node_ids, ratings].min(axis=1)
+        maxs = self.maxs[node_ids, ratings].max(axis=1)
+
+        stats = pd.DataFrame({'Products': counts}, index=pd.Index(self.nodes['name'].to_numpy()[node_ids],
+                                                                   name='category'))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for m, measure in enumerate(MEASURES):
+                stats[COLUMN_NAMES[measure]] = (sums[:, m] / counts).round(2)
+        for measure, column, decimals in [('actual_price', 'Median Price', 0),
+                                          ('discount_percentage', 'Median Discount %', 1)]:
+            m = MEASURES.index(measure)
+            stats[column] = self.quantile(sketches[:, m], measure, 0.5, mins[:, m], maxs[:, m]).round(decimals)
+        return stats[stats['Products'] > 0].sort_index()
+
+    def breakdown(self, node=None, rating_range=None, top_categories=None):
+        """stats() of the children of node; at the top, only the top_categories given"""
+        children = self.children(node)
+        if node is None and top_categories is not None:
+            children = children[np.isin(self.nodes['name'].to_numpy()[children], list(top_categories))]
+        return self.stats(children, rating_range)
+
+
+def tree(paths):
+    """Nodes for every prefix of the '|'-delimited paths: path, name, parent id and depth"""
+    ids, rows = {}, []
+    for path in paths:
+        parts = path.split('|')
+        parent = -1
+        for depth in range(len(parts)):
+            prefix = '|'.join(parts[:depth + 1])
+            if prefix not in ids:
+                ids[prefix] = len(rows)
+                rows.append((prefix, parts[depth], parent, depth))
+            parent = ids[prefix]
+    return pd.DataFrame(rows, columns=['path', 'name', 'parent', 'depth'])
@@ -0,0 +1,269 @@
+# product_charts.py builds the plotly figures for the tabs of streamlit_app.py.
+# Figure size follows the screen rather than the catalog: above WEBGL_ROWS scatters draw with
+# WebGL and histograms and box plots are binned/summarised here, and above DENSITY_ROWS a
+# scatter becomes a 2D histogram computed server-side.
+# Kane Williams 2024-Dec-15.
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+WEBGL_ROWS = 5_000
+DENSITY_ROWS = 100_000
+DENSITY_BINS = (200, 100)  # x, y
+
+
+def render_mode(n_rows):
+    """'svg', 'webgl' or 'density' for a scatter of n_rows points"""
+    if n_rows > DENSITY_ROWS:
+        return 'density'
+    return 'webgl' if n_rows > WEBGL_ROWS else 'svg'
+
+
+def density_heatmap(df, x, y, title, log_y=False):
+    """Counts of points per screen-sized cell, binned here so only the grid is sent"""
+    values = df[[x, y]].to_numpy(dtype=float)
+    values = values[np.isfinite(values).all(axis=1)]
+    if log_y:
+        values = values[values[:, 1] > 0]
+        values[:, 1] = np.log10(values[:, 1])
+    counts, x_edges, y_edges = np.histogram2d(values[:, 0], values[:, 1], bins=DENSITY_BINS)
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    fig = go.Figure(go.Heatmap(
+        z=np.where(counts > 0, counts, np.nan).T,
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=10 ** y_centers if log_y else y_centers,
+        colorscale='Blues',
+        colorbar=dict(title='Products'),
+        hovertemplate=f"{x}: %{{x:,.4g}}<br>{y}: %{{y:,.4g}}<br>Products: %{{z:,}}<extra></extra>"
+    ))
+    fig.update_layout(title=f"{title} (density of {len(values):,} products)",
+                      xaxis_title=x, yaxis_title=y)
+    if log_y:
+        fig.update_layout(yaxis_type="log")
+    return fig
+
+
+def scatter(filtered_df, x, y, title, hover_data=None, log_y=False):
+    """px.scatter by category, switching to WebGL or a density grid as the rows grow"""
+    mode = render_mode(len(filtered_df))
+    if mode == 'density':
+        return density_heatmap(filtered_df, x, y, title, log_y=log_y)
+    fig = px.scatter(
+        filtered_df,
+        x=x,
+        y=y,
+        color='broad_category',
+        title=title,
+        hover_data=hover_data,
+        render_mode=mode
+    )
+    if log_y:
+        fig.update_layout(yaxis_type="log")
+    return fig
+
+
+def box_stats(filtered_df, by, column):
+    """Tukey box statistics of column per group: quartiles, mean and whiskers clipped to the data"""
+    grouped = filtered_df.groupby(by, sort=False, observed=True)[column]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    stats['mean'] = grouped.mean()
+    low = stats['q1'] - 1.5 * (stats['q3'] - stats['q1'])
+    high = stats['q3'] + 1.5 * (stats['q3'] - stats['q1'])
+    in_fence = filtered_df[column].between(low.reindex(filtered_df[by]).to_numpy(),
+                                           high.reindex(filtered_df[by]).to_numpy())
+    fenced = filtered_df.loc[in_fence.to_numpy(), [by, column]].groupby(by, sort=False, observed=True)[column]
+    stats['lowerfence'] = fenced.min()
+    stats['upperfence'] = fenced.max()
+    return stats.dropna(subset=['median'])
+
+
+def box(filtered_df, x, y, title):
+    """px.box from raw points when few, otherwise from per-category quantiles"""
+    if len(filtered_df) <= WEBGL_ROWS:
+        return px.box(filtered_df, x=x, y=y, title=title)
+    stats = box_stats(filtered_df, x, y)
+    fig = go.Figure(go.Box(
+        x=stats.index.astype(str),
+        q1=stats['q1'], median=stats['median'], q3=stats['q3'], mean=stats['mean'],
+        lowerfence=stats['lowerfence'], upperfence=stats['upperfence'],
+        name=y, boxpoints=False
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def binned_counts(filtered_df, x, nbins, by=None):
+    """Bar heights of a histogram of x (per group of by) with shared, data-driven bin edges"""
+    values = filtered_df[x].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    edges = np.histogram_bin_edges(values[finite], bins=nbins)
+    bins = np.clip(np.searchsorted(edges, values[finite], side='right') - 1, 0, nbins - 1)
+    frame = pd.DataFrame({'bin': bins})
+    if by is not None:
+        frame[by] = filtered_df[by].to_numpy()[finite]
+    counts = frame.groupby(([by] if by is not None else []) + ['bin'], sort=True, observed=True).size()
+    counts = counts.rename('count').reset_index()
+    counts[x] = (edges[counts['bin']] + edges[counts['bin'] + 1]) / 2
+    return counts, edges[1] - edges[0]
+
+
+# Price Analysis
+def price_vs_rating(filtered_df):
+    # Price vs Rating scatter plot
+    return scatter(
+        filtered_df,
+        x='actual_price',
+        y='rating',
+        title='Price vs Rating Distribution',
+        hover_data=['product_name']
+    )
+
+
+def price_by_category(filtered_df):
+    # Price distribution by category
+    return box(
+        filtered_df,
+        x='broad_category',
+        y='actual_price',
+        title='Price Distribution by Category'
+    )
+
+
+# Ratings Analysis
+def rating_distribution(filtered_df):
+    # Rating distribution
+    if len(filtered_df) <= WEBGL_ROWS:
+        return px.histogram(
+            filtered_df,
+            x='rating',
+            nbins=20,
+            title='Overall Rating Distribution'
+        )
+    counts, width = binned_counts(filtered_df, 'rating', 20)
+    fig = px.bar(counts, x='rating', y='count', title='Overall Rating Distribution')
+    fig.update_traces(width=width)
+    return fig
+
+
+def rating_vs_reviews(filtered_df):
+    # Rating vs Number of Reviews
+    return scatter(
+        filtered_df,
+        x='rating_count',
+        y='rating',
+        title='Rating vs Number of Reviews'
+    )
+
+
+def rating_by_category(filtered_df, n_categories):
+    # Ratings by category histograms
+    if len(filtered_df) <= WEBGL_ROWS:
+        fig_category_ratings = px.histogram(
+            filtered_df,
+            x='rating',
+            color='broad_category',
+            nbins=20,
+            facet_col='broad_category',
+            facet_col_wrap=2,  # Show 2 categories per row
+            title='Rating Distribution by Category'
+        )
+    else:
+        counts, width = binned_counts(filtered_df, 'rating', 20, by='broad_category')
+        fig_category_ratings = px.bar(
+            counts,
+            x='rating',
+            y='count',
+            color='broad_category',
+            facet_col='broad_category',
+            facet_col_wrap=2,
+            title='Rating Distribution by Category'
+        )
+        fig_category_ratings.update_traces(width=width)
+    # Update layout to make it more readable
+    fig_category_ratings.update_layout(
+        height=100 * (n_categories // 2 + n_categories % 2) * 2,  # Adjust height based on number of categories
+        showlegend=False
+    )
+    # Remove repeated axis titles
+    fig_category_ratings.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    return fig_category_ratings
+
+
+# Discount Analysis
+def discount_vs_rating(filtered_df):
+    # Discount vs Rating scatter plot
+    return scatter(
+        filtered_df,
+        x='discount_percentage',
+        y='rating',
+        title='Discount Percentage vs Rating',
+        hover_data=['product_name']
+    )
+
+
+def discount_vs_reviews(filtered_df):
+    # Discount vs Rating Count scatter plot, log scale for rating count
+    return scatter(
+        filtered_df,
+        x='discount_percentage',
+        y='rating_count',
+        title='Discount Percentage vs Number of Ratings',
+        hover_data=['product_name'],
+        log_y=True
+    )
+
+
+def discount_by_category(filtered_df):
+    # Box plot of discounts by category
+    return box(
+        filtered_df,
+        x='broad_category',
+        y='discount_percentage',
+        title='Discount Distribution by Category'
+    )
+
+
+# Category Analysis
+def category_stats(filtered_df):
+    # Category statistics
+    stats = filtered_df.groupby('broad_category', observed=True).agg({
+        'rating': 'mean',
+        'rating_count': 'mean',
+        'discount_percentage': 'mean',
+        'actual_price': 'mean'
+    }).astype('float64').round(2)
+
+    # Display category statistics with better column names
+    stats.columns = ['Avg Rating', 'Avg Review Count', 'Avg Discount %', 'Avg Price']
+    return stats
+
+
+def category_counts_chart(filtered_df):
+    # Category distribution
+    category_counts = filtered_df['broad_category'].value_counts()
+    # A categorical column also counts the categories that were filtered out
+    category_counts = category_counts[category_counts > 0].reset_index()
+    category_counts.columns = ['Category', 'Count']
+
+    return px.bar(
+        category_counts,
+        x='Category',
+        y='Count',
+        title='Number of Products by Category'
+    )
+
+
+def node_counts_chart(stats, title='Number of Products by Category'):
+    # Product counts of the category nodes in a CategoryCube.stats frame, largest first
+    counts = stats['Products'].sort_values(ascending=False).reset_index()
+    counts.columns = ['Category', 'Count']
+
+    return px.bar(
+        counts,
+        x='Category',
+        y='Count',
+        title=title
+    )
@@ -0,0 +1,121 @@
+# product_cleaning.py turns the raw Amazon export into the typed frame used by streamlit_app.py.
+# Every conversion is a vectorized string operation over whole columns, and a frame can be
+# cleaned chunk by chunk (clean_chunks) so large CSV/Parquet exports never sit in memory twice.
+# Numbers are kept in the narrowest dtype that holds them (float32 prices and ratings, int32
+# counts) and compact() turns the category paths into categoricals, one code per row.
+# Kane Williams 2024-Dec-15.
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Columns converted to numbers, and the dtype each ends up with
+NUMERIC_COLUMNS = {
+    'discounted_price': 'float32',
+    'actual_price': 'float32',
+    'discount_percentage': 'float32',
+    'rating': 'float32',
+    'rating_count': 'int32',
+}
+
+# Text columns with few distinct values, kept as categoricals (dictionary-encoded in Arrow)
+CATEGORY_COLUMNS = ['category', 'broad_category']
+
+# A row is rejected when one of these columns holds a value that is not a number (e.g. a '|' rating);
+# missing values are kept as NaN
+REJECT_RULES = ['discounted_price', 'actual_price', 'discount_percentage', 'rating']
+
+NUMBER = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+
+
+def arrow_text(series):
+    """The column as an Arrow string array; values that are not strings go through str()"""
+    if pd.api.types.is_string_dtype(series):
+        try:
+            return pa.array(series, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    return pa.array(series.astype(str), type=pa.string(), from_pandas=True)
+
+
+def parse_numbers(text, index):
+    """Floats from Arrow text like '₹1,099', '64%' or '4.2'; anything unparseable becomes NaN"""
+    # pyarrow's string kernels validate and cast the whole column without a Python call per value
+    for symbol in ('₹', ',', '%'):
+        text = pc.replace_substring(text, symbol, '')
+    text = pc.utf8_trim_whitespace(text)
+    numbers = pc.cast(pc.if_else(pc.match_substring_regex(text, NUMBER), text, None), pa.float64())
+    return pd.Series(numbers.to_numpy(zero_copy_only=False), index=index)
+
+
+def to_number(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    return parse_numbers(arrow_text(series), series.index)
+
+
+def clean_percentage(series):
+    """'64%' strings are already percentages; fractions like 0.64 are scaled up"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64') * 100
+    text = arrow_text(series)
+    numbers = parse_numbers(text, series.index)
+    is_percent = pc.ends_with(pc.utf8_rtrim_whitespace(text), '%').fill_null(False)
+    return numbers.where(is_percent.to_numpy(zero_copy_only=False), numbers * 100)
+
+
+def broad_category(series):
+    """The top level of each '|'-delimited category path"""
+    top = pc.list_element(pc.split_pattern(arrow_text(series), '|', max_splits=1), 0)
+    return pd.Series(top.to_pandas(), index=series.index).where(series.notna())
+
+
+def clean_chunk(df):
+    """Clean one frame; returns (cleaned rows, rejected row counts per rule)"""
+    converted = {
+        'discounted_price': to_number(df['discounted_price']),
+        'actual_price': to_number(df['actual_price']),
+        'discount_percentage': clean_percentage(df['discount_percentage']),
+        'rating': to_number(df['rating']),
+    }
+    rejected = {}
+    keep = pd.Series(True, index=df.index)
+    for rule in REJECT_RULES:
+        bad = converted[rule].isna() & df[rule].notna()
+        rejected[rule] = int(bad.sum())
+        keep &= ~bad
+
+    converted['rating_count'] = to_number(df['rating_count']).fillna(0)
+    converted = {column: values.astype(NUMERIC_COLUMNS[column]) for column, values in converted.items()}
+    converted['broad_category'] = broad_category(df['category'])
+    df_cleaned = df.assign(**converted)
+    if not keep.all():
+        df_cleaned = df_cleaned[keep]
+    return df_cleaned, rejected
+
+
+def compact(df):
+    """df with CATEGORY_COLUMNS as categoricals; the snapshot does this when it is read"""
+    return df.assign(**{column: df[column].astype('category') for column in CATEGORY_COLUMNS if column in df})
+
+
+def new_report():
+    return {'rows_read': 0, 'rows_kept': 0, 'rejected': dict.fromkeys(REJECT_RULES, 0)}
+
+
+def clean_chunks(chunks, report=None):
+    """Clean an iterable of raw frames lazily, adding rows read, kept and rejected to report"""
+    if report is None:
+        report = new_report()
+    for chunk in chunks:
+        df_cleaned, rejected = clean_chunk(chunk)
+        report['rows_read'] += len(chunk)
+        report['rows_kept'] += len(df_cleaned)
+        for rule, count in rejected.items():
+            report['rejected'][rule] = report['rejected'].get(rule, 0) + count
+        yield df_cleaned
+
+
+def clean_products(df, report=None):
+    """Prices and percentages to floats, non-numeric ratings dropped, counts to ints, plus broad_category"""
+    return next(clean_chunks([df], report))
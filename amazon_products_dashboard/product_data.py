@@ -0,0 +1,197 @@
+# product_data.py loads the cleaned product frame for streamlit_app.py.
+# The export is parsed and cleaned once (chunk by chunk for CSV/Parquet), then kept as an
+# uncompressed Arrow snapshot beside it (its cleaning report in a JSON file next to it), named by
+# the export's hash. Later loads memory-map the snapshot instead of re-reading the Excel file:
+# the text columns stay in the mapped file (shared by every process through the page cache) and
+# only the numbers and category codes are copied.
+# Kane Williams 2024-Dec-15.
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+import product_cleaning
+
+WORKBOOK = "Amazon data Exercise - Kane Williams.xlsx"
+
+# Bump when clean_products changes what it produces, so existing snapshots are rebuilt
+SNAPSHOT_VERSION = 4
+
+CHUNK_ROWS = 250_000
+
+
+def source_path():
+    """The export to load: AMAZON_DATA if set, otherwise the workbook in the working directory"""
+    return Path(os.environ.get('AMAZON_DATA', WORKBOOK))
+
+
+def source_key(path):
+    """mtime and size of the source; one stat() per rerun decides whether the cache is still valid"""
+    stat = os.stat(path)
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_raw(path, chunk_rows=CHUNK_ROWS):
+    """Yield the export in raw chunks: CSV and Parquet are streamed, a workbook comes in one piece"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif suffix == '.csv':
+        # Read as text so a chunk's inferred types never disagree with the next chunk's
+        yield from pd.read_csv(path, dtype=str, chunksize=chunk_rows)
+    else:
+        yield pd.read_excel(path)
+
+
+def snapshot_path(path, digest):
+    path = Path(path)
+    return path.with_name(f".{path.name}.{digest[:16]}.v{SNAPSHOT_VERSION}.snapshot.arrow")
+
+
+def arrow_schema(df):
+    """Snapshot schema: cleaned numeric columns keep their dtype, everything else is text"""
+    import pyarrow as pa
+    fields = []
+    for column, dtype in df.dtypes.items():
+        if column in product_cleaning.NUMERIC_COLUMNS:
+            fields.append((column, pa.from_numpy_dtype(product_cleaning.NUMERIC_COLUMNS[column])))
+        elif pd.api.types.is_numeric_dtype(dtype):
+            fields.append((column, pa.from_numpy_dtype(dtype)))
+        else:
+            fields.append((column, pa.string()))
+    return pa.schema(fields)
+
+
+def report_path(snapshot):
+    """The cleaning report kept beside a snapshot"""
+    return snapshot.with_name(snapshot.name + '.report.json')
+
+
+def write_snapshot(path, snapshot, chunk_rows=CHUNK_ROWS):
+    """Clean the source chunk by chunk into the snapshot; returns the cleaning report.
+
+    Each chunk is written as soon as it is cleaned. The report is only complete at the end, so it
+    goes into a JSON file beside the snapshot, written before the snapshot is moved into place.
+    Snapshots left behind by earlier versions of the source are removed.
+    """
+    import pyarrow as pa
+
+    report = product_cleaning.new_report()
+    tmp_path = snapshot.with_name(snapshot.name + '.tmp')
+    sink = writer = None
+    try:
+        for df_cleaned in product_cleaning.clean_chunks(iter_raw(path, chunk_rows), report):
+            if writer is None:
+                schema = arrow_schema(df_cleaned)
+                sink = pa.OSFile(str(tmp_path), 'wb')
+                writer = pa.ipc.new_file(sink, schema)
+            writer.write_table(pa.Table.from_pandas(df_cleaned, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+    report_path(snapshot).write_text(json.dumps(report))
+    tmp_path.replace(snapshot)
+    for suffix in ('parquet', 'arrow', 'arrow.report.json'):  # v2 snapshots were Parquet
+        for stale in snapshot.parent.glob(f".{Path(path).name}.*.snapshot.{suffix}"):
+            if stale not in (snapshot, report_path(snapshot)):
+                stale.unlink(missing_ok=True)
+    return report
+
+
+def open_snapshot(snapshot):
+    """Arrow IPC reader over the memory-mapped snapshot"""
+    import pyarrow as pa
+    return pa.ipc.open_file(pa.memory_map(str(snapshot)))
+
+
+def snapshot_rows(snapshot):
+    reader = open_snapshot(snapshot)
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def iter_snapshot(snapshot, columns, batch_rows=CHUNK_ROWS):
+    """Record batches of some columns of the snapshot, at most batch_rows rows each, in row order"""
+    reader = open_snapshot(snapshot)
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i).select(columns)
+        for offset in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(offset, batch_rows)
+
+
+def read_snapshot(snapshot):
+    """(cleaned frame, cleaning report), with the text columns memory-mapped from the snapshot.
+
+    Text is asked for as Arrow-backed strings rather than left to pandas' default string dtype,
+    which holds a Python object per value (and copies every string) before pandas 3.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    report = json.loads(report_path(snapshot).read_text())
+    table = open_snapshot(snapshot).read_all()
+    # Category columns are dictionary-encoded first, so only the plain text maps to Arrow strings
+    for column in product_cleaning.CATEGORY_COLUMNS:
+        if column in table.column_names:
+            table = table.set_column(table.column_names.index(column), column, table[column].dictionary_encode())
+    arrow_string = pd.StringDtype('pyarrow', na_value=np.nan)
+    text_types = {pa.string(): arrow_string, pa.large_string(): arrow_string}
+    return table.unify_dictionaries().to_pandas(types_mapper=text_types.get), report
+
+
+def memory_report(df):
+    """Bytes held by each column of df (text included), largest first, with a total row"""
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'column': usage.index, 'dtype': [str(df[column].dtype) for column in usage.index],
+                           'bytes': usage.to_numpy()})
+    report = report.sort_values('bytes', ascending=False, ignore_index=True)
+    report.loc[len(report)] = ['total', '', int(usage.sum())]
+    report['bytes_per_row'] = report['bytes'] / max(len(df), 1)
+    return report
+
+
+def ensure_snapshot(path=None):
+    """Path of the snapshot for the source's current contents, writing it first if needed"""
+    path = Path(path or source_path())
+    snapshot = snapshot_path(path, file_hash(path))
+    if not snapshot.exists():
+        write_snapshot(path, snapshot)
+    return snapshot
+
+
+def load_products(path=None):
+    """(cleaned product frame, cleaning report), from a snapshot matching the source's contents.
+
+    The report counts rows read, rows kept and rows rejected per cleaning rule.
+    """
+    path = Path(path or source_path())
+    snapshot = snapshot_path(path, file_hash(path))
+    if snapshot.exists():
+        try:
+            return read_snapshot(snapshot)
+        except (OSError, ValueError, KeyError):
+            # A truncated or foreign snapshot is rebuilt below
+            pass
+    try:
+        write_snapshot(path, snapshot)
+    except OSError:
+        # A read-only data directory: clean in memory and let the next process try again
+        report = product_cleaning.new_report()
+        df_cleaned = pd.concat(product_cleaning.clean_chunks(iter_raw(path), report), ignore_index=True)
+        return product_cleaning.compact(df_cleaned), report
+    return read_snapshot(snapshot)
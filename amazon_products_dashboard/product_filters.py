@@ -0,0 +1,174 @@
+# product_filters.py applies the sidebar filters of streamlit_app.py.
+# ProductFilterIndex is built once per dataset: categories become integer codes with one bitmap
+# each, and price and rating are sorted so a range filter starts with two binary searches. The
+# same sorted ratings give the Word Analysis percentiles and their rows without a sort per rerun.
+# The filtered frame the tabs draw from holds only the columns they chart (filtered_view); the
+# text columns stay in the cached frame and are read by row position.
+# Kane Williams 2024-Dec-15.
+
+import numpy as np
+import pandas as pd
+
+RANGE_COLUMNS = ['actual_price', 'rating']
+TEXT_COLUMNS = ['review_content', 'about_product']
+
+# The columns the analysis tabs chart and group by
+ANALYSIS_COLUMNS = ['product_name', 'category', 'broad_category', 'discounted_price', 'actual_price',
+                    'discount_percentage', 'rating', 'rating_count']
+
+# Below this share of rows a range is marked row by row; above it one comparison of ranks is cheaper
+SCATTER_FRACTION = 1 / 8
+
+
+class ProductFilterIndex:
+    """Precomputed structures that turn the sidebar filters into one boolean mask"""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+
+        # Categories: integer codes (in order of first appearance, like unique()) and a packed bitmap each
+        codes, self.categories = pd.factorize(df['broad_category'])
+        self.category_codes = {category: code for code, category in enumerate(self.categories)}
+        self.category_bitmaps = np.stack([np.packbits(codes == code) for code in range(len(self.categories))]) \
+            if len(self.categories) else np.zeros((0, (self.n_rows + 7) // 8), dtype=np.uint8)
+
+        # Ranges: values in sorted order (NaN last), the row order, and each row's rank in it; also
+        # the distinct values and each row's code among them (-1 for NaN), for percentiles. Values
+        # keep the column's dtype, and bounds are compared in it (a float32 4.3 is not <= 4.3)
+        self.sorted_values, self.orders, self.ranks = {}, {}, {}
+        self.distinct_values, self.value_codes = {}, {}
+        for column in RANGE_COLUMNS:
+            values = df[column].to_numpy(dtype=np.result_type(df[column].dtype, np.float32))
+            order = np.argsort(values, kind='stable')
+            ranks = np.empty(self.n_rows, dtype=np.int32 if self.n_rows < 2**31 else np.int64)
+            ranks[order] = np.arange(self.n_rows, dtype=ranks.dtype)
+            self.sorted_values[column], self.orders[column], self.ranks[column] = values[order], order, ranks
+
+            sorted_values = values[order]
+            finite = sorted_values[~np.isnan(sorted_values)]
+            self.distinct_values[column] = finite[np.append(True, finite[1:] != finite[:-1])] if len(finite) else finite
+            codes = np.full(self.n_rows, -1, dtype=np.int32)
+            codes[order[:len(finite)]] = np.searchsorted(self.distinct_values[column], finite)
+            self.value_codes[column] = codes
+
+        # Which products have text to analyze
+        self.text_present = {column: df[column].notna().to_numpy() for column in TEXT_COLUMNS if column in df}
+
+        # Slider bounds, so reruns never scan the columns for them
+        self.bounds = {column: (np.nanmin(self.sorted_values[column]), np.nanmax(self.sorted_values[column]))
+                       for column in RANGE_COLUMNS} if self.n_rows else {}
+
+    def bounds_slice(self, column, low, high):
+        """(lo, hi) such that sorted_values[column][lo:hi] are the values within [low, high]"""
+        values = self.sorted_values[column]
+        low, high = values.dtype.type(low), values.dtype.type(high)
+        return np.searchsorted(values, low, side='left'), np.searchsorted(values, high, side='right')
+
+    def range_mask(self, column, low, high):
+        """Rows with low <= value <= high, or None when that is every row"""
+        lo, hi = self.bounds_slice(column, low, high)
+        if lo == 0 and hi == self.n_rows:
+            return None
+        if hi - lo < self.n_rows * SCATTER_FRACTION:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[self.orders[column][lo:hi]] = True
+            return mask
+        ranks = self.ranks[column]
+        return (ranks >= lo) & (ranks < hi)
+
+    def category_mask(self, categories):
+        """Rows in any of the categories, or None when every category is selected"""
+        codes = sorted({self.category_codes[c] for c in categories if c in self.category_codes})
+        if len(codes) == len(self.categories):
+            return None
+        if not codes:
+            return np.zeros(self.n_rows, dtype=bool)
+        bitmap = np.bitwise_or.reduce(self.category_bitmaps[codes], axis=0)
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
+
+    def mask(self, price_range, rating_range, categories):
+        """One boolean mask over the indexed rows for the sidebar filters"""
+        mask = np.ones(self.n_rows, dtype=bool)
+        for part in (self.category_mask(categories),
+                     self.range_mask('actual_price', *price_range),
+                     self.range_mask('rating', *rating_range)):
+            if part is not None:
+                mask &= part
+        return mask
+
+    def percentiles(self, column, mask, qs):
+        """np.percentile of the column over the rows in mask, from counts of its distinct values"""
+        codes = self.value_codes[column][mask]
+        cumulative = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(self.distinct_values[column])))
+        n = cumulative[-1] if len(cumulative) else 0
+        if not n:
+            return [np.nan for _ in qs]
+
+        def order_statistic(k):
+            return self.distinct_values[column][np.searchsorted(cumulative, k, side='right')]
+
+        # Linear interpolation between the two order statistics around the percentile, as numpy does
+        result = []
+        for q in qs:
+            h = (n - 1) * q / 100
+            low, high = order_statistic(int(np.floor(h))), order_statistic(int(np.ceil(h)))
+            result.append(float(low) + (h - np.floor(h)) * (float(high) - float(low)))
+        return result
+
+    def positions_between(self, column, low, high, mask):
+        """Row positions in mask with low <= value <= high, found in the sorted order"""
+        lo, hi = self.bounds_slice(column, low, high)
+        rows = self.orders[column][lo:hi]
+        return np.sort(rows[mask[rows]])
+
+
+def between(series, low, high):
+    """low <= value <= high, compared in the column's dtype as ProductFilterIndex does"""
+    values = series.to_numpy(dtype=np.result_type(series.dtype, np.float32))
+    low, high = values.dtype.type(low), values.dtype.type(high)
+    return (values >= low) & (values <= high)
+
+
+def filter_mask(df_cleaned, price_range, rating_range, categories, search_term='',
+                search_index=None, search_columns=('product_name',), filter_index=None):
+    """Boolean mask over df_cleaned of the rows filter_products() keeps.
+
+    With a ProductFilterIndex and a ProductSearchIndex over df_cleaned every filter is an index
+    lookup combined into one mask; without them the columns are scanned.
+    """
+    if filter_index is not None:
+        mask = filter_index.mask(price_range, rating_range, categories)
+    else:
+        mask = (
+            between(df_cleaned['actual_price'], *price_range) &
+            between(df_cleaned['rating'], *rating_range) &
+            df_cleaned['broad_category'].isin(categories).to_numpy()
+        )
+
+    if search_term and search_index is not None:
+        mask = mask & search_index.mask(search_term, search_columns)
+    elif search_term:
+        # Only the rows the other filters kept are searched, for the literal term like the index
+        rows = np.flatnonzero(mask)
+        found = np.zeros(len(rows), dtype=bool)
+        for column in search_columns:
+            text = df_cleaned[column].iloc[rows]
+            found |= text.str.contains(search_term, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        mask = np.zeros(len(df_cleaned), dtype=bool)
+        mask[rows[found]] = True
+    return mask
+
+
+def filtered_view(df_cleaned, mask, columns=ANALYSIS_COLUMNS):
+    """The rows in mask of the analysis columns only; with every row kept nothing is copied"""
+    view = df_cleaned[[column for column in columns if column in df_cleaned]]
+    if mask.all():
+        return view
+    return view.take(np.flatnonzero(mask))
+
+
+def filter_products(df_cleaned, price_range, rating_range, categories, search_term='',
+                    search_index=None, search_columns=('product_name',), filter_index=None):
+    """Rows within the price and rating ranges, in the chosen categories, matching the search"""
+    return df_cleaned[filter_mask(df_cleaned, price_range, rating_range, categories, search_term,
+                                  search_index, search_columns, filter_index)]
@@ -0,0 +1,81 @@
+# product_reports.py writes the dashboard's charts as static reports, one per broad category,
+# without Streamlit.
+#
+#   python amazon_products_dashboard/product_reports.py --output reports/products --formats html,png
+#
+# The cleaned products (AMAZON_DATA or the workbook, through the snapshot) and the category tree
+# are loaded once; the reports are rendered across a process pool by shared/reports.py with the
+# figure builders of the dashboard's tabs: an overview of all products, then one per category.
+# Kane Williams 2024-Dec-15.
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'shared'))
+
+import product_charts  # noqa: E402
+import product_data  # noqa: E402
+import reports  # noqa: E402
+from product_categories import CategoryCube  # noqa: E402
+from product_filters import filtered_view  # noqa: E402
+
+ALL_CATEGORIES = None
+
+
+def load(path=None):
+    """(cleaned products, category tree over them)"""
+    df_cleaned, _ = product_data.load_products(path)
+    return df_cleaned, CategoryCube.build(df_cleaned)
+
+
+def render(data, category):
+    """(file name, title, figures) of the overview (category None) or of one broad category"""
+    df_cleaned, cube = data
+    if category is ALL_CATEGORIES:
+        products, node = df_cleaned, None
+        name, title = 'all-categories', "All products"
+    else:
+        products = filtered_view(df_cleaned, (df_cleaned['broad_category'] == category).to_numpy())
+        node = cube.node_of_path.get(category)
+        name, title = f"category-{reports.slug(category)}", category
+
+    figures = [
+        ("Price Analysis", product_charts.price_vs_rating(products)),
+        ("Price by Category", product_charts.price_by_category(products)),
+        ("Rating Distribution", product_charts.rating_distribution(products)),
+        ("Rating vs Reviews", product_charts.rating_vs_reviews(products)),
+        ("Rating Distribution by Category",
+         product_charts.rating_by_category(products, products['broad_category'].nunique())),
+        ("Discount vs Rating", product_charts.discount_vs_rating(products)),
+        ("Discount vs Reviews", product_charts.discount_vs_reviews(products)),
+        ("Discount by Category", product_charts.discount_by_category(products)),
+    ]
+    stats = cube.breakdown(node)
+    if not stats.empty:
+        figures.append(("Category Analysis", product_charts.node_counts_chart(stats)))
+    return name, title, figures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write static product reports for every broad category")
+    parser.add_argument('--source', help="Amazon export (default: AMAZON_DATA or the workbook)")
+    parser.add_argument('--output', required=True, help="directory for the reports")
+    parser.add_argument('--formats', default='html', help="comma-separated: html, png")
+    parser.add_argument('--workers', type=int, help="processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    try:
+        formats = reports.check_formats([f.strip() for f in args.formats.split(',')])
+    except ValueError as e:
+        parser.error(str(e))
+
+    data = load(args.source)
+    categories = sorted(data[0]['broad_category'].dropna().unique())
+    written = reports.export(render, [ALL_CATEGORIES] + categories, data, args.output, formats, args.workers)
+    print(f"Wrote {len(written)} reports to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# product_search.py answers the "Search by product name" box of streamlit_app.py from an index.
+# Every lower-cased text is split into byte trigrams once; a search is then the intersection of
+# the search term's trigram posting lists, and only those candidates are checked for the term.
+# Kane Williams 2024-Dec-15.
+
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+
+BUILD_CHUNK_ROWS = 200_000
+
+
+def utf8_bytes(series):
+    """(offsets, bytes) of the lower-cased UTF-8 texts; a missing text is empty"""
+    text = pa.array(series.fillna('').str.lower(), type=pa.large_string(), from_pandas=True)
+    _, offsets, data = text.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int64)[text.offset:text.offset + len(text) + 1]
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+    return offsets, data
+
+
+def trigram_codes(data):
+    """The 24-bit code of the trigram starting at each byte"""
+    b = data.astype(np.int64)
+    return (b[:-2] << 16) | (b[1:-1] << 8) | b[2:]
+
+
+def posting_pairs(series, first_row):
+    """Sorted unique (trigram << 32 | row) keys for the texts of series, numbered from first_row"""
+    offsets, data = utf8_bytes(series)
+    if len(data) < 3:
+        return np.zeros(0, dtype=np.int64)
+    lengths = np.diff(offsets)
+    row_of_byte = np.repeat(np.arange(first_row, first_row + len(lengths), dtype=np.int64), lengths)
+    # Keep only the trigrams that lie inside one text
+    inside = row_of_byte[:-2] == row_of_byte[2:]
+    keys = np.sort((trigram_codes(data)[inside] << 32) | row_of_byte[:-2][inside])
+    # A sort and a neighbour comparison; much cheaper than np.unique at tens of millions of keys
+    return keys[np.append(True, keys[1:] != keys[:-1])]
+
+
+class TrigramIndex:
+    """Trigram posting lists over one text column, stored as one sorted row array (CSR style)"""
+
+    def __init__(self, series):
+        self.series = series
+        chunks = [posting_pairs(series.iloc[start:start + BUILD_CHUNK_ROWS], start)
+                  for start in range(0, len(series), BUILD_CHUNK_ROWS)]
+        keys = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        # Chunks are in row order and sorted within themselves, so a stable sort on the trigram
+        # leaves every posting list in ascending row order
+        order = np.argsort(keys >> 32, kind='stable')
+        keys = keys[order]
+        codes = keys >> 32
+        self.rows = (keys & 0xFFFFFFFF).astype(np.int32 if len(series) < 2**31 else np.int64)
+        starts = np.flatnonzero(np.diff(codes, prepend=-1))
+        self.trigrams = codes[starts]
+        self.offsets = np.append(starts, len(codes))
+        self.search = lru_cache(maxsize=64)(self._search)
+
+    def postings(self, code):
+        i = np.searchsorted(self.trigrams, code)
+        if i == len(self.trigrams) or self.trigrams[i] != code:
+            return self.rows[:0]
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def _search(self, term):
+        """Row positions whose text contains term, ignoring case"""
+        term = term.lower()
+        data = np.frombuffer(term.encode('utf-8'), dtype=np.uint8)
+        if len(data) < 3:
+            # Too short for a trigram; such terms match most rows anyway
+            return np.flatnonzero(self.series.str.contains(term, case=False, regex=False, na=False).to_numpy())
+        lists = sorted((self.postings(code) for code in np.unique(trigram_codes(data))), key=len)
+        candidates = lists[0]
+        for postings in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, postings, assume_unique=True)
+        # Sharing every trigram does not make the term a substring, so check the few candidates
+        found = self.series.iloc[candidates].str.contains(term, case=False, regex=False, na=False)
+        return candidates[found.to_numpy()]
+
+
+class ProductSearchIndex:
+    """Trigram indexes over product text columns, answering searches as row masks.
+
+    indexes maps a column to a TrigramIndex already built over it, e.g. one cached per column;
+    the other columns are indexed here.
+    """
+
+    def __init__(self, df, columns=('product_name',), indexes=None):
+        self.n_rows = len(df)
+        indexes = indexes or {}
+        self.indexes = {column: indexes[column] if column in indexes
+                        else TrigramIndex(df[column].reset_index(drop=True)) for column in columns}
+
+    def positions(self, term, columns):
+        """Row positions where the term appears in any of the columns"""
+        found = [self.indexes[column].search(term) for column in columns]
+        return found[0] if len(found) == 1 else np.unique(np.concatenate(found))
+
+    def mask(self, term, columns=('product_name',)):
+        """Boolean mask over the indexed frame's rows: the term appears in any of the columns"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.positions(term, columns)] = True
+        return mask
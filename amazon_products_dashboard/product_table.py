@@ -0,0 +1,63 @@
+# product_table.py pages the "Raw Data" table of streamlit_app.py.
+# Sort orders are precomputed once over the whole frame; a filtered, sorted page is then a mask
+# lookup and a slice, and only that page's requested columns are sent, as an Arrow table with
+# long text cut short. The full text of a product is fetched when it is selected.
+# Kane Williams 2024-Dec-15.
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SORT_COLUMNS = ['actual_price', 'discounted_price', 'discount_percentage', 'rating', 'rating_count',
+                'product_name', 'broad_category', 'product_id']
+TEXT_CHARS = 80
+
+
+def build_sort_index(df):
+    """Row positions of df in ascending order of each sortable column (missing values last)"""
+    return {column: pc.sort_indices(pa.array(df[column], from_pandas=True)).to_numpy()
+            for column in SORT_COLUMNS if column in df}
+
+
+def sorted_positions(sort_index, mask, column=None, descending=False):
+    """Positions of the rows in mask, in sort order, by filtering the precomputed order (no sort)"""
+    if column is None:
+        order = np.flatnonzero(mask)
+    else:
+        order = sort_index[column]
+        order = order[mask[order]]
+    return order[::-1] if descending else order
+
+
+def page_positions(positions, page, page_size):
+    return positions[page * page_size:(page + 1) * page_size]
+
+
+def truncate_text(table, chars=TEXT_CHARS):
+    """Text columns cut to chars characters, with an ellipsis where something was cut"""
+    columns = []
+    for column in table.columns:
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            cut = pc.utf8_slice_codeunits(column, 0, chars)
+            column = pc.if_else(pc.greater(pc.utf8_length(column), chars),
+                                pc.binary_join_element_wise(cut, pa.scalar('…', column.type),
+                                                           pa.scalar('', column.type)), column)
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def page_of(df, positions, page, page_size, columns):
+    """The requested columns of df at positions[page * page_size:(page + 1) * page_size], as Arrow"""
+    visible = page_positions(positions, page, page_size)
+    # Rows and columns in one take, so only the page is copied
+    page_df = df.iloc[visible, df.columns.get_indexer(list(columns))]
+    return truncate_text(pa.Table.from_pandas(page_df, preserve_index=False))
+
+
+def full_text(df, position, columns):
+    """{column: text} of one product, for the columns whose text the page cut short"""
+    row = df.iloc[position]
+    return {column: row[column] for column in columns
+            if isinstance(row[column], str) and len(row[column]) > TEXT_CHARS}
@@ -0,0 +1,102 @@
+# product_text.py keeps per-product word counts of the text columns for the Word Analysis tab.
+# Each text is tokenized once into a sparse product x word count matrix; the words of any set of
+# products are then a sum over its rows, so a word cloud never re-tokenizes the corpus.
+# Kane Williams 2024-Dec-15.
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from word_clouds import stop_words
+
+# What WordCloud counts as a word: runs of word characters and apostrophes
+SPLIT_PATTERN = r"[^\w']+"
+
+
+def tokenize(series):
+    """(row of each token, token) as Arrow arrays: lower-cased, stopwords and numbers removed"""
+    text = pc.utf8_lower(pa.array(series, type=pa.string(), from_pandas=True))
+    lists = pc.split_pattern_regex(text, SPLIT_PATTERN)
+    rows = pc.list_parent_indices(lists)
+    # WordCloud's words start at a word character (r"\w[\w']*"), so only leading apostrophes go
+    tokens = pc.utf8_ltrim(pc.list_flatten(lists), "'")
+    tokens = pc.replace_substring_regex(tokens, r"'s$", '')
+    keep = pc.and_(pc.greater(pc.utf8_length(tokens), 0),
+                   pc.invert(pc.or_(pc.is_in(tokens, pa.array(sorted(stop_words()))), pc.utf8_is_digit(tokens))))
+    return pc.filter(rows, keep), pc.filter(tokens, keep)
+
+
+def merge_plurals(words):
+    """(vocabulary, index of each word in it), counting 'cables' as 'cable' where both occur, like WordCloud"""
+    position = {word: i for i, word in enumerate(words)}
+    target = np.arange(len(words), dtype=np.int64)
+    for i, word in enumerate(words):
+        if word.endswith('s') and not word.endswith('ss') and word[:-1] in position:
+            target[i] = position[word[:-1]]
+    kept, merged_into = np.unique(target, return_inverse=True)
+    return np.asarray(words, dtype=object)[kept], merged_into.astype(np.int64)
+
+
+def bigrams(rows, tokens):
+    """(row, 'first second') for each pair of neighbouring tokens of the same text"""
+    rows = rows.to_numpy(zero_copy_only=False)
+    same_text = np.flatnonzero(rows[:-1] == rows[1:])
+    pairs = pc.binary_join_element_wise(tokens.take(same_text), tokens.take(same_text + 1), ' ')
+    return pa.array(rows[same_text]), pairs
+
+
+def terms(series, n=1):
+    """(row, term) for the 1-grams or 2-grams of a text column"""
+    rows, tokens = tokenize(series)
+    return bigrams(rows, tokens) if n == 2 else (rows, tokens)
+
+
+class TokenCounts:
+    """Sparse product x term counts (CSR: indptr, term indices, counts) over one text column"""
+
+    def __init__(self, vocabulary, indptr, indices, counts):
+        self.vocabulary = vocabulary
+        self.indptr, self.indices, self.counts = indptr, indices, counts
+        self.n_rows = len(indptr) - 1
+
+    @classmethod
+    def from_entries(cls, vocabulary, rows, indices, counts, n_rows, plurals=False):
+        """Build from (row, term index, count) entries in any order, adding up repeated entries"""
+        if plurals:
+            vocabulary, merged_into = merge_plurals(list(vocabulary))
+            indices = merged_into[indices]
+        width = max(len(vocabulary), 1)
+        keys = np.asarray(rows, dtype=np.int64) * width + indices
+        order = np.argsort(keys)
+        keys = keys[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        counts = np.add.reduceat(np.asarray(counts, dtype=np.int64)[order], starts) if len(keys) else keys
+        rows, indices = np.divmod(keys[starts], width)
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(np.asarray(vocabulary, dtype=object), indptr, indices.astype(np.int32), counts.astype(np.int32))
+
+    @classmethod
+    def build(cls, series, n=1, plurals=None):
+        """Count the 1-grams or 2-grams of a text column, with plurals merged (as WordCloud does) by default for 1-grams"""
+        rows, words = terms(series, n)
+        encoded = words.dictionary_encode()
+        indices = encoded.indices.to_numpy(zero_copy_only=False).astype(np.int64)
+        return cls.from_entries(encoded.dictionary.to_pylist(), rows.to_numpy(zero_copy_only=False), indices,
+                                np.ones(len(indices), dtype=np.int64), len(series),
+                                plurals=(n == 1) if plurals is None else plurals)
+
+    def totals(self, positions):
+        """Count of every vocabulary term summed over the products at positions"""
+        selected = np.zeros(self.n_rows, dtype=bool)
+        selected[positions] = True
+        in_rows = np.repeat(selected, np.diff(self.indptr))
+        return np.bincount(self.indices[in_rows], weights=self.counts[in_rows], minlength=len(self.vocabulary))
+
+    def frequencies(self, positions, max_words=200):
+        """{term: count} of the most frequent terms over the products at positions"""
+        totals = self.totals(positions)
+        top = np.argpartition(totals, -max_words)[-max_words:] if len(totals) > max_words else np.arange(len(totals))
+        top = top[totals[top] > 0]
+        top = top[np.argsort(totals[top], kind='stable')[::-1]]
+        return dict(zip(self.vocabulary[top], totals[top].astype(int).tolist()))
@@ -2,60 +2,87 @@
 # As part of a 2 hour "Data Test" for a "Data Analyst" position at "Frankie".
 # For more please view my Github: https://github.com/kanewilliams
 
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from wordcloud import WordCloud
 import numpy as np
-from nltk.corpus import stopwords
-import nltk
-import matplotlib.pyplot as plt
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
-df = pd.read_excel("Amazon data Exercise - Kane Williams.xlsx")
-
-def clean_price(price_str):
-    return float(str(price_str).replace('₹', '').replace(',', ''))
-
-def clean_percentage(pct):
-    if isinstance(pct, str):
-        return float(pct.strip('%'))  # Just remove the % sign
-    return float(pct) * 100
-
-def generate_wordcloud(text_data, title):
-    stop_words = set(stopwords.words('english'))
-    
-    wordcloud = WordCloud(
-        width=800, 
-        height=400,
-        background_color='white',
-        stopwords=stop_words,
-        max_words=100
-    ).generate(' '.join(text_data))
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis('off')
-    ax.set_title(title)
-    return fig
+
+import product_charts
+import product_data
+import product_table
+from product_categories import CategoryCube
+import term_statistics
+from product_filters import ProductFilterIndex, filter_mask, filtered_view
+from product_search import ProductSearchIndex, TrigramIndex
+from product_text import TokenCounts
+from word_clouds import generate_wordcloud_from_frequencies
+
+# Shared with the outage dashboard
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'shared'))
+import instrumentation  # noqa: E402
 
 # -------------------------------------------------------------------------------
-# Data cleaning
-df_cleaned = df.copy()
-df_cleaned['discounted_price'] = df_cleaned['discounted_price'].apply(clean_price)
-df_cleaned['actual_price'] = df_cleaned['actual_price'].apply(clean_price)
-df_cleaned['discount_percentage'] = df_cleaned['discount_percentage'].apply(clean_percentage)  # Add this line here
-print(df_cleaned['discount_percentage'].head())
-df_cleaned = df_cleaned[df_cleaned['rating'] != '|']
-df_cleaned['rating'] = df_cleaned['rating'].astype(float)
-df_cleaned['rating_count'] = df_cleaned['rating_count'].astype(str)
-df_cleaned['rating_count'] = df_cleaned['rating_count'].str.replace(',', '')
-df_cleaned['rating_count'] = pd.to_numeric(df_cleaned['rating_count'], errors='coerce').fillna(0).astype(int)
-df_cleaned['broad_category'] = df_cleaned['category'].str.split('|').str[0]
+# Data loading and cleaning, once per process rather than on every rerun
+@st.cache_resource(show_spinner=False, max_entries=2)
+def start_loading_products(source_key):
+    """Read and clean the products in a background thread, so the page shell renders meanwhile"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='load-products')
+    future = executor.submit(product_data.load_products, source_key[0])
+    executor.shutdown(wait=False)
+    return future
+
+@st.cache_resource(show_spinner="Loading products...", max_entries=2)
+def load_products(source_key):
+    """Cleaned products shared by all sessions; source_key changes only when the export does"""
+    return start_loading_products(source_key).result()
+
+@st.cache_resource(show_spinner="Indexing product text...", max_entries=4)
+def load_search_index(source_key, column):
+    """Trigram index over one text column, built once per dataset the first time it is searched"""
+    df_cleaned, _ = load_products(source_key)
+    with instrumentation.stage(f"build {column} search index", len(df_cleaned)):
+        return TrigramIndex(df_cleaned[column].reset_index(drop=True))
+
+@st.cache_resource(show_spinner="Indexing filters...", max_entries=2)
+def load_filter_index(source_key):
+    """Category bitmaps, sorted price/rating orders and slider bounds, built once per dataset"""
+    df_cleaned, _ = load_products(source_key)
+    with instrumentation.stage("build filter index", len(df_cleaned)):
+        return ProductFilterIndex(df_cleaned)
+
+@st.cache_resource(show_spinner="Counting words...", max_entries=4)
+def load_token_counts(source_key, text_column):
+    """Per-product word counts of one text column, tokenized once per dataset.
+
+    AMAZON_TERMS points at statistics written by term_statistics.py; they are used when they
+    were computed from the current data, and the text is tokenized here otherwise.
+    """
+    terms_dir = os.environ.get('AMAZON_TERMS')
+    if terms_dir:
+        snapshot = product_data.ensure_snapshot(source_key[0])
+        token_counts = term_statistics.load_counts(terms_dir, text_column, snapshot=snapshot)
+        if token_counts is not None:
+            return token_counts
+    df_cleaned, _ = load_products(source_key)
+    with instrumentation.stage(f"count words of {text_column}", len(df_cleaned)):
+        return TokenCounts.build(df_cleaned[text_column])
+
+@st.cache_resource(show_spinner="Indexing table sort orders...", max_entries=2)
+def load_sort_index(source_key):
+    """Row order of every sortable column of the Raw Data table, built once per dataset"""
+    df_cleaned, _ = load_products(source_key)
+    with instrumentation.stage("build sort index", len(df_cleaned)):
+        return product_table.build_sort_index(df_cleaned)
+
+@st.cache_resource(show_spinner="Building category tree...", max_entries=2)
+def load_category_cube(source_key):
+    """Category tree with per-node rollups of the measures, built once per dataset"""
+    df_cleaned, _ = load_products(source_key)
+    with instrumentation.stage("build category cube", len(df_cleaned)):
+        return CategoryCube.build(df_cleaned)
 
 # -------------------------------------------------------------------------------
 
@@ -66,45 +93,10 @@ st.set_page_config(
     layout="wide"
 )
 
-# Sidebar filters
-st.sidebar.header("Filters")
-
-# Price range filter
-price_range = st.sidebar.slider(
-    "Price Range (₹)",
-    min_value=int(df_cleaned['actual_price'].min()),
-    max_value=int(df_cleaned['actual_price'].max()),
-    value=(int(df_cleaned['actual_price'].min()), int(df_cleaned['actual_price'].max()))
-)
-
-# Rating range filter
-rating_range = st.sidebar.slider(
-    "Rating Range",
-    min_value=float(df_cleaned['rating'].min()),
-    max_value=float(df_cleaned['rating'].max()),
-    value=(float(df_cleaned['rating'].min()), float(df_cleaned['rating'].max()))
-)
-
-# Category filter
-categories = st.sidebar.multiselect(
-    "Select Categories",
-    options=df_cleaned['broad_category'].unique(),
-    default=df_cleaned['broad_category'].unique()
-)
-
-# Search functionality
-st.sidebar.header("Search Products")
-search_term = st.sidebar.text_input("Search by product name")
-
-# Apply filters to create filtered dataset
-filtered_df = df_cleaned[
-    (df_cleaned['actual_price'].between(price_range[0], price_range[1])) &
-    (df_cleaned['rating'].between(rating_range[0], rating_range[1])) &
-    (df_cleaned['broad_category'].isin(categories))
-]
-
-if search_term:
-    filtered_df = filtered_df[filtered_df['product_name'].str.contains(search_term, case=False)]
+# The page shell is drawn before the data arrives; the filters fill their place in the sidebar later
+source_key = product_data.source_key(product_data.source_path())
+start_loading_products(source_key)
+filters = st.sidebar.container()
 
 # Add About section in sidebar
 st.sidebar.markdown("---")  # Add a separator line
@@ -120,230 +112,265 @@ st.sidebar.markdown("""
 **Date:** December 15, 2024
 """)
 
-# Title
-st.title("🛍️ Amazon India Product Analysis")
-
-# Display key metrics based on filtered data
-col1, col2, col3, col4, col5 = st.columns(5)
-with col1:
-    st.metric("Average Rating", f"{filtered_df['rating'].mean():.2f}")
-with col2:
-    st.metric("Median Price", f"₹{filtered_df['actual_price'].median():.0f}")
-with col3:
-    st.metric("Median Discounted Price", f"₹{filtered_df['discounted_price'].median():.0f}")
-with col4:
-    st.metric("Average Discount", f"{filtered_df['discount_percentage'].mean():.1f}%")
-with col5:
-    st.metric("Total Products", f"{len(filtered_df):,}")
-
-# Create tabs for different analyses
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Price Analysis", "Ratings Analysis", "Discount Analysis", "Category Analysis", "Word Analysis"])
-
-with tab1:
-    st.header("Price Analysis")
-    
-    # Price vs Rating scatter plot
-    fig_price_rating = px.scatter(
-        filtered_df,
-        x='actual_price',
-        y='rating',
-        color='broad_category',
-        title='Price vs Rating Distribution',
-        hover_data=['product_name']
-    )
-    st.plotly_chart(fig_price_rating, use_container_width=True)
-    
-    # Price distribution by category
-    fig_price_box = px.box(
-        filtered_df,
-        x='broad_category',
-        y='actual_price',
-        title='Price Distribution by Category'
+# Stages of this rerun, for the performance panel and the logs
+with instrumentation.run('amazon_products', trace_memory=instrumentation.panel_requested(),
+                         tables={"Memory by column": lambda: product_data.memory_report(df_cleaned)}):
+    # Title
+    st.title("🛍️ Amazon India Product Analysis")
+
+    with instrumentation.stage("load products"):
+        df_cleaned, cleaning_report = load_products(source_key)
+        filter_index = load_filter_index(source_key)
+    price_min, price_max = filter_index.bounds['actual_price']
+    rating_min, rating_max = filter_index.bounds['rating']
+
+    # Sidebar filters
+    filters.header("Filters")
+
+    # Price range filter
+    price_range = filters.slider(
+        "Price Range (₹)",
+        min_value=int(price_min),
+        max_value=int(price_max),
+        value=(int(price_min), int(price_max))
     )
-    st.plotly_chart(fig_price_box, use_container_width=True)
 
-with tab2:
-    st.header("Ratings Analysis")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Rating distribution
-        fig_rating_dist = px.histogram(
-            filtered_df,
-            x='rating',
-            nbins=20,
-            title='Overall Rating Distribution'
-        )
-        st.plotly_chart(fig_rating_dist, use_container_width=True)
-    
-    with col2:
-        # Rating vs Number of Reviews
-        fig_rating_count = px.scatter(
-            filtered_df,
-            x='rating_count',
-            y='rating',
-            color='broad_category',
-            title='Rating vs Number of Reviews'
-        )
-        st.plotly_chart(fig_rating_count, use_container_width=True)
-    
-    # New: Ratings by category histograms
-    st.subheader("Rating Distribution by Category")
-    fig_category_ratings = px.histogram(
-        filtered_df,
-        x='rating',
-        color='broad_category',
-        nbins=20,
-        facet_col='broad_category',
-        facet_col_wrap=2,  # Show 2 categories per row
-        title='Rating Distribution by Category'
+    # Rating range filter
+    rating_range = filters.slider(
+        "Rating Range",
+        min_value=float(rating_min),
+        max_value=float(rating_max),
+        value=(float(rating_min), float(rating_max))
     )
-    # Update layout to make it more readable
-    fig_category_ratings.update_layout(
-        height=100 * (len(categories) // 2 + len(categories) % 2) * 2,  # Adjust height based on number of categories
-        showlegend=False
+
+    # Category filter
+    categories = filters.multiselect(
+        "Select Categories",
+        options=filter_index.categories,
+        default=filter_index.categories
     )
-    # Remove repeated axis titles
-    fig_category_ratings.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
-    st.plotly_chart(fig_category_ratings, use_container_width=True)
-
-with tab3:
-    st.header("Discount Analysis")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Discount vs Rating scatter plot
-        fig_discount_rating = px.scatter(
-            filtered_df,
-            x='discount_percentage',
-            y='rating',
-            color='broad_category',
-            title='Discount Percentage vs Rating',
-            hover_data=['product_name']
-        )
-        st.plotly_chart(fig_discount_rating, use_container_width=True)
-    
-    with col2:
-        # Discount vs Rating Count scatter plot
-        fig_discount_count = px.scatter(
-            filtered_df,
-            x='discount_percentage',
-            y='rating_count',
-            color='broad_category',
-            title='Discount Percentage vs Number of Ratings',
-            hover_data=['product_name']
+
+    # Rows the cleaning rules dropped, rather than losing them silently
+    rows_rejected = cleaning_report['rows_read'] - cleaning_report['rows_kept']
+    if rows_rejected:
+        filters.caption(
+            f"{rows_rejected:,} of {cleaning_report['rows_read']:,} products left out: " +
+            ", ".join(f"{count:,} with a non-numeric {rule}"
+                      for rule, count in cleaning_report['rejected'].items() if count)
         )
-        fig_discount_count.update_layout(yaxis_type="log")  # Log scale for rating count
-        st.plotly_chart(fig_discount_count, use_container_width=True)
-    
-    # Box plot of discounts by category
-    fig_discount_box = px.box(
-        filtered_df,
-        x='broad_category',
-        y='discount_percentage',
-        title='Discount Distribution by Category'
-    )
-    st.plotly_chart(fig_discount_box, use_container_width=True)
-
-with tab4:
-    st.header("Category Analysis")
-    
-    # Category statistics
-    category_stats = filtered_df.groupby('broad_category').agg({
-        'rating': 'mean',
-        'rating_count': 'mean',
-        'discount_percentage': 'mean',
-        'actual_price': 'mean'
-    }).round(2)
-    
-    # Display category statistics with better column names
-    category_stats.columns = ['Avg Rating', 'Avg Review Count', 'Avg Discount %', 'Avg Price']
-    st.dataframe(category_stats)
-    
-    # Category distribution
-    category_counts = filtered_df['broad_category'].value_counts().reset_index()
-    category_counts.columns = ['Category', 'Count']
-    
-    fig_category = px.bar(
-        category_counts,
-        x='Category',
-        y='Count',
-        title='Number of Products by Category'
-    )
-    st.plotly_chart(fig_category, use_container_width=True)
-
-with tab5:
-    st.header("Word Analysis (Broken! But the idea is there.)")
-    
-    # Percentile selector
-    percentile = st.slider(
-        "Select percentile for analysis",
-        min_value=5,
-        max_value=25,
-        value=10,
-        help="Products with ratings in the top and bottom X% will be analyzed"
-    )
-    
-    # Add radio button for text source selection
-    text_source = st.radio(
-        "Select text source for analysis",
-        ["Review Content", "Product Description"],
-        help="Choose whether to analyze review content or product descriptions"
-    )
-    
-    # Map radio button selection to column name
-    text_column = 'review_content' if text_source == "Review Content" else 'about_product'
-    
-    # Calculate percentile thresholds for ratings
-    lower_threshold = np.percentile(filtered_df['rating'], percentile)
-    upper_threshold = np.percentile(filtered_df['rating'], 100 - percentile)
-    
-    # Get products in the selected percentiles and ensure they have non-null text content
-    top_products = filtered_df[
-        (filtered_df['rating'] >= upper_threshold) & 
-        (filtered_df[text_column].notna())
-    ]
-    bottom_products = filtered_df[
-        (filtered_df['rating'] <= lower_threshold) & 
-        (filtered_df[text_column].notna())
-    ]
-    
-    # Display the number of products being analyzed
-    st.write(f"Number of products in top {percentile}%: {len(top_products)}")
-    st.write(f"Number of products in bottom {percentile}%: {len(bottom_products)}")
-    
-    col1, col2 = st.columns(2)
-    
+
+    # Search functionality
+    filters.header("Search Products")
+    search_term = filters.text_input("Search by product name")
+    search_descriptions = filters.checkbox("Also search product descriptions")
+    search_columns = ('product_name', 'about_product') if search_descriptions else ('product_name',)
+    # Only the columns being searched are indexed, so an empty search box indexes nothing
+    search_index = None
+    if search_term:
+        search_index = ProductSearchIndex(df_cleaned, search_columns, indexes={
+            column: load_search_index(source_key, column) for column in search_columns})
+
+    # Apply filters to create filtered dataset
+    with instrumentation.stage("filter", len(df_cleaned)):
+        filtered_mask = filter_mask(df_cleaned, price_range, rating_range, categories, search_term,
+                                    search_index=search_index, search_columns=search_columns,
+                                    filter_index=filter_index)
+        # Only the charted columns of the kept rows; the text stays in df_cleaned
+        filtered_df = filtered_view(df_cleaned, filtered_mask)
+
+    # Display key metrics based on filtered data
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.subheader(f"Top {percentile}% Products Word Cloud")
-        st.write(f"Products with ratings >= {upper_threshold:.1f}")
-        if not top_products.empty:
-            combined_text = ' '.join(top_products[text_column])
-            if combined_text.strip():  # Check if there's actual text to analyze
-                fig_top = generate_wordcloud(
-                    [combined_text],
-                    f"Word Cloud of {text_source} for Top {percentile}% Products"
-                )
-                st.pyplot(fig_top)
-            else:
-                st.write("Not enough text data to generate word cloud")
-    
+        st.metric("Average Rating", f"{filtered_df['rating'].mean():.2f}")
     with col2:
-        st.subheader(f"Bottom {percentile}% Products Word Cloud")
-        st.write(f"Products with ratings <= {lower_threshold:.1f}")
-        if not bottom_products.empty:
-            combined_text = ' '.join(bottom_products[text_column])
-            if combined_text.strip():  # Check if there's actual text to analyze
-                fig_bottom = generate_wordcloud(
-                    [combined_text],
-                    f"Word Cloud of {text_source} for Bottom {percentile}% Products"
-                )
-                st.pyplot(fig_bottom)
+        st.metric("Median Price", f"₹{filtered_df['actual_price'].median():.0f}")
+    with col3:
+        st.metric("Median Discounted Price", f"₹{filtered_df['discounted_price'].median():.0f}")
+    with col4:
+        st.metric("Average Discount", f"{filtered_df['discount_percentage'].mean():.1f}%")
+    with col5:
+        st.metric("Total Products", f"{len(filtered_df):,}")
+
+    # Create tabs for different analyses
+    # Tab changes rerun the script, so the Word Analysis tab (and its imports) runs only once it is opened
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["Price Analysis", "Ratings Analysis", "Discount Analysis", "Category Analysis", "Word Analysis"],
+        key="analysis_tab", on_change="rerun"
+    )
+
+    with tab1, instrumentation.stage("Price Analysis tab", len(filtered_df)):
+        st.header("Price Analysis")
+
+        st.plotly_chart(instrumentation.call(product_charts.price_vs_rating, filtered_df), use_container_width=True)
+        st.plotly_chart(instrumentation.call(product_charts.price_by_category, filtered_df), use_container_width=True)
+
+    with tab2, instrumentation.stage("Ratings Analysis tab", len(filtered_df)):
+        st.header("Ratings Analysis")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.plotly_chart(instrumentation.call(product_charts.rating_distribution, filtered_df), use_container_width=True)
+
+        with col2:
+            st.plotly_chart(instrumentation.call(product_charts.rating_vs_reviews, filtered_df), use_container_width=True)
+
+        # New: Ratings by category histograms
+        st.subheader("Rating Distribution by Category")
+        st.plotly_chart(instrumentation.call(product_charts.rating_by_category, filtered_df, len(categories)), use_container_width=True)
+
+    with tab3, instrumentation.stage("Discount Analysis tab", len(filtered_df)):
+        st.header("Discount Analysis")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.plotly_chart(instrumentation.call(product_charts.discount_vs_rating, filtered_df), use_container_width=True)
+
+        with col2:
+            st.plotly_chart(instrumentation.call(product_charts.discount_vs_reviews, filtered_df), use_container_width=True)
+
+        st.plotly_chart(instrumentation.call(product_charts.discount_by_category, filtered_df), use_container_width=True)
+
+    with tab4, instrumentation.stage("Category Analysis tab", len(filtered_df)):
+        st.header("Category Analysis")
+
+        cube = load_category_cube(source_key)
+
+        # Drill down one level of the category path per selectbox
+        node, path = None, []
+        while True:
+            children = cube.children(node)
+            if node is None:
+                children = children[np.isin(cube.nodes['name'].to_numpy()[children], list(categories))]
+            if not len(children):
+                break
+            names = cube.nodes['name'].to_numpy()[children]
+            order = np.argsort(names)
+            choice = st.selectbox(
+                "Category" if node is None else f"Within {path[-1]}",
+                ["All"] + list(names[order]),
+                key=f"category_level_{len(path)}"
+            )
+            if choice == "All":
+                break
+            node = int(children[order][list(names[order]).index(choice)])
+            path.append(choice)
+
+        # Unfiltered by price and search, the precomputed rollups answer directly; otherwise only
+        # the filtered products are rolled up into the same tree
+        with instrumentation.stage("category breakdown", len(filtered_df)):
+            if filter_index.range_mask('actual_price', *price_range) is None and not search_term:
+                stats = cube.breakdown(node, rating_range, top_categories=categories)
             else:
-                st.write("Not enough text data to generate word cloud")
+                stats = CategoryCube.build(filtered_df, template=cube).breakdown(node, rating_range,
+                                                                                 top_categories=categories)
+
+        st.dataframe(stats)
+        st.caption("Medians are estimated from per-category histograms.")
+        st.plotly_chart(instrumentation.call(product_charts.node_counts_chart,
+            stats, "Number of Products by Category" + (f" in {' > '.join(path)}" if path else "")),
+            use_container_width=True)
+
+    if tab5.open:
+        with tab5, instrumentation.stage("Word Analysis tab", len(filtered_df)):
+            st.header("Word Analysis (Broken! But the idea is there.)")
+
+            # Percentile selector
+            percentile = st.slider(
+                "Select percentile for analysis",
+                min_value=5,
+                max_value=25,
+                value=10,
+                help="Products with ratings in the top and bottom X% will be analyzed"
+            )
+
+            # Add radio button for text source selection
+            text_source = st.radio(
+                "Select text source for analysis",
+                ["Review Content", "Product Description"],
+                help="Choose whether to analyze review content or product descriptions"
+            )
+
+            # Map radio button selection to column name
+            text_column = 'review_content' if text_source == "Review Content" else 'about_product'
+
+            # Percentile thresholds from the sorted rating index rather than a sort of the filtered ratings
+            lower_threshold, upper_threshold = filter_index.percentiles('rating', filtered_mask, [percentile, 100 - percentile])
+
+            # Positions of the products in the selected percentiles that have text content
+            with_text = filtered_mask & filter_index.text_present[text_column]
+            top_positions = filter_index.positions_between('rating', upper_threshold, np.inf, with_text)
+            bottom_positions = filter_index.positions_between('rating', -np.inf, lower_threshold, with_text)
+
+            # Display the number of products being analyzed
+            st.write(f"Number of products in top {percentile}%: {len(top_positions)}")
+            st.write(f"Number of products in bottom {percentile}%: {len(bottom_positions)}")
+
+            # Word counts were tokenized once per product; a cloud just sums the selected products' counts
+            token_counts = load_token_counts(source_key, text_column)
+
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.subheader(f"Top {percentile}% Products Word Cloud")
+                st.write(f"Products with ratings >= {upper_threshold:.1f}")
+                if len(top_positions):
+                    frequencies = token_counts.frequencies(top_positions)
+                    if frequencies:  # Check if there's actual text to analyze
+                        with instrumentation.stage("generate_wordcloud", len(top_positions)):
+                            fig_top = generate_wordcloud_from_frequencies(
+                                frequencies,
+                                f"Word Cloud of {text_source} for Top {percentile}% Products"
+                            )
+                        st.pyplot(fig_top)
+                    else:
+                        st.write("Not enough text data to generate word cloud")
+
+            with col2:
+                st.subheader(f"Bottom {percentile}% Products Word Cloud")
+                st.write(f"Products with ratings <= {lower_threshold:.1f}")
+                if len(bottom_positions):
+                    frequencies = token_counts.frequencies(bottom_positions)
+                    if frequencies:  # Check if there's actual text to analyze
+                        with instrumentation.stage("generate_wordcloud", len(bottom_positions)):
+                            fig_bottom = generate_wordcloud_from_frequencies(
+                                frequencies,
+                                f"Word Cloud of {text_source} for Bottom {percentile}% Products"
+                            )
+                        st.pyplot(fig_bottom)
+                    else:
+                        st.write("Not enough text data to generate word cloud")
+
+    # Show raw data with filters, one page at a time
+    st.header("Raw Data")
+    col_columns, col_sort, col_order, col_size, col_page = st.columns([3, 2, 1, 1, 1])
+    with col_columns:
+        raw_columns = st.multiselect("Columns", list(df_cleaned.columns), default=list(df_cleaned.columns))
+    with col_sort:
+        sort_column = st.selectbox("Sort by", [None] + product_table.SORT_COLUMNS,
+                                   format_func=lambda column: "Original order" if column is None else column)
+    with col_order:
+        descending = st.checkbox("Descending")
+    with col_size:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 500], index=1)
+    n_pages = max((len(filtered_df) - 1) // page_size + 1, 1)
+    with col_page:
+        page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1) - 1
+
+    # Only the visible page's columns are sent; long text is cut short until a row is selected
+    with instrumentation.stage("raw data page", len(filtered_df)):
+        positions = product_table.sorted_positions(load_sort_index(source_key), filtered_mask, sort_column, descending)
+        visible = product_table.page_positions(positions, page, page_size)
+        raw_page = st.dataframe(product_table.page_of(df_cleaned, positions, page, page_size, raw_columns),
+                                on_select="rerun", selection_mode="single-row", key="raw_data")
+    st.caption(f"Showing rows {page * page_size + 1:,}-{min((page + 1) * page_size, len(filtered_df)):,} "
+               f"of {len(filtered_df):,}. Select a row to read its full text.")
 
-# Show raw data with filters
-st.header("Raw Data")
-st.dataframe(filtered_df)
+    selected_rows = [row for row in raw_page.selection.rows if row < len(visible)]
+    if selected_rows:
+        position = visible[selected_rows[0]]
+        with st.expander(f"Full text: {df_cleaned['product_name'].iloc[position]}", expanded=True):
+            for column, text in product_table.full_text(df_cleaned, position, raw_columns).items():
+                st.markdown(f"**{column}**")
+                st.text(text)
@@ -0,0 +1,194 @@
+# term_statistics.py precomputes 1-gram and 2-gram counts of the review text across processes.
+#
+#   python amazon_products_dashboard/term_statistics.py --output terms/ --columns review_content,about_product
+#   AMAZON_TERMS=terms/ streamlit run amazon_products_dashboard/streamlit_app.py
+#
+# The cleaned snapshot is read in chunks of --chunk-rows products; each chunk is tokenized and
+# counted in a worker process, and the main process appends the chunk's sparse counts to disk
+# under a growing vocabulary, so memory stays bounded by the chunk size and the vocabulary.
+# Workers count raw tokens; 1-gram plurals are merged once over the full vocabulary at the end,
+# so the output does not depend on --chunk-rows.
+# For every column and n the output directory holds
+#   {column}.{n}gram.counts.parquet      row, term, count  (row = position in the cleaned frame)
+#   {column}.{n}gram.vocabulary.parquet  term, total_count, document_frequency  (term id = row number)
+#   {column}.lengths.parquet             words per product, stopwords included (review_length)
+#   meta.json                            the snapshot the counts were computed from, and the format
+# Kane Williams 2024-Dec-15.
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import product_data
+from product_text import SPLIT_PATTERN, TokenCounts, merge_plurals
+
+CHUNK_ROWS = 50_000
+# Bump when the tokenizer or the files change, so statistics written earlier are not used
+FORMAT_VERSION = 2
+NGRAMS = (1, 2)
+
+COUNTS_SCHEMA = pa.schema([('row', pa.int64()), ('term', pa.int32()), ('count', pa.int32())])
+
+
+def count_chunk(texts, first_row, ngrams=NGRAMS):
+    """Worker: {n: (vocabulary, rows, term indices, counts)} and the word count of every text"""
+    series = pd.Series(texts, dtype=object)
+    result = {}
+    for n in ngrams:
+        # Plurals are merged over the full vocabulary once every chunk is in, not per chunk
+        counts = TokenCounts.build(series, n, plurals=False)
+        rows = np.repeat(np.arange(first_row, first_row + counts.n_rows), np.diff(counts.indptr))
+        result[n] = (counts.vocabulary.tolist(), rows, counts.indices, counts.counts)
+    words = pc.list_value_length(pc.split_pattern_regex(pa.array(texts, type=pa.string()), SPLIT_PATTERN))
+    return result, words.fill_null(0).to_numpy(zero_copy_only=False)
+
+
+class TermWriter:
+    """Appends one column's per-chunk counts to disk under a vocabulary shared by all chunks"""
+
+    def __init__(self, output, column, n):
+        self.path = Path(output) / f"{column}.{n}gram"
+        self.plurals = n == 1
+        self.ids = {}
+        self.total_count = np.zeros(0, dtype=np.int64)
+        self.document_frequency = np.zeros(0, dtype=np.int64)
+        self.writer = pq.ParquetWriter(f"{self.path}.counts.parquet", COUNTS_SCHEMA)
+
+    def append(self, vocabulary, rows, indices, counts):
+        local_to_global = np.array([self.ids.setdefault(term, len(self.ids)) for term in vocabulary], dtype=np.int32)
+        terms = local_to_global[indices] if len(indices) else np.zeros(0, dtype=np.int32)
+        if len(self.ids) > len(self.total_count):
+            grow = len(self.ids) - len(self.total_count)
+            self.total_count = np.append(self.total_count, np.zeros(grow, dtype=np.int64))
+            self.document_frequency = np.append(self.document_frequency, np.zeros(grow, dtype=np.int64))
+        self.total_count += np.bincount(terms, weights=counts, minlength=len(self.ids)).astype(np.int64)
+        self.document_frequency += np.bincount(terms, minlength=len(self.ids))
+        # One row group per chunk, so a product's entries never span two groups
+        self.writer.write_table(pa.table({'row': rows, 'term': terms, 'count': counts}, schema=COUNTS_SCHEMA),
+                                row_group_size=max(len(rows), 1))
+
+    def close(self):
+        self.writer.close()
+        vocabulary = list(self.ids)
+        if self.plurals:
+            vocabulary, merged_into = merge_plurals(vocabulary)
+            self._merge(merged_into, len(vocabulary))
+        pq.write_table(pa.table({
+            'term': pa.array(list(vocabulary), type=pa.string()),
+            'total_count': self.total_count,
+            'document_frequency': self.document_frequency,
+        }), f"{self.path}.vocabulary.parquet")
+
+    def _merge(self, merged_into, n_terms):
+        """Rewrite the counts with every term replaced by the one it merges into, a chunk at a time"""
+        counts_path = Path(f"{self.path}.counts.parquet")
+        unmerged = counts_path.with_name(counts_path.name + '.unmerged')
+        counts_path.replace(unmerged)
+        self.total_count = np.zeros(n_terms, dtype=np.int64)
+        self.document_frequency = np.zeros(n_terms, dtype=np.int64)
+        source = pq.ParquetFile(unmerged)
+        with pq.ParquetWriter(counts_path, COUNTS_SCHEMA) as writer:
+            for group in range(source.num_row_groups):
+                table = source.read_row_group(group)
+                rows = table.column('row').to_numpy()
+                terms = merged_into[table.column('term').to_numpy()]
+                # A product with both 'cable' and 'cables' now has two entries for 'cable'
+                keys, entry = np.unique(rows * n_terms + terms, return_inverse=True)
+                counts = np.bincount(entry, weights=table.column('count').to_numpy(), minlength=len(keys))
+                rows, terms = np.divmod(keys, n_terms)
+                self.total_count += np.bincount(terms, weights=counts, minlength=n_terms).astype(np.int64)
+                self.document_frequency += np.bincount(terms, minlength=n_terms)
+                writer.write_table(pa.table({'row': rows, 'term': terms.astype(np.int32),
+                                             'count': counts.astype(np.int32)}, schema=COUNTS_SCHEMA))
+        unmerged.unlink()
+
+
+def text_chunks(snapshot, column, chunk_rows):
+    for batch in product_data.iter_snapshot(snapshot, [column], chunk_rows):
+        yield batch.column(0).to_pylist()
+
+
+def compute(source, output, columns, workers=None, chunk_rows=CHUNK_ROWS, ngrams=NGRAMS):
+    """Write term statistics of the cleaned products of source into output; returns the meta record"""
+    snapshot = product_data.ensure_snapshot(source)
+    n_rows = product_data.snapshot_rows(snapshot)
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for column in columns:
+            writers = {n: TermWriter(output, column, n) for n in ngrams}
+            lengths = []
+            # Keep a few chunks in flight per worker, and write results in chunk order
+            pending = deque()
+            first_row = 0
+
+            def drain(limit):
+                while len(pending) > limit:
+                    chunk_counts, words = pending.popleft().result()
+                    for n, entries in chunk_counts.items():
+                        writers[n].append(*entries)
+                    lengths.append(words)
+
+            for texts in text_chunks(snapshot, column, chunk_rows):
+                pending.append(pool.submit(count_chunk, texts, first_row, ngrams))
+                first_row += len(texts)
+                drain(2 * workers)
+            drain(0)
+            for writer in writers.values():
+                writer.close()
+            lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+            pq.write_table(pa.table({'words': lengths}), output / f"{column}.lengths.parquet")
+
+    meta = {'format': FORMAT_VERSION, 'snapshot': snapshot.name, 'rows': n_rows, 'columns': list(columns), 'ngrams': list(ngrams)}
+    (output / 'meta.json').write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+def load_counts(output, column, n=1, snapshot=None):
+    """TokenCounts from precomputed statistics, or None if they are missing, older or for another snapshot"""
+    output = Path(output)
+    try:
+        meta = json.loads((output / 'meta.json').read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != FORMAT_VERSION or column not in meta['columns'] or n not in meta['ngrams']:
+        return None
+    if snapshot is not None and meta['snapshot'] != Path(snapshot).name:
+        return None
+    vocabulary = pq.read_table(output / f"{column}.{n}gram.vocabulary.parquet", columns=['term'])
+    entries = pq.read_table(output / f"{column}.{n}gram.counts.parquet", memory_map=True)
+    return TokenCounts.from_entries(
+        vocabulary.column('term').to_pylist(),
+        entries.column('row').to_numpy(), entries.column('term').to_numpy(), entries.column('count').to_numpy(),
+        meta['rows'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute 1-gram/2-gram term statistics of product text")
+    parser.add_argument('--source', help="Amazon export (default: AMAZON_DATA or the workbook)")
+    parser.add_argument('--output', required=True, help="directory for the statistics")
+    parser.add_argument('--columns', default='review_content,about_product')
+    parser.add_argument('--workers', type=int, help="processes (default: one per CPU)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    meta = compute(args.source, args.output, [c.strip() for c in args.columns.split(',')],
+                   workers=args.workers, chunk_rows=args.chunk_rows)
+    print(f"Wrote term statistics for {meta['rows']:,} products to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
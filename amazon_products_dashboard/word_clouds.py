@@ -0,0 +1,51 @@
+# word_clouds.py draws the Word Analysis clouds for streamlit_app.py.
+# wordcloud and matplotlib are imported on the first cloud, not with the app, and the stopwords
+# are NLTK's English list bundled as stopwords_english.txt, so nothing is downloaded at startup.
+# Kane Williams 2024-Dec-15.
+
+from functools import lru_cache
+from pathlib import Path
+
+STOPWORDS_FILE = Path(__file__).resolve().parent / 'stopwords_english.txt'
+
+
+@lru_cache(maxsize=None)
+def stop_words():
+    """NLTK's English stopwords, read once per process"""
+    return frozenset(STOPWORDS_FILE.read_text(encoding='utf-8').split())
+
+
+def wordcloud_figure(wordcloud, title):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis('off')
+    ax.set_title(title)
+    return fig
+
+
+def generate_wordcloud(text_data, title):
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(
+        width=800, 
+        height=400,
+        background_color='white',
+        stopwords=stop_words(),
+        max_words=100
+    ).generate(' '.join(text_data))
+    return wordcloud_figure(wordcloud, title)
+
+
+def generate_wordcloud_from_frequencies(frequencies, title):
+    """The same cloud from precomputed {word: count}, e.g. TokenCounts.frequencies"""
+    from wordcloud import WordCloud
+
+    wordcloud = WordCloud(
+        width=800,
+        height=400,
+        background_color='white',
+        max_words=100
+    ).generate_from_frequencies(frequencies)
+    return wordcloud_figure(wordcloud, title)
@@ -0,0 +1,342 @@
+# run_benchmarks.py times both dashboards' data paths headlessly on synthetic data.
+#
+#   python benchmarks/run_benchmarks.py --sizes 10k,100k --suites outages,products
+#   python benchmarks/run_benchmarks.py --sizes 1M --compare benchmarks/results/<earlier run>.json
+#   python benchmarks/run_benchmarks.py --sizes 100k --suites startup    (time to first paint)
+#
+# Needs the requirements of both dashboards. Every stage is timed (best of --repeat runs) and
+# written to benchmarks/results/ as JSON together with the git commit, so runs from different
+# versions can be compared with --compare.
+# Kane Williams  17-Dec-2024.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use('Agg')  # word clouds are drawn without a display
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'vector_data_engineer_interview'))
+sys.path.insert(0, str(ROOT / 'amazon_products_dashboard'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import synthetic  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+class Recorder:
+    """Times named stages and collects one result record per stage"""
+
+    def __init__(self, suite, rows, repeat):
+        self.suite, self.rows, self.repeat = suite, rows, repeat
+        self.results = []
+
+    def time(self, stage, func, payload=None):
+        """Run func `repeat` times and keep the fastest; payload(result) gives a size in bytes"""
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        self.record(stage, timings, payload(result) if payload is not None else None)
+        return result
+
+    def record(self, stage, timings, size=None):
+        """Keep timings measured elsewhere, e.g. in a subprocess"""
+        record = {'suite': self.suite, 'rows': self.rows, 'stage': stage,
+                  'seconds': min(timings), 'median_seconds': float(np.median(timings))}
+        if size is not None:
+            record['bytes'] = size
+        self.results.append(record)
+        print(f"  {self.suite:<9} {self.rows:>10,} {stage:<28} {record['seconds']:>9.4f}s"
+              + (f"  {record['bytes']:>12,} B" if 'bytes' in record else ''))
+
+
+def figure_bytes(fig):
+    return len(fig.to_json())
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+def bench_outages(n, repeat):
+    import outage_data
+    from outage_intervals import OutageIndex
+    from outage_reliability import ReliabilityRollup
+    from outage_rollups import SuburbDayRollup
+    import outage_table
+    from transformer_outage_dashboard import create_gantt_chart
+
+    rec = Recorder('outages', n, repeat)
+    raw_outages, raw_limits = synthetic.outage_frames(n)
+
+    merged = rec.time('parse_merge', lambda: outage_data.combine(raw_outages, raw_limits))
+    df = merged.assign(end_time=merged['end_time'].fillna(pd.Timestamp.now()))
+
+    # The filters and aggregation main() used to run over raw rows on every rerun
+    lo, hi = df['start_time'].min().date(), df['start_time'].max().date()
+    mid = lo + (hi - lo) / 2
+    suburbs = sorted(df['suburb'].unique())[:4]
+    filtered = rec.time('filter_mask', lambda: df[
+        df['suburb'].isin(suburbs) &
+        (df['start_time'].dt.date >= lo) & (df['start_time'].dt.date <= mid)
+    ])
+    rec.time('groupby_suburb', lambda: filtered.groupby('suburb').agg({
+        'duration_minutes': 'sum', 'duration_limit': 'first'}).reset_index())
+
+    rollup = rec.time('rollup_build', lambda: SuburbDayRollup.from_frame(merged))
+    rec.time('rollup_totals', lambda: rollup.totals(lo, mid, suburbs=suburbs))
+
+    # Rolling reliability windows from running sums, and the cost of closing a few outages
+    reliability = rec.time('reliability_build', lambda: ReliabilityRollup.from_frame(merged, 'transformer_name'))
+    rec.time('reliability_windows', lambda: reliability.windows(hi))
+    closing = merged.tail(10)
+    closed = closing.assign(duration_minutes=closing['duration_minutes'].fillna(0) + 60)
+
+    def close_outages():
+        reliability.replace(closing, closed)
+        reliability.replace(closed, closing)
+        return reliability.windows(hi)
+
+    rec.time('reliability_update', close_outages)
+
+    rec.time('gantt_figure', lambda: create_gantt_chart(filtered), payload=figure_bytes)
+
+    index = rec.time('interval_index_build', lambda: OutageIndex(merged))
+    rec.time('customers_off_supply', lambda: index.customers_off_supply(pd.Timestamp(lo), pd.Timestamp(mid)))
+    rec.time('peak_concurrent', lambda: index.peak_concurrent())
+
+    sort_index = rec.time('sort_index_build', lambda: outage_table.build_sort_index(merged))
+    rec.time('table_page', lambda: outage_table.page_of(
+        df, outage_table.sorted_positions(sort_index, len(df), filtered.index.to_numpy(), 'start_time', True), 0, 50))
+    return rec.results
+
+
+def bench_products(n, repeat, wordcloud=True):
+    from product_categories import CategoryCube
+    from product_cleaning import clean_products, compact
+    from product_filters import ProductFilterIndex, filter_products, filtered_view
+    from product_search import ProductSearchIndex
+    import product_charts
+    import product_table
+
+    rec = Recorder('products', n, repeat)
+    raw = synthetic.product_frame(n)
+
+    cleaned = rec.time('clean', lambda: clean_products(raw), payload=frame_bytes)
+    cleaned = rec.time('compact', lambda: compact(cleaned), payload=frame_bytes)
+
+    price_range = (int(cleaned['actual_price'].min()), int(cleaned['actual_price'].max()))
+    rating_range = (float(cleaned['rating'].min()), float(cleaned['rating'].max()))
+    categories = list(cleaned['broad_category'].unique())
+    filtered = rec.time('filter', lambda: filter_products(cleaned, price_range, rating_range, categories))
+    rec.time('filter_search', lambda: filter_products(cleaned, price_range, rating_range, categories, 'cable'))
+    filter_index = rec.time('filter_index_build', lambda: ProductFilterIndex(cleaned))
+    narrow_price = (price_range[0], price_range[0] + (price_range[1] - price_range[0]) // 10)
+    rec.time('filter_indexed', lambda: filter_index.mask(narrow_price, (3.5, 4.5), categories[:3]))
+    filtered_mask = filter_index.mask(price_range, rating_range, categories)
+    narrow_mask = filter_index.mask(narrow_price, (3.5, 4.5), categories[:3])
+    rec.time('filtered_copy', lambda: cleaned[narrow_mask], payload=frame_bytes)
+    rec.time('filtered_view', lambda: filtered_view(cleaned, narrow_mask), payload=frame_bytes)
+
+    def percentile_rows():
+        lower, upper = np.percentile(filtered['rating'], 10), np.percentile(filtered['rating'], 90)
+        return (filtered[(filtered['rating'] >= upper) & filtered['review_content'].notna()],
+                filtered[(filtered['rating'] <= lower) & filtered['review_content'].notna()])
+
+    def percentile_rows_indexed():
+        lower, upper = filter_index.percentiles('rating', filtered_mask, [10, 90])
+        with_text = filtered_mask & filter_index.text_present['review_content']
+        return (filter_index.positions_between('rating', upper, np.inf, with_text),
+                filter_index.positions_between('rating', -np.inf, lower, with_text))
+
+    rec.time('percentile_rows', percentile_rows)
+    rec.time('percentile_rows_indexed', percentile_rows_indexed)
+    search_index = rec.time('search_index_build', lambda: ProductSearchIndex(cleaned))
+    rec.time('filter_search_indexed', lambda: filter_products(
+        cleaned, price_range, rating_range, categories, 'cable', search_index=search_index))
+
+    sort_index = rec.time('sort_index_build', lambda: product_table.build_sort_index(cleaned))
+    rec.time('table_page', lambda: product_table.page_of(
+        cleaned, product_table.sorted_positions(sort_index, filtered_mask, 'actual_price', True), 0, 50,
+        list(cleaned.columns)))
+
+    rec.time('category_stats', lambda: product_charts.category_stats(filtered))
+    cube = rec.time('category_cube_build', lambda: CategoryCube.build(cleaned))
+    rec.time('category_cube_breakdown', lambda: cube.breakdown(None, (3.5, 4.5), top_categories=categories[:3]))
+    narrow = cleaned[filter_index.mask(narrow_price, rating_range, categories)]
+    rec.time('category_cube_filtered', lambda: CategoryCube.build(narrow, template=cube).breakdown())
+    figures = {
+        'price_vs_rating': product_charts.price_vs_rating,
+        'price_by_category': product_charts.price_by_category,
+        'rating_distribution': product_charts.rating_distribution,
+        'rating_vs_reviews': product_charts.rating_vs_reviews,
+        'rating_by_category': lambda d: product_charts.rating_by_category(d, len(categories)),
+        'discount_vs_rating': product_charts.discount_vs_rating,
+        'discount_vs_reviews': product_charts.discount_vs_reviews,
+        'discount_by_category': product_charts.discount_by_category,
+        'category_counts_chart': product_charts.category_counts_chart,
+    }
+    for name, build in figures.items():
+        rec.time(f'figure_{name}', lambda build=build: build(filtered), payload=figure_bytes)
+
+    if wordcloud:
+        import matplotlib.pyplot as plt
+        from product_text import TokenCounts
+        from word_clouds import generate_wordcloud, generate_wordcloud_from_frequencies
+
+        threshold = np.percentile(filtered['rating'], 90)
+        top = filtered[(filtered['rating'] >= threshold) & filtered['review_content'].notna()]
+
+        def top_decile_cloud():
+            fig = generate_wordcloud([' '.join(top['review_content'])], 'benchmark')
+            plt.close(fig)
+
+        rec.time('wordcloud_top_decile', top_decile_cloud)
+
+        token_counts = rec.time('token_counts_build', lambda: TokenCounts.build(cleaned['review_content']))
+        positions = cleaned.index.get_indexer(top.index)
+        rec.time('token_frequencies_top_decile', lambda: token_counts.frequencies(positions))
+
+        def top_decile_cloud_from_counts():
+            fig = generate_wordcloud_from_frequencies(token_counts.frequencies(positions), 'benchmark')
+            plt.close(fig)
+
+        rec.time('wordcloud_top_decile_counts', top_decile_cloud_from_counts)
+    return rec.results
+
+
+# Runs the Amazon dashboard once in a fresh interpreter and reports when its title was drawn
+FIRST_PAINT_PROBE = """
+import json, sys, time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+painted = []
+draw_title = st.title
+def timed_title(*args, **kwargs):
+    painted.append(time.perf_counter())
+    return draw_title(*args, **kwargs)
+st.title = timed_title
+
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=3600).run()
+print(json.dumps({'first_paint': painted[0] - start if painted else None,
+                  'first_run': time.perf_counter() - start,
+                  'exceptions': [e.value for e in at.exception]}))
+"""
+
+
+def bench_startup(n, repeat):
+    """Cold start of streamlit_app.py on n synthetic products: time to the title, and to a full first run.
+
+    Every repeat is a new process, so imports are cold; the cleaned snapshot is written by the first.
+    """
+    rec = Recorder('startup', n, repeat)
+    app = ROOT / 'amazon_products_dashboard' / 'streamlit_app.py'
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'products.csv'
+        synthetic.product_frame(n).to_csv(source, index=False)
+        env = {**os.environ, 'AMAZON_DATA': str(source)}
+
+        runs = []
+        for _ in range(repeat + 1):
+            out = subprocess.run([sys.executable, '-c', FIRST_PAINT_PROBE, str(app)], cwd=app.parent, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+        if runs[0]['exceptions']:
+            raise RuntimeError(f"streamlit_app.py failed: {runs[0]['exceptions']}")
+    rec.record('first_paint_cold_snapshot', [runs[0]['first_paint']])
+    rec.record('first_run_cold_snapshot', [runs[0]['first_run']])
+    rec.record('first_paint', [r['first_paint'] for r in runs[1:]])
+    rec.record('first_run', [r['first_run'] for r in runs[1:]])
+    return rec.results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the ratio to a baseline run per stage; returns the stages slower than tolerance x"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    before = {(r['suite'], r['rows'], r['stage']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit')}):")
+    for r in results:
+        key = (r['suite'], r['rows'], r['stage'])
+        if key not in before or before[key] == 0:
+            continue
+        ratio = r['seconds'] / before[key]
+        flag = '  REGRESSION' if ratio > tolerance else ''
+        print(f"  {r['suite']:<9} {r['rows']:>10,} {r['stage']:<28} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10k,100k', help="comma-separated row counts, e.g. 10k,100k,1M,10M")
+    parser.add_argument('--suites', default='outages,products')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-wordcloud', action='store_true', help="skip the word-cloud stage")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="with --compare, exit non-zero if a stage is this many times slower")
+    args = parser.parse_args(argv)
+
+    sizes = [synthetic.parse_size(size) for size in args.sizes.split(',')]
+    suites = [suite.strip() for suite in args.suites.split(',')]
+    results = []
+    for n in sizes:
+        if 'outages' in suites:
+            results += bench_outages(n, args.repeat)
+        if 'products' in suites:
+            results += bench_products(n, args.repeat, wordcloud=not args.no_wordcloud)
+        if 'startup' in suites:
+            results += bench_startup(n, args.repeat)
+
+    commit = git_commit()
+    created = datetime.datetime.now().isoformat(timespec='seconds')
+    report = {
+        'created': created,
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{created.replace(':', '')}-{commit or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# synthetic.py generates test data shaped like the two dashboards' inputs, at any size.
+#   outage_frames(n)  -> raw (outages, limits) frames with the columns and text formats load_data reads
+#   product_frame(n)  -> a frame with the columns of "Amazon data Exercise - Kane Williams.xlsx"
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+SUBURBS = ['Ponsonby', 'Albany', 'Remuera', 'Epsom', 'Takapuna', 'Onehunga', 'Mt Eden', 'Grey Lynn',
+           'Howick', 'Henderson', 'Devonport', 'Parnell', 'Newmarket', 'Botany', 'Manurewa', 'Papakura']
+
+CATEGORY_TREE = {
+    'Electronics': {
+        'HomeTheater,TV&Video': ['Televisions|SmartTelevisions', 'Accessories|Cables|HDMICables', 'Projectors'],
+        'Mobiles&Accessories': ['Smartphones&BasicMobiles|Smartphones', 'MobileAccessories|Chargers'],
+        'Headphones,Earbuds&Accessories': ['Headphones|In-Ear', 'Earpads'],
+    },
+    'Computers&Accessories': {
+        'Accessories&Peripherals': ['Cables&Accessories|Cables|USBCables', 'Keyboards,Mice&InputDevices|Mice'],
+        'NetworkingDevices': ['Routers', 'NetworkAdapters|WirelessUSBAdapters'],
+    },
+    'Home&Kitchen': {
+        'Kitchen&HomeAppliances': ['SmallKitchenAppliances|MixerGrinders', 'Vacuum,Cleaning&Ironing|Irons'],
+        'Heating,Cooling&AirQuality': ['WaterHeaters&Geysers|InstantWaterHeaters', 'Fans|CeilingFans'],
+    },
+    'OfficeProducts': {
+        'OfficePaperProducts': ['Paper|Stationery|Pens,Pencils&WritingSupplies|Pens&Refills'],
+    },
+    'MusicalInstruments': {'Microphones': ['Condenser']},
+    'HomeImprovement': {'Electrical': ['Adapters&Multi-Outlets']},
+    'Toys&Games': {'Arts&Crafts': ['Drawing&PaintingSupplies|ColouringPens&Markers']},
+    'Car&Motorbike': {'CarAccessories': ['InteriorAccessories|AirPurifiers&Ionizers']},
+    'Health&PersonalCare': {'HomeMedicalSupplies&Equipment': ['HealthMonitors|WeighingScales']},
+}
+
+WORDS = """good quality product value money great working fine nice charging fast cable durable sound battery
+life easy use price worth buy bad poor broke stopped working after month return replacement delivery
+quick packaging excellent recommend love amazing awesome build average decent cheap expensive light
+heavy screen display clear bright picture remote connect wifi bluetooth app setup install support
+service warranty brand original fake issue problem heating noise loud quiet comfortable fit size
+small large perfect happy satisfied disappointed waste okay better best feature design colour""".split()
+
+
+def parse_size(text):
+    """'10k' -> 10_000, '1M' -> 1_000_000, '250' -> 250"""
+    text = str(text).strip().lower().replace('_', '')
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def outage_frames(n, seed=0, n_suburbs=len(SUBURBS), transformers_per_suburb=40, years=5):
+    """n transformer-outage rows with realistic overlaps, and the matching suburb limits.
+
+    Outages hit 1-5 transformers of one suburb at once (sharing an outage_id and start time),
+    durations are log-normal, about 0.5% are still open, and times use load_data's day-first format.
+    """
+    rng = np.random.default_rng(seed)
+    suburbs = np.array(SUBURBS[:n_suburbs])
+
+    # Outages first, then expand each into the transformers it took down
+    n_outages = max(n // 2, 1)
+    per_outage = rng.integers(1, 6, n_outages)
+    outage_of_row = np.repeat(np.arange(n_outages), per_outage)[:n]
+    if len(outage_of_row) < n:
+        outage_of_row = np.concatenate([outage_of_row, np.arange(len(outage_of_row), n)])
+        n_outages = outage_of_row.max() + 1
+    outage_suburb = rng.integers(0, len(suburbs), n_outages)
+    outage_start = pd.Timestamp('2024-12-17') - pd.to_timedelta(
+        rng.integers(0, years * 365 * 24 * 60, n_outages), unit='min')
+
+    transformer = rng.integers(0, transformers_per_suburb, n)
+    suburb = suburbs[outage_suburb[outage_of_row]]
+    start = outage_start[outage_of_row].floor('min')
+    duration = np.maximum(rng.lognormal(mean=4.0, sigma=0.9, size=n).round(), 1).astype(int)
+    is_open = rng.random(n) < 0.005
+    end = start + pd.to_timedelta(duration, unit='m')
+
+    transformer_names = np.char.add(np.char.add(np.char.upper(np.char.ljust(suburb.astype('<U4'), 4)), ' T'),
+                                    np.char.zfill(transformer.astype(str), 3))
+    df_outages = pd.DataFrame({
+        'outage_id': 12345 + outage_of_row,
+        'suburb': suburb,
+        'transformer_name': transformer_names,
+        'customers_on_transformer': rng.integers(5, 2500, n),
+        'start_time': start.strftime('%d/%m/%Y %H:%M'),
+        'end_time': pd.Series(end.strftime('%d/%m/%Y %H:%M')).where(~is_open, None),
+        'status': np.where(is_open, 'Open', 'Closed'),
+        'duration_minutes': duration,
+    })
+    df_limits = pd.DataFrame({
+        'suburb': suburbs,
+        'duration_limit': rng.integers(1, 20, len(suburbs)) * max(n // len(suburbs), 1) * 5,
+    })
+    return df_outages, df_limits
+
+
+def _category_paths():
+    paths = []
+    for top, middles in CATEGORY_TREE.items():
+        for middle, leaves in middles.items():
+            paths.extend(f"{top}|{middle}|{leaf}" for leaf in leaves)
+    return np.array(paths, dtype=object)
+
+
+def _text(rng, n, sentences_per_row, pool_size=5_000):
+    """Review-like text: rows are built from a pool of random sentences with Zipf-ish word choice"""
+    words = np.array(WORDS, dtype=object)
+    weights = 1 / np.arange(1, len(words) + 1)
+    weights /= weights.sum()
+    pool = np.array([' '.join(rng.choice(words, rng.integers(4, 14), p=weights)).capitalize() + '.'
+                     for _ in range(pool_size)], dtype=object)
+    text = pool[rng.integers(0, pool_size, n)]
+    for _ in range(sentences_per_row - 1):
+        text = text + ' ' + pool[rng.integers(0, pool_size, n)]
+    return text
+
+
+def _rupees(values):
+    """₹ strings with Indian-export style thousands separators, e.g. ₹1,099"""
+    return '₹' + pd.Series(values).map('{:,.0f}'.format)
+
+
+def product_frame(n, seed=0):
+    """n products with the raw column formats of the Excel export.
+
+    Prices are ₹ strings, discount_percentage is mostly fractions with some '64%' strings,
+    a few ratings are the literal '|', and rating_count is comma-grouped text with some gaps.
+    """
+    rng = np.random.default_rng(seed)
+    actual = np.round(np.exp(rng.uniform(np.log(99), np.log(80_000), n)), -1) - 1
+    discount = np.round(rng.beta(2, 2, n), 2)
+    discounted = np.maximum(np.round(actual * (1 - discount)), 39)
+
+    discount_pct = pd.Series(discount, dtype=object)
+    as_text = rng.random(n) < 0.05
+    discount_pct[as_text] = (discount[as_text] * 100).astype(int).astype(str).astype(object) + '%'
+
+    rating = pd.Series(np.round(np.clip(rng.normal(4.1, 0.3, n), 2.0, 5.0), 1).astype(str), dtype=object)
+    rating[rng.random(n) < 0.001] = '|'
+    rating_count = pd.Series(rng.zipf(1.6, n).clip(max=500_000), dtype=object).map('{:,}'.format)
+    rating_count[rng.random(n) < 0.002] = np.nan
+
+    ids = pd.Series(np.arange(n)).map('B{:09d}'.format)
+    names = _text(rng, n, 1, pool_size=2_000)
+    return pd.DataFrame({
+        'product_id': ids,
+        'product_name': names,
+        'category': _category_paths()[rng.integers(0, len(_category_paths()), n)],
+        'discounted_price': _rupees(discounted),
+        'actual_price': _rupees(actual),
+        'discount_percentage': discount_pct,
+        'rating': rating,
+        'rating_count': rating_count,
+        'about_product': _text(rng, n, 3),
+        'user_id': 'AG' + ids,
+        'user_name': 'user' + ids,
+        'review_id': 'R' + ids,
+        'review_title': _text(rng, n, 1, pool_size=500),
+        'review_content': _text(rng, n, 4),
+        'img_link': 'https://m.media-amazon.com/images/I/' + ids + '.jpg',
+        'product_link': 'https://www.amazon.in/dp/' + ids,
+    })
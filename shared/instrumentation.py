@@ -0,0 +1,215 @@
+# instrumentation.py times the stages of a dashboard rerun, for both dashboards.
+# A rerun runs inside run(), which starts a RunProfile; every stage (loading, cleaning, filtering, each figure, ...) is
+# wrapped in stage() and records its wall time, rows processed and, when memory tracing is on,
+# its peak traced memory. tracemalloc is process-wide, so that peak includes whatever other
+# sessions allocated during the stage; tracing runs while any rerun wants it. At the end of the
+# rerun, however it ends, the records are written as one JSON log line per stage and, if it
+# completed, can be shown in a sidebar panel.
+#
+#   DASHBOARD_PROFILE=1            trace memory on every rerun (tracemalloc slows the app down)
+#   DASHBOARD_PROFILE_LOG=<path>   also append the JSON records to this file
+#
+# Kane Williams  17-Dec-2024.
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+logger = logging.getLogger('dashboard.stages')
+
+PANEL_KEY = 'performance_panel'
+
+# The profile of the rerun running in this thread; Streamlit runs each session's script in its own thread
+_current = contextvars.ContextVar('dashboard_profile', default=None)
+
+# The reruns tracing memory, and whether tracing was started for them rather than already on
+_tracing_lock = threading.Lock()
+_tracing = set()
+_started_tracing = False
+
+
+def _start_tracing(profile):
+    global _started_tracing
+    with _tracing_lock:
+        if not _tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing.add(profile)
+
+
+def _stop_tracing(profile):
+    """Stop tracing once the last rerun using it has finished, unless it was on before any did"""
+    global _started_tracing
+    with _tracing_lock:
+        _tracing.discard(profile)
+        if not _tracing and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def _fold_peak():
+    """Record the peak so far in every open stage of every tracing rerun, before it is reset"""
+    peak = tracemalloc.get_traced_memory()[1]
+    for profile in _tracing:
+        for seen in profile._open:
+            seen[1] = max(seen[1], peak)
+
+
+class RunProfile:
+    """Stage records of one dashboard rerun"""
+
+    def __init__(self, dashboard, trace_memory=False):
+        self.dashboard = dashboard
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.records = []
+        self.trace_memory = trace_memory
+        self.status = 'complete'  # or 'interrupted', when the rerun raised or was stopped
+        self._open = []  # [traced memory at the start, peak seen so far] of each open stage, outermost first
+        if trace_memory:
+            _start_tracing(self)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Record the wall time and peak memory of the block; set record['rows'] inside it if rows is unknown"""
+        record = {'stage': name, 'depth': len(self._open), 'rows': rows, 'seconds': None, 'peak_mb': None}
+        if self.trace_memory:
+            # Other sessions reset the same peak, so every reset first hands it to all open stages
+            with _tracing_lock:
+                _fold_peak()
+                tracemalloc.reset_peak()
+                current = tracemalloc.get_traced_memory()[0]
+                self._open.append([current, current])
+        else:
+            self._open.append([0, 0])
+        self.records.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if self.trace_memory:
+                with _tracing_lock:
+                    _fold_peak()
+                    start_memory, seen_peak = self._open.pop()
+                record['peak_mb'] = (seen_peak - start_memory) / 1e6
+            else:
+                self._open.pop()
+
+    def to_frame(self):
+        frame = pd.DataFrame(self.records, columns=['stage', 'depth', 'rows', 'seconds', 'peak_mb'])
+        # Indent nested stages under the stage that contains them
+        frame['stage'] = ['  ' * depth + name for depth, name in zip(frame['depth'], frame['stage'])]
+        return frame.drop(columns='depth')
+
+    def finish(self):
+        """Write one JSON record per stage to the log (and DASHBOARD_PROFILE_LOG) and stop tracing"""
+        if self.trace_memory:
+            _stop_tracing(self)
+        lines = [json.dumps({'dashboard': self.dashboard, 'run_id': self.run_id, 'started': self.started,
+                             'status': self.status, **record})
+                 for record in self.records]
+        for line in lines:
+            logger.info(line)
+        log_path = os.environ.get('DASHBOARD_PROFILE_LOG')
+        if log_path:
+            with open(log_path, 'a') as f:
+                f.write(''.join(line + '\n' for line in lines))
+
+
+def start_run(dashboard, trace_memory=False):
+    """Start profiling this thread's rerun; stages recorded from here on belong to it"""
+    profile = RunProfile(dashboard, trace_memory or os.environ.get('DASHBOARD_PROFILE') == '1')
+    _current.set(profile)
+    return profile
+
+
+def current_run():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """A stage of the current rerun; outside a profiled rerun the block just runs"""
+    profile = _current.get()
+    if profile is None:
+        yield {'stage': name, 'rows': rows}
+        return
+    with profile.stage(name, rows) as record:
+        yield record
+
+
+def timed(name=None):
+    """Decorator: record every call as a stage, with the length of the first argument as its rows"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows = len(args[0]) if args and hasattr(args[0], '__len__') else None
+            with stage(name or func.__name__, rows):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def call(func, *args, **kwargs):
+    """func(*args, **kwargs) recorded as a stage named after func, e.g. a figure builder"""
+    return timed()(func)(*args, **kwargs)
+
+
+@contextlib.contextmanager
+def run(dashboard, trace_memory=False, tables=None):
+    """Profile the rerun in the block, then write its records however the block ends.
+
+    The panel (see debug_panel) is drawn only for a rerun that completed. One that raised, or that
+    Streamlit stopped for a newer rerun when a widget changed, is logged as 'interrupted'.
+    """
+    profile = start_run(dashboard, trace_memory)
+    try:
+        yield profile
+    except BaseException:
+        profile.status = 'interrupted'
+        raise
+    else:
+        debug_panel(profile, tables)
+    finally:
+        profile.finish()
+
+
+def panel_requested():
+    """Whether the sidebar panel is switched on; read at the start of a rerun to trace its memory"""
+    import streamlit as st
+    return bool(st.session_state.get(PANEL_KEY, False))
+
+
+def debug_panel(profile, tables=None):
+    """Optional sidebar panel with the stages of this rerun.
+
+    tables maps a caption to a function returning a frame to show below the stages (e.g. memory
+    by column); the functions are only called when the panel is shown.
+    """
+    import streamlit as st
+    st.sidebar.markdown("---")
+    if not st.sidebar.checkbox("Show performance panel", key=PANEL_KEY):
+        return
+    st.sidebar.header("Performance")
+    frame = profile.to_frame()
+    top_level = [record['seconds'] for record in profile.records if record['depth'] == 0]
+    st.sidebar.caption(f"Run {profile.run_id}: {sum(top_level):.3f} s over {len(top_level)} stages")
+    st.sidebar.dataframe(frame, hide_index=True, column_config={
+        'seconds': st.column_config.NumberColumn(format="%.4f"),
+        'peak_mb': st.column_config.NumberColumn(
+            "peak MB (process)", format="%.1f",
+            help="Peak traced memory of the whole process during the stage, other sessions included"),
+    })
+    for caption, table in (tables or {}).items():
+        st.sidebar.caption(caption)
+        st.sidebar.dataframe(table(), hide_index=True)
@@ -0,0 +1,97 @@
+# reports.py writes static HTML/PNG reports of plotly figures across a process pool, for the
+# report scripts of both dashboards (outage_reports.py, product_reports.py).
+# The dataset is loaded once in the parent and handed to every worker through the pool
+# initializer: with the fork start method the workers share the parent's copy, elsewhere it is
+# pickled once per worker rather than once per report. Each HTML report refers to one
+# plotly.min.js written next to it, so hundreds of reports do not each embed the library.
+# PNG output needs kaleido (pip install kaleido).
+# Kane Williams  17-Dec-2024.
+
+import html
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+FORMATS = ('html', 'png')
+
+_data = None  # the dataset, set once per worker process
+
+
+def slug(text):
+    """File-name-safe form of a suburb or category name"""
+    return re.sub(r'[^a-z0-9]+', '-', str(text).lower()).strip('-') or 'report'
+
+
+def check_formats(formats):
+    """The formats, or ValueError for an unknown one or for PNG without kaleido"""
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"unknown report format(s): {', '.join(sorted(unknown))}")
+    if 'png' in formats:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            raise ValueError("PNG reports need kaleido (pip install kaleido)") from None
+    return list(formats)
+
+
+def write_report(output, name, title, figures, formats):
+    """Write one report: name.html with every figure, and name.<figure>.png per figure"""
+    output = Path(output)
+    written = []
+    if 'html' in formats:
+        body = '\n'.join(f"<h2>{html.escape(caption)}</h2>\n" +
+                         fig.to_html(full_html=False, include_plotlyjs=False)
+                         for caption, fig in figures)
+        path = output / f"{name}.html"
+        path.write_text(
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>\n"
+            f"<script src=\"plotly.min.js\"></script></head>\n"
+            f"<body>\n<h1>{html.escape(title)}</h1>\n{body}\n</body></html>\n", encoding='utf-8')
+        written.append(path)
+    if 'png' in formats:
+        for caption, fig in figures:
+            path = output / f"{name}.{slug(caption)}.png"
+            fig.write_image(path)
+            written.append(path)
+    return written
+
+
+def _init_worker(data):
+    global _data
+    _data = data
+
+
+def _render(render, job, output, formats):
+    name, title, figures = render(_data, job)
+    return name, title, write_report(output, name, title, figures, formats)
+
+
+def export(render, jobs, data, output, formats=('html',), workers=None):
+    """Render every job across a process pool and write its report into output.
+
+    render(data, job) returns (file name, title, [(caption, figure), ...]) and must be a
+    module-level function so the workers can import it. Returns [(name, title, paths)] in job
+    order and writes an index.html linking the HTML reports.
+    """
+    formats = check_formats(formats)
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    if 'html' in formats:
+        from plotly.offline import get_plotlyjs
+        (output / 'plotly.min.js').write_text(get_plotlyjs(), encoding='utf-8')
+
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context,
+                             initializer=_init_worker, initargs=(data,)) as pool:
+        futures = [pool.submit(_render, render, job, output, formats) for job in jobs]
+        reports = [future.result() for future in futures]
+
+    if 'html' in formats:
+        links = '\n'.join(f"<li><a href=\"{name}.html\">{html.escape(title)}</a></li>" for name, title, _ in reports)
+        (output / 'index.html').write_text(
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Reports</title></head>\n"
+            f"<body>\n<ul>\n{links}\n</ul>\n</body></html>\n", encoding='utf-8')
+    return reports
@@ -0,0 +1,9 @@
+# conftest.py puts the dashboards' flat module directories on the path, as the benchmarks do.
+# Kane Williams  17-Dec-2024.
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for directory in ('shared', 'vector_data_engineer_interview', 'amazon_products_dashboard', 'benchmarks'):
+    sys.path.insert(0, str(ROOT / directory))
@@ -0,0 +1,47 @@
+# Memory tracing shared by reruns that overlap, as concurrent sessions do.
+# Kane Williams  17-Dec-2024.
+
+import json
+import tracemalloc
+
+import pytest
+
+import instrumentation
+
+
+def test_overlapping_runs_keep_tracing_and_their_peaks():
+    assert not tracemalloc.is_tracing()
+    first = instrumentation.RunProfile('test', trace_memory=True)
+    second = instrumentation.RunProfile('test', trace_memory=True)
+
+    with first.stage('allocate') as record:
+        block = bytearray(20_000_000)
+        del block
+        # The other rerun starting a stage resets the process-wide peak
+        with second.stage('other'):
+            pass
+    assert record['peak_mb'] >= 20
+
+    # The first rerun to start tracing finishes while the other is still recording
+    first.finish()
+    assert tracemalloc.is_tracing()
+    with second.stage('still traced') as record:
+        pass
+    assert record['peak_mb'] is not None
+    second.finish()
+    assert not tracemalloc.is_tracing()
+
+
+def test_interrupted_run_still_stops_tracing_and_logs(tmp_path, monkeypatch):
+    log = tmp_path / 'stages.jsonl'
+    monkeypatch.setenv('DASHBOARD_PROFILE_LOG', str(log))
+
+    with pytest.raises(RuntimeError):
+        with instrumentation.run('test', trace_memory=True):
+            with instrumentation.stage('load'):
+                raise RuntimeError("widget changed mid-run")
+
+    assert not tracemalloc.is_tracing()
+    assert not instrumentation._tracing
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [(record['stage'], record['status']) for record in records] == [('load', 'interrupted')]
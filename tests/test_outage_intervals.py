@@ -0,0 +1,67 @@
+# Brute-force checks of the customers-off-supply interval index.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+import outage_data
+import synthetic
+from outage_intervals import OutageIndex
+
+
+def customers_off_brute_force(df, t, suburbs=None):
+    """Sum over transformers of the most customers among their rows active at t"""
+    if suburbs is not None:
+        df = df[df['suburb'].isin(suburbs)]
+    active = df[(df['start_time'] <= t) & (df['end_time'].isna() | (df['end_time'] > t))]
+    return active.groupby('transformer_name')['customers_on_transformer'].max().sum()
+
+
+def test_customers_off_at_matches_brute_force():
+    df = outage_data.combine(*synthetic.outage_frames(4_000, n_suburbs=3, transformers_per_suburb=4, years=1))
+    index = OutageIndex(df)
+    rng = np.random.default_rng(1)
+    lo, hi = df['start_time'].min().value, (df['start_time'].max() + pd.Timedelta(days=2)).value
+    probes = list(pd.to_datetime(rng.integers(lo, hi, 300)))
+    probes += list(df['start_time'].sample(100, random_state=1)) + list(df['end_time'].dropna().sample(100, random_state=1))
+    suburbs = sorted(df['suburb'].unique())[:2]
+    for t in probes:
+        assert index.customers_off_at(t) == customers_off_brute_force(df, t)
+        assert index.customers_off_at(t, suburbs) == customers_off_brute_force(df, t, suburbs)
+
+
+def test_overlapping_rows_on_one_transformer_count_the_active_maximum():
+    # KCN ME01: 13 customers all afternoon, 1200 only between 13:00 and 14:00
+    df = outage_data.combine(pd.DataFrame({
+        'outage_id': [1, 2],
+        'suburb': ['Ponsonby', 'Ponsonby'],
+        'transformer_name': ['KCN ME01', 'KCN ME01'],
+        'customers_on_transformer': [13, 1200],
+        'start_time': ['01/09/2024 12:00', '01/09/2024 13:00'],
+        'end_time': ['01/09/2024 18:00', '01/09/2024 14:00'],
+        'status': ['Closed', 'Closed'],
+        'duration_minutes': [360, 60],
+    }), pd.DataFrame({'suburb': ['Ponsonby'], 'duration_limit': [500]}))
+    index = OutageIndex(df)
+    assert index.customers_off_at('2024-09-01 12:30') == 13
+    assert index.customers_off_at('2024-09-01 13:30') == 1200
+    assert index.customers_off_at('2024-09-01 15:00') == 13
+    assert index.customers_off_at('2024-09-01 18:00') == 0
+
+
+def test_peak_concurrent_for_suburbs_without_customer_intervals():
+    # Herne Bay's only outages are zero-length or have no customer count
+    df = outage_data.combine(pd.DataFrame({
+        'outage_id': [1, 2, 3],
+        'suburb': ['Ponsonby', 'Herne Bay', 'Herne Bay'],
+        'transformer_name': ['KCN ME01', 'HB01', 'HB02'],
+        'customers_on_transformer': [13, 40, np.nan],
+        'start_time': ['01/09/2024 12:00', '01/09/2024 12:00', '02/09/2024 08:00'],
+        'end_time': ['01/09/2024 18:00', '01/09/2024 12:00', '02/09/2024 09:00'],
+        'status': ['Closed', 'Closed', 'Closed'],
+        'duration_minutes': [360, 0, 60],
+    }), pd.DataFrame({'suburb': ['Ponsonby', 'Herne Bay'], 'duration_limit': [500, 500]}))
+    peaks = OutageIndex(df).peak_concurrent().set_index('suburb')
+    assert peaks.loc['Herne Bay', 'peak_concurrent_outages'] == 1
+    assert peaks.loc['Herne Bay', 'customers_off_at_peak'] == 0
+    assert peaks.loc['Ponsonby', 'customers_off_at_peak'] == 13
@@ -0,0 +1,72 @@
+# Reliability windows and rolling series against a brute-force groupby over the outages.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+import outage_data
+import synthetic
+from outage_reliability import ReliabilityRollup
+
+
+def brute_force(df, level, start, end):
+    """Customer-minutes, interruptions and outages per key for outages starting in [start, end]"""
+    day = df['start_time'].dt.normalize()
+    rows = df[(day >= pd.Timestamp(start)) & (day <= pd.Timestamp(end))]
+    customers = rows['customers_on_transformer'].fillna(0)
+    return pd.DataFrame({
+        'customer_minutes': customers * rows['duration_minutes'].fillna(0),
+        'customer_interruptions': customers,
+        'outages': 1,
+        level: rows[level],
+    }).groupby(level, observed=True).sum()
+
+
+def test_windows_and_rolling_match_a_groupby():
+    df = outage_data.combine(*synthetic.outage_frames(4_000, n_suburbs=4, transformers_per_suburb=10, years=2))
+    served = df.groupby('transformer_name', observed=True).agg(
+        customers=('customers_on_transformer', 'max'), suburb=('suburb', 'first'))
+
+    for level in ('suburb', 'transformer_name'):
+        rollup = ReliabilityRollup.from_frame(df, level=level)
+        customers = (served['customers'] if level == 'transformer_name'
+                     else served.groupby('suburb')['customers'].sum())
+        end = rollup.last_day()
+        windows = rollup.windows(end)
+        for days, totals in windows.groupby('window_days'):
+            expected = brute_force(df, level, pd.Timestamp(end) - pd.Timedelta(days=days - 1), end)
+            totals = totals.set_index(level)
+            expected = expected.reindex(totals.index, fill_value=0)
+            for measure in ['customer_minutes', 'customer_interruptions', 'outages']:
+                assert np.allclose(totals[measure], expected[measure]), (level, days, measure)
+            assert np.allclose(totals['saidi'], expected['customer_minutes'] / customers.reindex(totals.index))
+
+    # The trailing 30-day SAIFI of one suburb, day by day
+    rollup = ReliabilityRollup.from_frame(df)
+    suburb = sorted(df['suburb'].unique())[0]
+    rolling = rollup.rolling(30, 'saifi', keys=[suburb])[suburb]
+    in_suburb = df[df['suburb'] == suburb]
+    daily = in_suburb.groupby(in_suburb['start_time'].dt.normalize())['customers_on_transformer'].sum()
+    daily = daily.reindex(rolling.index, fill_value=0)
+    expected = daily.rolling(30, min_periods=1).sum() / served.groupby('suburb')['customers'].sum()[suburb]
+    assert np.allclose(rolling.to_numpy(), expected.to_numpy())
+
+
+def test_incremental_updates_match_a_rebuild():
+    df = outage_data.combine(*synthetic.outage_frames(2_000, n_suburbs=3, transformers_per_suburb=8, years=1))
+    df = df.sort_values('start_time', ignore_index=True)
+    early, late = df.iloc[:1_500], df.iloc[1_500:]
+
+    rollup = ReliabilityRollup.from_frame(early)
+    rollup.totals()  # running sums computed before the updates, so only the stale days are redone
+    rollup.apply(late)
+    # Close some outages: longer durations on the same rows
+    closed = df.iloc[::7]
+    rollup.replace(closed, closed.assign(duration_minutes=closed['duration_minutes'].fillna(0) + 60))
+    final = df.copy()
+    final.loc[closed.index, 'duration_minutes'] = closed['duration_minutes'].fillna(0) + 60
+
+    rebuilt = ReliabilityRollup.from_frame(final)
+    start, end = df['start_time'].min().date() + pd.Timedelta(days=40), rollup.last_day()
+    pd.testing.assert_frame_equal(rollup.totals(start, end), rebuilt.totals(start, end))
+    pd.testing.assert_frame_equal(rollup.windows(), rebuilt.windows())
@@ -0,0 +1,26 @@
+# Suburb rollups against a groupby over the rows.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+
+import outage_data
+import synthetic
+from outage_rollups import SuburbDayRollup
+
+
+def test_blank_durations_count_as_zero_and_can_be_replaced():
+    df = outage_data.combine(*synthetic.outage_frames(2_000, years=1))
+    df.loc[df['status'] == 'Open', 'duration_minutes'] = np.nan
+    rollup = SuburbDayRollup.from_frame(df)
+
+    expected = df.groupby('suburb')['duration_minutes'].sum()
+    totals = rollup.totals().set_index('suburb')['duration_minutes']
+    assert np.allclose(totals, expected.reindex(totals.index))
+
+    # Closing the open outages swaps their rows for ones with a duration
+    old = df[df['status'] == 'Open']
+    new = old.assign(duration_minutes=60.0, status='Closed')
+    rollup.replace(old, new)
+    expected = expected.add(new.groupby('suburb')['duration_minutes'].sum(), fill_value=0)
+    totals = rollup.totals().set_index('suburb')['duration_minutes']
+    assert np.allclose(totals, expected.reindex(totals.index))
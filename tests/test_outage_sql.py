@@ -0,0 +1,55 @@
+# The SQL backend against the same questions answered in pandas.
+# Kane Williams  17-Dec-2024.
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import outage_data
+import synthetic
+from outage_sql import OutageSqlStore
+
+
+def test_store_answers_match_pandas_and_close_their_connections(tmp_path, monkeypatch):
+    df_outages, df_limits = synthetic.outage_frames(3_000, n_suburbs=4, years=1)
+    outages_path, limits_path = tmp_path / 'outages.csv', tmp_path / 'limits.csv'
+    df_outages.to_csv(outages_path, index=False)
+    df_limits.to_csv(limits_path, index=False)
+    df = outage_data.combine(df_outages, df_limits)
+
+    connections = []
+    connect = sqlite3.connect
+
+    def tracked_connect(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+    monkeypatch.setattr(sqlite3, 'connect', tracked_connect)
+
+    store = OutageSqlStore.open(outages_path, limits_path, ('outages.csv', 1))
+    assert store.summary() == (df['outage_id'].nunique(), int((df['status'] == 'Open').sum()),
+                               int(df['customers_on_transformer'].sum()))
+
+    suburbs = sorted(df['suburb'].unique())[:2]
+    start, end = df['start_time'].min().date() + pd.Timedelta(days=30), df['start_time'].max().date()
+    in_range = df[df['suburb'].isin(suburbs) & (df['start_time'].dt.date >= start) & (df['start_time'].dt.date <= end)]
+    totals = store.suburb_totals(start, end, suburbs).set_index('suburb')
+    expected = in_range.groupby('suburb')['duration_minutes'].sum()
+    assert np.allclose(totals['duration_minutes'], expected.reindex(totals.index))
+    assert store.count(start, end, suburbs) == len(in_range)
+
+    page = store.page(start, end, suburbs, 'duration_minutes', descending=True, limit=20, offset=10)
+    expected = in_range['duration_minutes'].sort_values(ascending=False).iloc[10:30]
+    assert np.array_equal(page['duration_minutes'].to_numpy(), expected.to_numpy())
+
+    # The database is a SQLite source with both tables too
+    raw_outages, raw_limits = outage_data.read_sqlite(store.path)
+    assert (len(raw_outages), len(raw_limits)) == (len(df_outages), len(df_limits))
+
+    assert connections
+    for conn in connections:
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            continue
+        raise AssertionError("connection left open")
@@ -0,0 +1,114 @@
+# The live outage feed against recomputing from its frame.
+# Kane Williams  17-Dec-2024.
+
+import json
+
+import numpy as np
+import pandas as pd
+
+import outage_data
+import synthetic
+from outage_reliability import ReliabilityRollup
+from outage_rollups import SuburbDayRollup
+from outage_stream import JsonlTail, LiveOutageFeed
+
+
+def make_feed(df, events_path):
+    events_path.touch()
+    reliability = {level: ReliabilityRollup.from_frame(df, level) for level in ('suburb', 'transformer_name')}
+    return LiveOutageFeed(df, SuburbDayRollup.from_frame(df), JsonlTail(events_path), reliability)
+
+
+def append_events(path, events, partial=None):
+    with open(path, 'a') as f:
+        f.write(''.join(json.dumps(event) + '\n' for event in events))
+        if partial is not None:
+            f.write(json.dumps(partial)[:20])
+
+
+def rows_of(frame, outage_id, transformer_name):
+    return frame[(frame['outage_id'] == outage_id) & (frame['transformer_name'] == transformer_name)]
+
+
+def assert_totals_equal(totals, expected, key):
+    totals, expected = totals.set_index(key), expected.set_index(key)
+    assert list(totals.index) == list(expected.index)
+    for column in totals.columns:
+        if pd.api.types.is_numeric_dtype(totals[column]):
+            assert np.allclose(totals[column], expected[column], equal_nan=True), column
+
+
+def test_refreshing_open_durations_keeps_the_frame_version(tmp_path):
+    df = outage_data.combine(*synthetic.outage_frames(2_000, years=1))
+    df.loc[df.index[-5:], 'status'] = 'Open'
+    feed = make_feed(df, tmp_path / 'events.jsonl')
+
+    history_version, n_history, before = feed.frame()
+    version = feed.version
+    now = df['start_time'].max() + pd.Timedelta(days=1)
+    feed.refresh_open_durations(now)
+    after_history_version, after_n_history, after = feed.frame()
+
+    assert (feed.version, after_history_version, after_n_history) == (version, history_version, n_history)
+    live = after.iloc[n_history:]
+    expected = (now - live['start_time']).dt.total_seconds() / 60
+    assert (live['duration_minutes'] == expected).all()
+    # The frame handed out before the refresh is left as it was
+    assert not before.iloc[n_history:]['duration_minutes'].equals(live['duration_minutes'])
+
+
+def test_events_keep_the_rollups_equal_to_a_recompute(tmp_path):
+    df = outage_data.combine(*synthetic.outage_frames(2_000, years=1))
+    df.loc[df.index[-5:], 'status'] = 'Open'
+    events_path = tmp_path / 'events.jsonl'
+    feed = make_feed(df, events_path)
+    still_open, closing, closed = df.iloc[-1], df.iloc[-2], df.iloc[0]
+    now = df['start_time'].max() + pd.Timedelta(days=1)
+
+    append_events(events_path, [
+        {'event': 'open', 'outage_id': 900001, 'transformer_name': 'NEW01', 'suburb': still_open['suburb'],
+         'customers_on_transformer': 50, 'start_time': (now - pd.Timedelta(hours=3)).isoformat()},
+        {'event': 'update', 'outage_id': int(still_open['outage_id']),
+         'transformer_name': still_open['transformer_name'], 'customers_on_transformer': 7},
+        {'event': 'close', 'outage_id': int(closing['outage_id']), 'transformer_name': closing['transformer_name'],
+         'end_time': (closing['start_time'] + pd.Timedelta(minutes=90)).isoformat()},
+        # A closed outage pulled out of the history, and one the feed never saw
+        {'event': 'update', 'outage_id': int(closed['outage_id']), 'transformer_name': closed['transformer_name'],
+         'customers_on_transformer': 1},
+        {'event': 'close', 'outage_id': 1, 'transformer_name': 'UNKNOWN', 'end_time': now.isoformat()},
+    ], partial={'event': 'close', 'outage_id': 900001, 'transformer_name': 'NEW01', 'end_time': now.isoformat()})
+    assert feed.poll(now) == 5
+
+    _, _, frame = feed.frame()
+    new = rows_of(frame, 900001, 'NEW01')
+    assert list(new['status']) == ['Open'] and list(new['duration_minutes']) == [180]
+    updated = rows_of(frame, still_open['outage_id'], still_open['transformer_name'])
+    assert list(updated['customers_on_transformer']) == [7]
+    assert list(rows_of(frame, closing['outage_id'], closing['transformer_name'])['status']) == ['Closed']
+    assert len(frame) == len(df) + 1
+
+    rollup, reliability = feed.readers()
+    assert_totals_equal(rollup.totals(), SuburbDayRollup.from_frame(frame).totals(), 'suburb')
+    for level, level_rollup in reliability.items():
+        assert_totals_equal(level_rollup.totals(), ReliabilityRollup.from_frame(frame, level).totals(), level)
+
+    # The half-written close is applied once its line is complete
+    with open(events_path, 'a') as f:
+        f.write(json.dumps({'event': 'close', 'outage_id': 900001, 'transformer_name': 'NEW01',
+                            'end_time': now.isoformat()})[20:] + '\n')
+    assert feed.poll(now) == 1
+    _, _, frame = feed.frame()
+    new = rows_of(frame, 900001, 'NEW01')
+    assert list(new['status']) == ['Closed'] and list(new['duration_minutes']) == [180]
+    assert_totals_equal(feed.readers()[0].totals(), SuburbDayRollup.from_frame(frame).totals(), 'suburb')
+
+
+def test_jsonl_tail_starts_again_after_truncation(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    tail = JsonlTail(path)
+    assert tail.read() == []
+    append_events(path, [{'n': 1}, {'n': 2}])
+    assert tail.read() == [{'n': 1}, {'n': 2}]
+    assert tail.read() == []
+    path.write_text(json.dumps({'n': 3}) + '\n')
+    assert tail.read() == [{'n': 3}]
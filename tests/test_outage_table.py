@@ -0,0 +1,21 @@
+# Sort orders of the detailed outage table.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+
+import outage_data
+import outage_table
+import synthetic
+
+
+def test_live_sort_index_matches_a_full_sort():
+    df = outage_data.combine(*synthetic.outage_frames(3_000, years=1))
+    # Live rows that tie with history rows and with each other
+    n_history = len(df) - 200
+    df.loc[n_history:, 'duration_minutes'] = df['duration_minutes'].iloc[:200].to_numpy()
+    df.loc[n_history + 100:, 'duration_minutes'] = 60.0
+
+    expected = outage_table.build_sort_index(df)
+    live = outage_table.LiveSortIndex(outage_table.build_sort_index(df.iloc[:n_history]), df, n_history)
+    for column in outage_table.SORT_COLUMNS:
+        assert np.array_equal(live[column], expected[column]), column
@@ -0,0 +1,42 @@
+# The outage timeline: one trace per suburb, WebGL above the threshold, merged bars above the cap.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+import outage_data
+import synthetic
+from transformer_outage_dashboard import GANTT_WEBGL_THRESHOLD, create_gantt_chart
+
+
+def outages(n):
+    df = outage_data.combine(*synthetic.outage_frames(n, n_suburbs=3, transformers_per_suburb=5, years=1))
+    return df.assign(end_time=df['end_time'].fillna(pd.Timestamp.now()))
+
+
+def test_one_bar_trace_per_suburb_with_every_outage():
+    df = outages(500)
+    fig = create_gantt_chart(df)
+    assert sorted(trace.name for trace in fig.data) == sorted(df['suburb'].unique())
+    assert {trace.type for trace in fig.data} == {'bar'}
+    for trace in fig.data:
+        group = df[df['suburb'] == trace.name]
+        assert len(trace.x) == len(group)
+        assert np.array_equal(np.sort(np.asarray(trace.base)),
+                              np.sort(group['start_time'].to_numpy(dtype='datetime64[ms]').astype('int64')))
+
+
+def test_webgl_segments_above_the_threshold():
+    df = outages(GANTT_WEBGL_THRESHOLD + 500)
+    fig = create_gantt_chart(df)
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    assert sum(len(trace.x) for trace in fig.data) == 3 * len(df)
+
+
+def test_merged_bars_above_the_cap_keep_every_outage():
+    df = outages(3_000)
+    fig = create_gantt_chart(df, render_mode='bar', max_bars=300)
+    n_bars = sum(len(trace.x) for trace in fig.data)
+    assert n_bars < len(df)
+    # customdata[4] is the number of outages merged into each bar
+    assert sum(int(np.asarray(trace.customdata)[:, 4].sum()) for trace in fig.data) == len(df)
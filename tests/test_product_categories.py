@@ -0,0 +1,58 @@
+# Category cube drill-downs against a groupby over the products.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+import product_data
+import synthetic
+from product_categories import MEASURES, COLUMN_NAMES, CategoryCube
+
+
+def expected_breakdown(df, path, rating_range=None):
+    """Products and means per child of the node at path, by grouping the rows under it"""
+    df = df[df['category'].notna() & df['rating'].notna()]
+    if rating_range is not None:
+        df = df[df['rating'].between(*rating_range)]
+    depth = len(path)
+    parts = df['category'].str.split('|')
+    under = parts.map(lambda p: len(p) > depth and p[:depth] == path)
+    df = df[under.to_numpy(dtype=bool)]
+    grouped = df.groupby(parts[under.to_numpy(dtype=bool)].str[depth].rename('category'))
+    expected = grouped.size().rename('Products').to_frame()
+    for measure in MEASURES:
+        expected[COLUMN_NAMES[measure]] = grouped[measure].mean().astype('float64').round(2)
+    return expected.sort_index()
+
+
+def test_breakdowns_match_a_groupby(tmp_path):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(3_000).to_csv(source, index=False)
+    df, _ = product_data.load_products(source)
+    cube = CategoryCube.build(df)
+    columns = ['Products'] + [COLUMN_NAMES[measure] for measure in MEASURES]
+
+    top = cube.breakdown()
+    pd.testing.assert_frame_equal(top[columns], expected_breakdown(df, []), check_dtype=False)
+
+    # Drill down the biggest category, then its biggest child
+    path, node = [], None
+    for _ in range(2):
+        name = cube.breakdown(node)['Products'].idxmax()
+        path.append(name)
+        node = cube.node_of_path['|'.join(path)]
+        for rating_range in (None, (3.5, 4.3)):
+            stats = cube.breakdown(node, rating_range)
+            pd.testing.assert_frame_equal(stats[columns], expected_breakdown(df, path, rating_range),
+                                          check_dtype=False)
+            # Medians come from sketches, so they are only bounded by the data
+            assert ((stats['Median Price'] >= 0) & stats['Median Price'].notna()).all()
+
+    # A cube over filtered rows, built on the full cube's tree, matches a groupby of those rows
+    filtered = df[df['actual_price'] < df['actual_price'].median()]
+    filtered_cube = CategoryCube.build(filtered, template=cube)
+    assert filtered_cube.nodes is cube.nodes
+    pd.testing.assert_frame_equal(filtered_cube.breakdown(node)[columns], expected_breakdown(filtered, path),
+                                  check_dtype=False)
+    assert np.array_equal(filtered_cube.counts + CategoryCube.build(df.drop(filtered.index), template=cube).counts,
+                          cube.counts)
@@ -0,0 +1,61 @@
+# Figure modes of the product charts and the summaries drawn in place of the raw rows.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+
+import product_charts
+import product_data
+import synthetic
+
+
+def load(tmp_path, n):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(n).to_csv(source, index=False)
+    df, _ = product_data.load_products(source)
+    return df
+
+
+def test_scatter_switches_mode_with_the_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(product_charts, 'WEBGL_ROWS', 50)
+    monkeypatch.setattr(product_charts, 'DENSITY_ROWS', 500)
+    df = load(tmp_path, 2_000)
+
+    assert product_charts.price_vs_rating(df.head(40)).data[0].type == 'scatter'
+    assert product_charts.price_vs_rating(df.head(400)).data[0].type == 'scattergl'
+    density = product_charts.price_vs_rating(df)
+    assert [trace.type for trace in density.data] == ['heatmap']
+    # Every product with both values lands in one cell
+    finite = df[['actual_price', 'rating']].notna().all(axis=1).sum()
+    assert np.nansum(density.data[0].z) == finite
+
+
+def test_box_stats_match_pandas(tmp_path):
+    df = load(tmp_path, 2_000)
+    stats = product_charts.box_stats(df, 'broad_category', 'actual_price')
+
+    for category, group in df.groupby('broad_category', observed=True)['actual_price']:
+        values = group.dropna()
+        if values.empty:
+            continue
+        q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+        row = stats.loc[category]
+        assert np.allclose([row['q1'], row['median'], row['q3'], row['mean']], [q1, median, q3, values.mean()])
+        fenced = values[values.between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))]
+        assert np.isclose(row['lowerfence'], fenced.min()) and np.isclose(row['upperfence'], fenced.max())
+
+
+def test_binned_counts_match_numpy_histogram(tmp_path):
+    df = load(tmp_path, 2_000)
+    counts, width = product_charts.binned_counts(df, 'rating', 20)
+
+    ratings = df['rating'].dropna().to_numpy(dtype=float)
+    expected, edges = np.histogram(ratings, bins=20)
+    assert np.isclose(width, edges[1] - edges[0])
+    assert np.array_equal(counts.set_index('bin')['count'].reindex(range(20), fill_value=0).to_numpy(), expected)
+
+    by_category = product_charts.binned_counts(df, 'rating', 20, by='broad_category')[0]
+    totals = by_category.groupby('bin')['count'].sum()
+    assert np.array_equal(totals.reindex(range(20), fill_value=0).to_numpy(), expected)
+    per_category = by_category.groupby('broad_category', observed=True)['count'].sum()
+    expected_per_category = df.dropna(subset=['rating']).groupby('broad_category', observed=True).size()
+    assert per_category.sort_index().to_dict() == expected_per_category.sort_index().to_dict()
@@ -0,0 +1,24 @@
+# Snapshots of the cleaned products.
+# Kane Williams  17-Dec-2024.
+
+import pandas as pd
+
+import product_cleaning
+import product_data
+import synthetic
+
+
+def test_snapshot_keeps_text_in_arrow_memory(tmp_path):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(1_000).to_csv(source, index=False)
+    snapshot = product_data.snapshot_path(source, product_data.file_hash(source))
+    report = product_data.write_snapshot(source, snapshot, chunk_rows=300)
+
+    df, loaded_report = product_data.read_snapshot(snapshot)
+    assert loaded_report == report
+    assert len(df) == product_data.snapshot_rows(snapshot)
+    for column in ('product_name', 'about_product', 'review_content'):
+        assert isinstance(df[column].array, pd.arrays.ArrowStringArray), column
+        assert df[column].dtype.storage == 'pyarrow'
+    for column in product_cleaning.CATEGORY_COLUMNS:
+        assert isinstance(df[column].dtype, pd.CategoricalDtype), column
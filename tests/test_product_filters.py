@@ -0,0 +1,59 @@
+# The indexed sidebar filters against scanning the columns.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+
+import product_data
+import synthetic
+from product_filters import ProductFilterIndex, between, filter_mask
+from product_search import ProductSearchIndex
+
+
+def test_indexed_and_scanned_filters_agree(tmp_path):
+    source = tmp_path / 'products.csv'
+    raw = synthetic.product_frame(2_000)
+    raw.loc[:20, 'product_name'] = 'USB-C (2m) cable for c++ coders'
+    raw.to_csv(source, index=False)
+    df, _ = product_data.load_products(source)
+    filter_index = ProductFilterIndex(df)
+    search_index = ProductSearchIndex(df, ('product_name', 'about_product'))
+    categories = list(df['broad_category'].dropna().unique())
+
+    # Bounds taken from float32 values, e.g. a rating of 4.3, land exactly on rows
+    prices = [float(p) for p in df['actual_price'].dropna().sample(3, random_state=1)]
+    ratings = [float(r) for r in df['rating'].dropna().sample(3, random_state=1)]
+    cases = [
+        ((min(prices), max(prices)), (min(ratings), max(ratings)), categories, ''),
+        ((0, 1e9), (0, 5), categories[:2], ''),
+        ((0, 1e9), (ratings[0], ratings[0]), categories, ''),
+        ((0, 1e9), (0, 5), categories, 'c++'),
+        ((0, 1e9), (0, 5), categories, '(2m)'),
+        ((0, 1e9), (0, 5), categories, 'cable'),
+    ]
+    for price_range, rating_range, selected, term in cases:
+        for columns in (('product_name',), ('product_name', 'about_product')):
+            indexed = filter_mask(df, price_range, rating_range, selected, term, search_index=search_index,
+                                  search_columns=columns, filter_index=filter_index)
+            scanned = filter_mask(df, price_range, rating_range, selected, term, search_columns=columns)
+            assert np.array_equal(indexed, scanned), (price_range, rating_range, term, columns)
+
+
+def test_percentiles_and_rows_between_match_a_scan(tmp_path):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(2_000).to_csv(source, index=False)
+    df, _ = product_data.load_products(source)
+    filter_index = ProductFilterIndex(df)
+    ratings = df['rating'].to_numpy(dtype=float)
+
+    rng = np.random.default_rng(0)
+    for mask in (np.ones(len(df), dtype=bool), rng.random(len(df)) < 0.1, np.arange(len(df)) == 7):
+        qs = [0, 5, 25, 50, 90, 100]
+        present = ratings[mask & np.isfinite(ratings)]
+        assert np.allclose(filter_index.percentiles('rating', mask, qs), np.percentile(present, qs))
+
+        low, high = filter_index.percentiles('rating', mask, [25, 75])
+        for bounds in ((high, np.inf), (-np.inf, low), (low, high)):
+            expected = np.flatnonzero(mask & between(df['rating'], *bounds))
+            assert np.array_equal(filter_index.positions_between('rating', *bounds, mask), expected)
+
+    assert all(np.isnan(filter_index.percentiles('rating', np.zeros(len(df), dtype=bool), [10, 90])))
@@ -0,0 +1,22 @@
+# The trigram search index against scanning the text.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+
+import synthetic
+from product_search import ProductSearchIndex, TrigramIndex
+
+
+def test_search_matches_a_literal_scan():
+    df = synthetic.product_frame(2_000)
+    names = TrigramIndex(df['product_name'].reset_index(drop=True))
+    index = ProductSearchIndex(df, ('product_name', 'about_product'), indexes={'product_name': names})
+    assert index.indexes['product_name'] is names
+
+    for term in ['cable', 'USB', 'usb c', 'ca', 'zzzz', 'c++', '(']:
+        expected = np.zeros(len(df), dtype=bool)
+        for column in ('product_name', 'about_product'):
+            expected |= df[column].str.contains(term, case=False, regex=False, na=False).to_numpy()
+        assert np.array_equal(index.mask(term, ('product_name', 'about_product')), expected), term
+        only_names = df['product_name'].str.contains(term, case=False, regex=False, na=False).to_numpy()
+        assert np.array_equal(index.mask(term), only_names), term
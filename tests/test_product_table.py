@@ -0,0 +1,31 @@
+# Paging of the Raw Data table against sorting the filtered frame.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+
+import product_data
+import product_table
+import synthetic
+
+
+def test_page_matches_sorting_the_filtered_rows(tmp_path):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(1_000).to_csv(source, index=False)
+    df, _ = product_data.load_products(source)
+    sort_index = product_table.build_sort_index(df)
+    mask = (df['rating'] >= 4).to_numpy()
+    columns = ['product_name', 'actual_price', 'broad_category', 'about_product']
+
+    positions = product_table.sorted_positions(sort_index, mask, 'actual_price', descending=True)
+    page = product_table.page_of(df, positions, 1, 25, columns).to_pandas()
+
+    expected = df[mask].sort_values('actual_price', ascending=False, kind='stable')
+    assert np.array_equal(np.sort(positions), np.flatnonzero(mask))
+    assert np.array_equal(df['actual_price'].to_numpy()[positions], expected['actual_price'].to_numpy())
+    assert list(page.columns) == columns
+    assert np.array_equal(page['actual_price'].to_numpy(), df['actual_price'].to_numpy()[positions[25:50]])
+    assert page['about_product'].str.len().max() <= product_table.TEXT_CHARS + 1
+    cut = page['about_product'].str.endswith('…')
+    first = positions[25:50][cut.to_numpy()][0]
+    text = product_table.full_text(df, first, columns)['about_product']
+    assert text.startswith(page['about_product'][cut].iloc[0][:-1])
@@ -0,0 +1,27 @@
+# Word counts for the clouds against WordCloud's own counting of the joined text.
+# Kane Williams  17-Dec-2024.
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from wordcloud import WordCloud
+
+import synthetic
+from product_text import TokenCounts
+from word_clouds import stop_words
+
+
+def test_frequencies_match_wordcloud_process_text():
+    texts = synthetic.product_frame(400)['review_content'].copy()
+    texts.iloc[:4] = ["Cables and cable, it's the cable's 2 USB-C cables!", None,
+                      "Glass glasses: the boss's bosses' 100 chargers", "Charger CHARGER charger's"]
+    counts = TokenCounts.build(pd.Series(texts, dtype=object))
+
+    for rows in (np.arange(len(texts)), np.arange(0, len(texts), 3)):
+        expected = Counter()
+        processed = WordCloud(stopwords=stop_words(), collocations=False).process_text(
+            ' '.join(texts.iloc[rows].dropna()))
+        for word, count in processed.items():
+            expected[word.lower()] += count
+        assert counts.frequencies(rows, max_words=10_000) == dict(expected)
@@ -0,0 +1,60 @@
+# The static report scripts of both dashboards, run across a one-process pool.
+# Kane Williams  17-Dec-2024.
+
+import re
+
+import pytest
+
+import outage_reports
+import product_reports
+import reports
+import synthetic
+
+
+def linked_reports(output):
+    """File names linked from index.html"""
+    return re.findall(r'<a href="([^"]+)">', (output / 'index.html').read_text(encoding='utf-8'))
+
+
+def test_product_reports_cover_every_category(tmp_path, capsys):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(300).to_csv(source, index=False)
+    output = tmp_path / 'reports'
+
+    assert product_reports.main(['--source', str(source), '--output', str(output), '--workers', '1']) == 0
+
+    df_cleaned, _ = product_reports.load(source)
+    categories = sorted(df_cleaned['broad_category'].dropna().unique())
+    expected = ['all-categories.html'] + [f"category-{reports.slug(category)}.html" for category in categories]
+    assert linked_reports(output) == expected
+    assert (output / 'plotly.min.js').exists()
+    for name in expected:
+        page = (output / name).read_text(encoding='utf-8')
+        assert '<script src="plotly.min.js"></script>' in page
+        assert page.count('<h2>') >= 8
+    assert f"Wrote {len(expected)} reports" in capsys.readouterr().out
+
+
+def test_outage_reports_cover_every_suburb(tmp_path, monkeypatch):
+    df_outages, df_limits = synthetic.outage_frames(500, n_suburbs=3, transformers_per_suburb=5, years=1)
+    outages_path, limits_path = tmp_path / 'outages.csv', tmp_path / 'limits.csv'
+    df_outages.to_csv(outages_path, index=False)
+    df_limits.to_csv(limits_path, index=False)
+    monkeypatch.setenv('OUTAGE_DATA', str(outages_path))
+    monkeypatch.setenv('OUTAGE_LIMITS', str(limits_path))
+    output = tmp_path / 'reports'
+
+    assert outage_reports.main(['--output', str(output), '--workers', '1']) == 0
+
+    suburbs = sorted(df_outages['suburb'].unique())
+    expected = ['all-suburbs.html'] + [f"suburb-{reports.slug(suburb)}.html" for suburb in suburbs]
+    assert linked_reports(output) == expected
+    for suburb in suburbs:
+        page = (output / f"suburb-{reports.slug(suburb)}.html").read_text(encoding='utf-8')
+        assert f"<h1>Outages in {suburb}</h1>" in page
+
+
+def test_unknown_formats_are_rejected():
+    with pytest.raises(ValueError, match='unknown report format'):
+        reports.check_formats(['html', 'pdf'])
+    assert reports.check_formats(['html']) == ['html']
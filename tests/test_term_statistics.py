@@ -0,0 +1,58 @@
+# Smoke test of the term statistics pipeline over the snapshot of a small export.
+# Kane Williams  17-Dec-2024.
+
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import product_data
+import synthetic
+import term_statistics
+from product_text import TokenCounts
+
+
+def test_compute_matches_counts_of_the_cleaned_frame(tmp_path):
+    source = tmp_path / 'products.csv'
+    synthetic.product_frame(300).to_csv(source, index=False)
+
+    meta = term_statistics.compute(source, tmp_path / 'terms', ['review_content'], workers=1, chunk_rows=64)
+
+    df_cleaned, _ = product_data.load_products(source)
+    assert meta['rows'] == len(df_cleaned)
+    snapshot = product_data.ensure_snapshot(source)
+    loaded = term_statistics.load_counts(tmp_path / 'terms', 'review_content', snapshot=snapshot)
+    expected = TokenCounts.build(df_cleaned['review_content'])
+    rows = np.arange(len(df_cleaned))
+    assert loaded.frequencies(rows) == expected.frequencies(rows)
+    assert (tmp_path / 'terms' / 'review_content.lengths.parquet').exists()
+
+    # Statistics in an older format are not used
+    meta_path = tmp_path / 'terms' / 'meta.json'
+    meta_path.write_text(json.dumps({**meta, 'format': term_statistics.FORMAT_VERSION - 1}))
+    assert term_statistics.load_counts(tmp_path / 'terms', 'review_content', snapshot=snapshot) is None
+
+
+def test_output_does_not_depend_on_chunk_rows(tmp_path):
+    # Early chunks only see 'widget', later ones only 'widgets'; a few products have both
+    df = synthetic.product_frame(300)
+    df['review_content'] = ['widget and widgets' if i % 50 == 0 else 'great widget' if i < 150 else 'great widgets'
+                            for i in range(len(df))]
+    source = tmp_path / 'products.csv'
+    df.to_csv(source, index=False)
+
+    outputs = []
+    for chunk_rows in (40, 1_000):
+        output = tmp_path / f"terms-{chunk_rows}"
+        term_statistics.compute(source, output, ['review_content'], workers=1, chunk_rows=chunk_rows)
+        vocabulary = pq.read_table(output / 'review_content.1gram.vocabulary.parquet').to_pandas()
+        counts = pq.read_table(output / 'review_content.1gram.counts.parquet').to_pandas()
+        counts['term'] = vocabulary['term'].to_numpy()[counts['term']]
+        outputs.append((vocabulary.sort_values('term', ignore_index=True),
+                        counts.sort_values(['row', 'term'], ignore_index=True)))
+
+    (vocabulary, counts), (other_vocabulary, other_counts) = outputs
+    pd.testing.assert_frame_equal(vocabulary, other_vocabulary)
+    pd.testing.assert_frame_equal(counts, other_counts)
+    assert 'widgets' not in set(vocabulary['term'])
@@ -0,0 +1,125 @@
+# outage_data.py is the data-source layer for transformer_outage_dashboard.py.
+# Outages and suburb limits can come from the built-in sample, a CSV/Parquet file pair,
+# or a local SQLite database holding an `outages` and a `suburb_limits` table.
+# Kane Williams  17-Dec-2024.
+
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+TIME_FORMAT = '%d/%m/%Y %H:%M'
+
+OUTAGE_COLUMNS = ['outage_id', 'suburb', 'transformer_name', 'customers_on_transformer',
+                  'start_time', 'end_time', 'status', 'duration_minutes']
+LIMIT_COLUMNS = ['suburb', 'duration_limit']
+
+SQLITE_SUFFIXES = {'.db', '.sqlite', '.sqlite3'}
+
+
+def sample_frames():
+    """The six outages and three suburb limits from the interview question"""
+    # Outage data
+    df_q3 = {
+        'outage_id': [12345, 12346, 12347, 12347, 12347, 13349],
+        'suburb': ['Ponsonby', 'Albany', 'Remuera', 'Remuera', 'Remuera', 'Ponsonby'],
+        'transformer_name': ['KCN ME01', 'KNN CEP1', 'REMU MK01', 'REMU MK09', 'REMU MU78', 'KCN ME01'],
+        'customers_on_transformer': [1200, 500, 30, 2000, 100, 13],
+        'start_time': ['25/06/2024 8:00', '25/07/2024 8:30', '27/08/2024 8:30', '27/08/2024 8:30',
+                       '27/08/2024 8:30', '31/08/2024 20:00'],
+        'end_time': ['25/06/2024 9:00', '25/07/2024 10:30', '27/08/2024 10:30', '27/08/2024 9:00',
+                     '27/08/2024 8:50', None],
+        'status': ['Closed', 'Closed', 'Closed', 'Closed', 'Closed', 'Open'],
+        'duration_minutes': [60, 120, 120, 30, 20, 300]
+    }
+
+    # Suburb limits data
+    df_q4 = {
+        'suburb': ['Ponsonby', 'Albany', 'Remuera'],
+        'duration_limit': [500, 100, 150]
+    }
+
+    return pd.DataFrame(df_q3), pd.DataFrame(df_q4)
+
+
+def parse_times(series):
+    """Parse a timestamp column once; columns that are already datetimes pass straight through"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    try:
+        return pd.to_datetime(series, format=TIME_FORMAT)
+    except ValueError:
+        # Exports from other systems are usually ISO 8601 rather than the NZ day-first format
+        return pd.to_datetime(series, format='ISO8601')
+
+
+def read_table(path):
+    """Read a CSV or Parquet file into a DataFrame, picking the reader from the suffix"""
+    path = Path(path)
+    if path.suffix.lower() == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def read_sqlite(path, outages_table='outages', limits_table='suburb_limits'):
+    """Read both tables from a local SQLite file"""
+    with closing(sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)) as conn:
+        df_outages = pd.read_sql_query(f"SELECT * FROM {outages_table}", conn)
+        df_limits = pd.read_sql_query(f"SELECT * FROM {limits_table}", conn)
+    return df_outages, df_limits
+
+
+def read_source(outages_path=None, limits_path=None):
+    """Return raw (outages, limits) frames for the given source; no paths means the sample data"""
+    if outages_path is None:
+        return sample_frames()
+    if Path(outages_path).suffix.lower() in SQLITE_SUFFIXES:
+        return read_sqlite(outages_path)
+    if limits_path is None:
+        raise ValueError("A limits file is required alongside a CSV/Parquet outages file")
+    return read_table(outages_path), read_table(limits_path)
+
+
+def combine(df_outages, df_limits):
+    """Parse timestamps and join outages to their suburb limits.
+
+    Open outages keep a missing end_time here so that a cached frame never freezes "now";
+    callers fill it at display time.
+    """
+    df_outages = df_outages[OUTAGE_COLUMNS].copy()
+    df_outages['start_time'] = parse_times(df_outages['start_time'])
+    df_outages['end_time'] = parse_times(df_outages['end_time'])
+
+    # Join the dataframes
+    return pd.merge(df_outages, df_limits[LIMIT_COLUMNS], on='suburb', how='left')
+
+
+def source_paths():
+    """Source paths configured through OUTAGE_DATA / OUTAGE_LIMITS, or (None, None) for the sample"""
+    return os.environ.get('OUTAGE_DATA'), os.environ.get('OUTAGE_LIMITS')
+
+
+def fingerprint(paths, use_hash=False):
+    """A cache key that changes only when a source file changes.
+
+    By default this is each file's mtime and size, which costs one stat() per rerun.
+    With use_hash the file contents are hashed instead, for sources whose mtime is unreliable
+    (e.g. files restored from a copy).
+    """
+    key = []
+    for path in paths:
+        if path is None:
+            continue
+        if use_hash:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            key.append((str(path), digest.hexdigest()))
+        else:
+            stat = os.stat(path)
+            key.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(key)
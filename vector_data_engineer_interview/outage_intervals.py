@@ -0,0 +1,309 @@
+# outage_intervals.py answers "what was off supply at time t" questions for transformer_outage_dashboard.py.
+# Outages are half-open [start_time, end_time) intervals; open outages (no end_time) run forever.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+OPEN = np.iinfo(np.int64).max  # end of an outage that has not closed yet
+
+
+def to_ns(values):
+    """Timestamps (scalar or array-like) as int64 nanoseconds, with NaT mapped to OPEN"""
+    if np.isscalar(values) or isinstance(values, (pd.Timestamp, np.datetime64)):
+        ts = pd.Timestamp(values)
+        return OPEN if pd.isna(ts) else ts.as_unit('ns').value
+    times = pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]')
+    ns = times.view('int64').copy()
+    ns[np.isnat(times)] = OPEN
+    return ns
+
+
+def merge_overlaps(df, keys):
+    """Collapse overlapping rows with the same keys into one interval per overlapping run.
+
+    Three transformers on outage 12347 are three rows but one outage, in progress while any of
+    them is.
+    """
+    df = df.assign(start_ns=to_ns(df['start_time']), end_ns=to_ns(df['end_time']))
+    df = df.sort_values(keys + ['start_ns'], kind='stable')
+    # A new run starts wherever a row begins after everything before it (in its group) has ended
+    run_end = df.groupby(keys, sort=False, observed=True)['end_ns'].cummax()
+    prev_end = run_end.groupby([df[k] for k in keys], sort=False, observed=True).shift()
+    new_run = prev_end.isna() | (df['start_ns'] >= prev_end)
+    run_id = new_run.cumsum()
+    first_columns = dict.fromkeys(keys + ['suburb'])
+    return df.groupby(run_id, sort=False).agg(
+        **{k: (k, 'first') for k in first_columns},
+        start_ns=('start_ns', 'min'),
+        end_ns=('end_ns', 'max'),
+        customers_on_transformer=('customers_on_transformer', 'max')
+    ).reset_index(drop=True)
+
+
+def range_max(lo, hi, values, size):
+    """Per slot in [0, size), the largest value of the ranges [lo, hi) covering it (0 if none).
+
+    All ranges are applied at once to a segment tree: each range is split into its O(log size)
+    canonical nodes level by level, then node values are pushed down to the leaves.
+    """
+    leaves = 1 << max(int(size - 1).bit_length(), 0)
+    tree = np.zeros(2 * leaves)
+    lo = np.asarray(lo, dtype=np.int64) + leaves
+    hi = np.asarray(hi, dtype=np.int64) + leaves
+    values = np.asarray(values, dtype=float)
+    active = lo < hi
+    while active.any():
+        left = active & (lo & 1 == 1)
+        np.maximum.at(tree, lo[left], values[left])
+        lo = lo + left
+        right = active & (hi & 1 == 1)
+        hi = hi - right
+        np.maximum.at(tree, hi[right], values[right])
+        lo, hi = lo >> 1, hi >> 1
+        active = lo < hi
+    for level in range(leaves.bit_length() - 1):
+        nodes = np.arange(1 << level, 2 << level)
+        tree[2 * nodes] = np.maximum(tree[2 * nodes], tree[nodes])
+        tree[2 * nodes + 1] = np.maximum(tree[2 * nodes + 1], tree[nodes])
+    return tree[leaves:leaves + size]
+
+
+def transformer_levels(df):
+    """Customers off supply per transformer as non-overlapping intervals.
+
+    A transformer's timeline is cut at every start and end of its rows, and each piece carries
+    the most customers among the rows active on it: overlapping rows count the transformer's
+    customers once, but a 13-customer outage overlapping a 1200-customer one counts 1200 only
+    while that one lasts. Consecutive pieces with the same customers are joined.
+    """
+    codes, names = pd.factorize(df['transformer_name'])
+    start, end = to_ns(df['start_time']), to_ns(df['end_time'])
+    customers = np.nan_to_num(df['customers_on_transformer'].to_numpy(dtype=float))
+    valid = (codes >= 0) & (end > start)
+    codes, start, end, customers = codes[valid], start[valid], end[valid], customers[valid]
+
+    # Boundaries: the distinct (transformer, time) pairs, sorted; piece i runs from boundary i to i + 1.
+    # Each row covers the pieces from its start's boundary up to its end's
+    point_codes = np.concatenate([codes, codes])
+    points = np.concatenate([start, end])
+    order = np.lexsort((points, point_codes))
+    point_codes, points = point_codes[order], points[order]
+    distinct = np.append(True, (point_codes[1:] != point_codes[:-1]) | (points[1:] != points[:-1]))
+    boundary = np.empty(len(order), dtype=np.int64)
+    boundary[order] = np.cumsum(distinct) - 1
+    point_codes, points = point_codes[distinct], points[distinct]
+    level = range_max(boundary[:len(start)], boundary[len(start):], customers, len(points))
+
+    # A piece lies between consecutive boundaries of one transformer; idle pieces are dropped and
+    # neighbours with the same customers joined
+    pieces = np.flatnonzero(np.append(point_codes[1:] == point_codes[:-1], False) & (level > 0))
+    joined = np.ones(len(pieces), dtype=bool)
+    joined[1:] = ((pieces[1:] != pieces[:-1] + 1) | (level[pieces[1:]] != level[pieces[:-1]]))
+    first = pieces[joined]
+    last = pieces[np.append(np.flatnonzero(joined)[1:], len(pieces)) - 1]
+
+    suburb_of = df.groupby('transformer_name', sort=False, observed=True)['suburb'].first()
+    transformer = names[point_codes[first]]
+    return pd.DataFrame({
+        'transformer_name': transformer,
+        'suburb': suburb_of.reindex(transformer).to_numpy(),
+        'start_ns': points[first],
+        'end_ns': points[last + 1],
+        'customers_on_transformer': level[first],
+    })
+
+
+class IntervalIndex:
+    """Sorted-endpoint index over weighted half-open intervals.
+
+    Counts and weight sums at a point or over a window are two binary searches each.
+    Listing the intervals themselves uses length classes (powers of two), so only starts
+    within one class length of the window are inspected.
+    """
+
+    def __init__(self, starts, ends, weights=None):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        weights = np.ones(len(starts)) if weights is None else np.asarray(weights, dtype=float)
+
+        start_order = np.argsort(starts, kind='stable')
+        end_order = np.argsort(ends, kind='stable')
+        self.starts = starts[start_order]
+        self.ends = ends[end_order]
+        self.start_weight = np.concatenate([[0.0], np.cumsum(weights[start_order])])
+        self.end_weight = np.concatenate([[0.0], np.cumsum(weights[end_order])])
+        self._raw = (starts, ends, weights)
+        self._sweep = None
+
+        # Length classes for listing queries; open intervals get their own class (-1)
+        lengths = np.where(ends == OPEN, -1, ends - starts)
+        classes = np.where(lengths < 0, -1, np.log2(np.maximum(lengths, 1)).astype(int))
+        order = np.lexsort((starts, classes))
+        bounds = np.flatnonzero(np.diff(classes[order])) + 1
+        self._classes = []
+        for members in np.split(order, bounds):
+            if len(members) == 0:
+                continue
+            length_class = classes[members[0]]
+            max_length = None if length_class < 0 else 2 ** (int(length_class) + 1)
+            self._classes.append((max_length, members, starts[members], ends[members]))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def count_at(self, t):
+        """Intervals active at t (t may be an array of int64 ns)"""
+        return (np.searchsorted(self.starts, t, side='right') -
+                np.searchsorted(self.ends, t, side='right'))
+
+    def weight_at(self, t):
+        """Sum of weights of the intervals active at t"""
+        return (self.start_weight[np.searchsorted(self.starts, t, side='right')] -
+                self.end_weight[np.searchsorted(self.ends, t, side='right')])
+
+    def count_overlapping(self, a, b):
+        """Intervals that overlap the window [a, b)"""
+        return np.searchsorted(self.starts, b, side='left') - np.searchsorted(self.ends, a, side='right')
+
+    def weight_overlapping(self, a, b):
+        """Sum of weights of the intervals that overlap the window [a, b)"""
+        return (self.start_weight[np.searchsorted(self.starts, b, side='left')] -
+                self.end_weight[np.searchsorted(self.ends, a, side='right')])
+
+    def overlapping(self, a, b):
+        """Positions (in construction order) of the intervals overlapping [a, b)"""
+        found = []
+        for max_length, members, starts, ends in self._classes:
+            lo = 0 if max_length is None else np.searchsorted(starts, a - max_length, side='left')
+            hi = np.searchsorted(starts, b, side='left')
+            hits = ends[lo:hi] > a
+            found.append(members[lo:hi][hits])
+        return np.sort(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+    def sweep(self):
+        """Sweep-line pass: the event times and the active (count, weight) just after each.
+
+        The index never changes, so the pass is made once and kept.
+        """
+        if self._sweep is not None:
+            return self._sweep
+        starts, ends, weights = self._raw
+        closed = ends != OPEN
+        times = np.concatenate([starts, ends[closed]])
+        count_delta = np.concatenate([np.ones(len(starts)), -np.ones(closed.sum())])
+        weight_delta = np.concatenate([weights, -weights[closed]])
+        # Ends sort before starts at the same instant, since intervals are half-open
+        order = np.lexsort((count_delta, times))
+        times = times[order]
+        counts = np.cumsum(count_delta[order])
+        levels = np.cumsum(weight_delta[order])
+        # Keep the level after the last event at each instant
+        last = np.append(times[1:] != times[:-1], True)
+        self._sweep = times[last], counts[last].astype(np.int64), levels[last]
+        return self._sweep
+
+    def peak(self):
+        """(peak count, time it was first reached, weight at that time)"""
+        times, counts, levels = self.sweep()
+        if len(times) == 0:
+            return 0, None, 0.0
+        i = int(np.argmax(counts))
+        return int(counts[i]), times[i], float(levels[i])
+
+
+def bucket_max(times, levels, edges, level_at_edges):
+    """Highest level reached in each bucket [edges[i], edges[i + 1]) of a step function"""
+    peaks = np.asarray(level_at_edges[:-1], dtype=float).copy()
+    first = np.searchsorted(times, edges[:-1], side='left')
+    last = np.searchsorted(times, edges[1:], side='left')
+    has_events = last > first
+    if has_events.any():
+        # reduceat over interleaved [first, last) pairs; the sentinel keeps `last` a valid index
+        bounds = np.column_stack([first[has_events], last[has_events]]).ravel()
+        segment_max = np.maximum.reduceat(np.append(levels, -np.inf), bounds)[0::2]
+        peaks[has_events] = np.maximum(peaks[has_events], segment_max)
+    return peaks
+
+
+class OutageIndex:
+    """Interval indexes over an outage frame, overall and per suburb.
+
+    Customers are counted per transformer (the most customers among its active rows, see
+    transformer_levels); concurrent outages are counted per outage_id, so rows sharing an
+    outage_id count once.
+    """
+
+    def __init__(self, df):
+        transformers = transformer_levels(df)
+        outages = merge_overlaps(df, ['suburb', 'outage_id'])
+
+        self.suburbs = sorted(df['suburb'].unique())
+        self.customers = IntervalIndex(transformers['start_ns'], transformers['end_ns'],
+                                       transformers['customers_on_transformer'])
+        self.outages = IntervalIndex(outages['start_ns'], outages['end_ns'])
+        self.customers_by_suburb = {
+            suburb: IntervalIndex(g['start_ns'], g['end_ns'], g['customers_on_transformer'])
+            for suburb, g in transformers.groupby('suburb', observed=True)
+        }
+        self.outages_by_suburb = {
+            suburb: IntervalIndex(g['start_ns'], g['end_ns'])
+            for suburb, g in outages.groupby('suburb', observed=True)
+        }
+        # Rows in their original order, for listing queries
+        self.rows = IntervalIndex(to_ns(df['start_time']), to_ns(df['end_time']), df['customers_on_transformer'])
+
+    def _customer_indexes(self, suburbs):
+        if suburbs is None:
+            return [self.customers]
+        return [self.customers_by_suburb[s] for s in suburbs if s in self.customers_by_suburb]
+
+    def _outage_indexes(self, suburbs):
+        if suburbs is None:
+            return [self.outages]
+        return [self.outages_by_suburb[s] for s in suburbs if s in self.outages_by_suburb]
+
+    def customers_off_at(self, t, suburbs=None):
+        """Customers off supply at time t"""
+        t = to_ns(t)
+        return sum(index.weight_at(t) for index in self._customer_indexes(suburbs))
+
+    def outages_active_at(self, t, suburbs=None):
+        """Outages in progress at time t"""
+        t = to_ns(t)
+        return sum(index.count_at(t) for index in self._outage_indexes(suburbs))
+
+    def outages_in_window(self, start, end, suburbs=None):
+        """Outages that were in progress at any point during [start, end)"""
+        a, b = to_ns(start), to_ns(end)
+        return sum(index.count_overlapping(a, b) for index in self._outage_indexes(suburbs))
+
+    def rows_active(self, start, end):
+        """Positions of the frame's rows whose outage overlaps [start, end)"""
+        return self.rows.overlapping(to_ns(start), to_ns(end))
+
+    def customers_off_supply(self, start, end, periods=500, suburbs=None):
+        """Customers-off-supply time series over [start, end), as the peak within each of `periods` buckets"""
+        edges = np.linspace(to_ns(start), to_ns(end), periods + 1).astype(np.int64)
+        peaks = np.zeros(periods)
+        for index in self._customer_indexes(suburbs):
+            times, _, levels = index.sweep()
+            peaks += bucket_max(times, levels, edges, index.weight_at(edges))
+        return pd.Series(peaks, index=pd.to_datetime(edges[:-1]), name='customers_off_supply')
+
+    def peak_concurrent(self, suburbs=None):
+        """Peak concurrent outages per suburb, when it first happened and customers off at that time"""
+        records = []
+        for suburb in (self.suburbs if suburbs is None else suburbs):
+            if suburb not in self.outages_by_suburb:
+                continue
+            peak, when, _ = self.outages_by_suburb[suburb].peak()
+            # Zero-length outages and ones without customers leave a suburb no customer intervals
+            customers = self.customers_by_suburb.get(suburb)
+            records.append({
+                'suburb': suburb,
+                'peak_concurrent_outages': peak,
+                'peak_time': pd.Timestamp(when) if when is not None else pd.NaT,
+                'customers_off_at_peak': int(customers.weight_at(when)) if customers is not None and when is not None else 0,
+            })
+        return pd.DataFrame(records, columns=['suburb', 'peak_concurrent_outages', 'peak_time', 'customers_off_at_peak'])
@@ -0,0 +1,192 @@
+# outage_reliability.py keeps customer-weighted reliability totals (SAIDI/SAIFI-style) for
+# transformer_outage_dashboard.py, per suburb or per transformer.
+# Customer-minutes lost and customer interruptions are bucketed per key x day, like the suburb
+# rollups, and a running sum along the days is kept next to the buckets, so any window (the last
+# 30, 90 or 365 days, or a regulatory year) is two lookups per key however long the history is.
+# A new or closed outage only touches its day's bucket and the running sums from that day on.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ['customer_minutes', 'customer_interruptions', 'outages']
+
+WINDOWS = (30, 90, 365)
+
+
+class ReliabilityRollup:
+    """Customer-minutes lost and customer interruptions per key x day, with running sums.
+
+    level is the column the totals are kept by: 'suburb' or 'transformer_name'. Outages are
+    bucketed by the day they started. The customers served by a transformer are the most seen on
+    it in any outage, and a suburb serves the sum over its transformers; transformers that never
+    had an outage are not in the data, so SAIDI and SAIFI here are per customer on an affected
+    transformer.
+    """
+
+    def __init__(self, level='suburb'):
+        self.level = level
+        self.keys = {}  # suburb or transformer -> row in the bucket arrays
+        self.customers = {}  # transformer -> customers served
+        self.suburb_of = {}  # transformer -> suburb
+        self.first_day = None  # numpy datetime64[D] of column 0
+        self.buckets = {measure: np.zeros((0, 0)) for measure in MEASURES}
+        # Running sums along the days, with a leading zero column: days [a, b) sum to cumulative[:, b] - cumulative[:, a]
+        self.cumulative = {measure: np.zeros((0, 1)) for measure in MEASURES}
+        self.stale_from = None  # first day whose running sums need recomputing, or None
+
+    @classmethod
+    def from_frame(cls, df, level='suburb'):
+        """Build the rollup from an outage frame, running sums included so reads never write"""
+        rollup = cls(level)
+        rollup.apply(df)
+        rollup._running_sums()
+        return rollup
+
+    def _mark_stale(self, day):
+        self.stale_from = day if self.stale_from is None else min(self.stale_from, day)
+
+    def _grow(self, keys, days):
+        """Make room for any new keys and for days outside the current range"""
+        for key in pd.unique(keys):
+            if key not in self.keys:
+                self.keys[key] = len(self.keys)
+        lo, hi = days.min(), days.max()
+        if self.first_day is None:
+            self.first_day = lo
+        n_rows, n_days = self.buckets['customer_minutes'].shape
+        pad_before = max(int((self.first_day - lo).astype(int)), 0)
+        pad_after = max(int((hi - self.first_day).astype(int)) + 1 - n_days, 0)
+        pad_rows = len(self.keys) - n_rows
+        if pad_before or pad_after or pad_rows:
+            for measure, values in self.buckets.items():
+                self.buckets[measure] = np.pad(values, ((0, pad_rows), (pad_before, pad_after)))
+            self.first_day = self.first_day - np.timedelta64(pad_before, 'D')
+            # Earlier days or new keys shift every running sum; later days only add columns
+            self._mark_stale(0 if pad_before or pad_rows else n_days)
+
+    def apply(self, df, sign=1):
+        """Add (sign=1) or remove (sign=-1) outage rows from their buckets in place"""
+        if df.empty:
+            return
+        days = df['start_time'].to_numpy(dtype='datetime64[D]')
+        self._grow(df[self.level].to_numpy(), days)
+        rows = df[self.level].map(self.keys).to_numpy()
+        cols = (days - self.first_day).astype(int)
+        customers = np.nan_to_num(df['customers_on_transformer'].to_numpy(dtype=float))
+        minutes = np.nan_to_num(df['duration_minutes'].to_numpy(dtype=float))
+        np.add.at(self.buckets['customer_minutes'], (rows, cols), sign * customers * minutes)
+        np.add.at(self.buckets['customer_interruptions'], (rows, cols), sign * customers)
+        np.add.at(self.buckets['outages'], (rows, cols), sign)
+        self._mark_stale(int(cols.min()))
+
+        if sign > 0:
+            # Customers served belong to the network, so removing an outage leaves them alone
+            served = df.groupby('transformer_name', sort=False, observed=True).agg(
+                customers=('customers_on_transformer', 'max'), suburb=('suburb', 'first'))
+            for transformer, customers, suburb in zip(served.index, served['customers'], served['suburb']):
+                if pd.notna(customers):
+                    self.customers[transformer] = max(self.customers.get(transformer, 0), int(customers))
+                self.suburb_of.setdefault(transformer, suburb)
+
+    def replace(self, old_rows, new_rows):
+        """Swap outage rows for their updated versions, e.g. when an outage closes"""
+        self.apply(old_rows, sign=-1)
+        self.apply(new_rows)
+
+    def _running_sums(self):
+        """The running sums, recomputed only from the first day that changed"""
+        if self.stale_from is not None:
+            start = self.stale_from
+            for measure, values in self.buckets.items():
+                cumulative = self.cumulative[measure]
+                if start == 0 or cumulative.shape[0] != values.shape[0]:
+                    cumulative = np.zeros((values.shape[0], values.shape[1] + 1))
+                    start = 0
+                elif cumulative.shape[1] != values.shape[1] + 1:
+                    cumulative = np.pad(cumulative, ((0, 0), (0, values.shape[1] + 1 - cumulative.shape[1])))
+                np.cumsum(values[:, start:], axis=1, out=cumulative[:, start + 1:])
+                cumulative[:, start + 1:] += cumulative[:, start:start + 1]
+                self.cumulative[measure] = cumulative
+            self.stale_from = None
+        return self.cumulative
+
+    def _position(self, date, end=False):
+        """Column of the running sums at the start of date (or its end), clipped to the bucketed days"""
+        n_days = self.buckets['customer_minutes'].shape[1]
+        position = int((np.datetime64(date, 'D') - self.first_day).astype(int)) + (1 if end else 0)
+        return min(max(position, 0), n_days)
+
+    def last_day(self):
+        """The last day with a bucket, as a date"""
+        n_days = self.buckets['customer_minutes'].shape[1]
+        return pd.Timestamp(self.first_day + np.timedelta64(n_days - 1, 'D')).date()
+
+    def customers_served(self, keys):
+        """Customers served by each key: its transformer's, or the sum over a suburb's transformers"""
+        customers = pd.Series(self.customers, dtype=float)
+        if self.level != 'transformer_name':
+            customers = customers.groupby(pd.Series(self.suburb_of)).sum()
+        return customers.reindex(keys).fillna(0).to_numpy()
+
+    def transformers_in(self, suburbs):
+        """The transformers of the suburbs, in the order first seen"""
+        suburbs = set(suburbs)
+        return [transformer for transformer, suburb in self.suburb_of.items() if suburb in suburbs]
+
+    def _names(self, keys):
+        return sorted(self.keys if keys is None else set(keys) & set(self.keys))
+
+    def _frame(self, names, sums):
+        """Totals per key, with the indices per customer served"""
+        frame = pd.DataFrame({self.level: names})
+        if self.level == 'transformer_name':
+            frame['suburb'] = [self.suburb_of.get(name) for name in names]
+        frame['customers_served'] = self.customers_served(names)
+        for measure in MEASURES:
+            frame[measure] = sums[measure]
+        frame['outages'] = frame['outages'].round().astype('int64')
+        served = frame['customers_served'].where(frame['customers_served'] > 0)
+        frame['saidi'] = frame['customer_minutes'] / served
+        frame['saifi'] = frame['customer_interruptions'] / served
+        return frame
+
+    def totals(self, start_date=None, end_date=None, keys=None):
+        """Totals and SAIDI/SAIFI per key for outages starting between start_date and end_date (inclusive)"""
+        names = self._names(keys)
+        if self.first_day is None:
+            return self._frame(names, {measure: [] for measure in MEASURES})
+        cumulative = self._running_sums()
+        rows = [self.keys[name] for name in names]
+        start = 0 if start_date is None else self._position(start_date)
+        stop = cumulative['outages'].shape[1] - 1 if end_date is None else self._position(end_date, end=True)
+        start = min(start, stop)
+        return self._frame(names, {measure: values[rows, stop] - values[rows, start]
+                                   for measure, values in cumulative.items()})
+
+    def windows(self, end_date=None, windows=WINDOWS, keys=None):
+        """totals() over the last N days up to end_date for each N in windows, with a window_days column"""
+        if end_date is None:
+            end_date = self.last_day() if self.first_day is not None else pd.Timestamp.now().date()
+        frames = [self.totals(pd.Timestamp(end_date) - pd.Timedelta(days=days - 1), end_date, keys)
+                  .assign(window_days=days) for days in windows]
+        return pd.concat(frames, ignore_index=True)
+
+    def rolling(self, days, measure='saidi', keys=None):
+        """Daily series of a measure over the trailing `days` days, one column per key"""
+        names = self._names(keys)
+        if self.first_day is None or not names:
+            return pd.DataFrame(columns=names)
+        cumulative = self._running_sums()
+        rows = [self.keys[name] for name in names]
+        n_days = cumulative['outages'].shape[1] - 1
+        stop = np.arange(1, n_days + 1)
+        start = np.maximum(stop - days, 0)
+        source = {'saidi': 'customer_minutes', 'saifi': 'customer_interruptions'}.get(measure, measure)
+        values = cumulative[source][rows][:, stop] - cumulative[source][rows][:, start]
+        if measure in ('saidi', 'saifi'):
+            served = self.customers_served(names)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = values / np.where(served > 0, served, np.nan)[:, None]
+        index = pd.DatetimeIndex(self.first_day + np.arange(n_days).astype('timedelta64[D]'), name='day')
+        return pd.DataFrame(values.T, index=index, columns=names)
@@ -0,0 +1,74 @@
+# outage_reports.py writes the dashboard's charts as static reports, one per suburb, without Streamlit.
+#
+#   python vector_data_engineer_interview/outage_reports.py --output reports/outages --formats html,png
+#
+# The source is the dashboard's (OUTAGE_DATA / OUTAGE_LIMITS, or the sample). It is loaded and
+# rolled up once, and the reports are rendered across a process pool by shared/reports.py with
+# the dashboard's own figure builders: an overview of all suburbs, then one report per suburb.
+# Kane Williams  17-Dec-2024.
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'shared'))
+
+import outage_data  # noqa: E402
+import reports  # noqa: E402
+from outage_rollups import SuburbDayRollup  # noqa: E402
+from transformer_outage_dashboard import create_customers_pie, create_gantt_chart, create_limits_chart  # noqa: E402
+
+ALL_SUBURBS = None
+
+
+def load(outages_path=None, limits_path=None):
+    """(outages with open ones ending now, suburb-day rollup), as the dashboard loads them"""
+    df = outage_data.combine(*outage_data.read_source(outages_path, limits_path))
+    rollup = SuburbDayRollup.from_frame(df)
+    return df.assign(end_time=df['end_time'].fillna(pd.Timestamp.now())), rollup
+
+
+def render(data, suburb):
+    """(file name, title, figures) of the overview (suburb None) or of one suburb"""
+    df, rollup = data
+    if suburb is ALL_SUBURBS:
+        totals = rollup.totals()
+        figures = [
+            ("Total Outage Duration vs Limits by Suburb", create_limits_chart(totals)),
+            ("Customers Affected by Suburb",
+             create_customers_pie(totals.set_index('suburb')['customers_on_transformer'])),
+            ("Outage Timeline by Transformer", create_gantt_chart(df)),
+        ]
+        return 'all-suburbs', "Outages in all suburbs", figures
+
+    in_suburb = df[df['suburb'] == suburb]
+    figures = [
+        ("Total Outage Duration vs Limit", create_limits_chart(rollup.totals(suburbs=[suburb]))),
+        ("Outage Timeline by Transformer", create_gantt_chart(in_suburb)),
+    ]
+    return f"suburb-{reports.slug(suburb)}", f"Outages in {suburb}", figures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write static outage reports for every suburb")
+    parser.add_argument('--output', required=True, help="directory for the reports")
+    parser.add_argument('--formats', default='html', help="comma-separated: html, png")
+    parser.add_argument('--workers', type=int, help="processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    try:
+        formats = reports.check_formats([f.strip() for f in args.formats.split(',')])
+    except ValueError as e:
+        parser.error(str(e))
+
+    data = load(*outage_data.source_paths())
+    suburbs = sorted(data[0]['suburb'].dropna().unique())
+    written = reports.export(render, [ALL_SUBURBS] + suburbs, data, args.output, formats, args.workers)
+    print(f"Wrote {len(written)} reports to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
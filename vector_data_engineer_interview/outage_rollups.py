@@ -0,0 +1,93 @@
+# outage_rollups.py keeps per suburb x day totals for transformer_outage_dashboard.py.
+# Duration-vs-limit checks for any date range are answered by summing day buckets,
+# and new or closed outages only touch the buckets they fall in.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ['duration_minutes', 'customers_on_transformer', 'outages']
+
+
+class SuburbDayRollup:
+    """Materialised suburb x day sums of outage minutes, customers and outage rows.
+
+    Outages are bucketed by the day they started, matching the dashboard's date filter.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(limits or {})
+        self.suburbs = {}  # suburb -> row in the bucket arrays
+        self.first_day = None  # numpy datetime64[D] of column 0
+        self.buckets = {measure: np.zeros((0, 0)) for measure in MEASURES}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the rollup from a merged outage frame (one with a duration_limit column)"""
+        limits = df.groupby('suburb', observed=True)['duration_limit'].first().dropna()
+        rollup = cls(limits.to_dict())
+        rollup.apply(df)
+        return rollup
+
+    def _grow(self, suburbs, days):
+        """Make room for any new suburbs and for days outside the current range"""
+        for suburb in pd.unique(suburbs):
+            if suburb not in self.suburbs:
+                self.suburbs[suburb] = len(self.suburbs)
+        lo, hi = days.min(), days.max()
+        if self.first_day is None:
+            self.first_day = lo
+        n_days = self.buckets['duration_minutes'].shape[1]
+        pad_before = max(int((self.first_day - lo).astype(int)), 0)
+        pad_after = max(int((hi - self.first_day).astype(int)) + 1 - n_days, 0)
+        pad_rows = len(self.suburbs) - self.buckets['duration_minutes'].shape[0]
+        if pad_before or pad_after or pad_rows:
+            for measure, values in self.buckets.items():
+                self.buckets[measure] = np.pad(values, ((0, pad_rows), (pad_before, pad_after)))
+            self.first_day = self.first_day - np.timedelta64(pad_before, 'D')
+
+    def apply(self, df, sign=1):
+        """Add (sign=1) or remove (sign=-1) outage rows from their buckets in place"""
+        if df.empty:
+            return
+        days = df['start_time'].to_numpy(dtype='datetime64[D]')
+        self._grow(df['suburb'].to_numpy(), days)
+        rows = df['suburb'].map(self.suburbs).to_numpy()
+        cols = (days - self.first_day).astype(int)
+        # A blank duration (common on open outages) counts as 0, as groupby().sum() and SQL SUM skip it;
+        # a NaN would stick in its bucket for good, since removing it cannot subtract it back out
+        minutes = np.nan_to_num(df['duration_minutes'].to_numpy(dtype=float))
+        customers = np.nan_to_num(df['customers_on_transformer'].to_numpy(dtype=float))
+        np.add.at(self.buckets['duration_minutes'], (rows, cols), sign * minutes)
+        np.add.at(self.buckets['customers_on_transformer'], (rows, cols), sign * customers)
+        np.add.at(self.buckets['outages'], (rows, cols), sign)
+
+    def replace(self, old_rows, new_rows):
+        """Swap outage rows for their updated versions, e.g. when an outage closes"""
+        self.apply(old_rows, sign=-1)
+        self.apply(new_rows)
+
+    def _day_slice(self, start_date, end_date):
+        start = 0 if start_date is None else int((np.datetime64(start_date, 'D') - self.first_day).astype(int))
+        stop = None if end_date is None else int((np.datetime64(end_date, 'D') - self.first_day).astype(int)) + 1
+        return slice(max(start, 0), None if stop is None else max(stop, 0))
+
+    def totals(self, start_date=None, end_date=None, suburbs=None):
+        """Per-suburb sums for outages starting between start_date and end_date (inclusive).
+
+        Suburbs with no outages in the range are left out, as a groupby over the rows would.
+        """
+        columns = ['suburb'] + MEASURES + ['duration_limit', 'limit_exceeded']
+        if self.first_day is None:
+            return pd.DataFrame(columns=columns)
+        names = sorted(self.suburbs if suburbs is None else set(suburbs) & set(self.suburbs))
+        rows = [self.suburbs[name] for name in names]
+        days = self._day_slice(start_date, end_date)
+        totals = pd.DataFrame({'suburb': names})
+        for measure, values in self.buckets.items():
+            totals[measure] = values[rows, days].sum(axis=1)
+        totals = totals[totals['outages'] > 0].reset_index(drop=True)
+        totals[['customers_on_transformer', 'outages']] = totals[['customers_on_transformer', 'outages']].astype('int64')
+        totals['duration_limit'] = totals['suburb'].map(self.limits)
+        totals['limit_exceeded'] = totals['duration_minutes'] > totals['duration_limit']
+        return totals[columns]
@@ -0,0 +1,244 @@
+# outage_sql.py is the embedded SQL backend for transformer_outage_dashboard.py.
+# The outage source is imported in chunks into an indexed SQLite database, and the dashboard's
+# filters, group-bys, paging and timeline level-of-detail run as queries against it, so only
+# result sets come back into pandas and the outage table never has to fit in memory.
+# Kane Williams  17-Dec-2024.
+
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+import outage_data
+
+SQL_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # ISO text sorts and compares in time order
+IMPORT_CHUNK_ROWS = 200_000
+
+SCHEMA = """
+CREATE TABLE outages (
+    outage_id INTEGER,
+    suburb TEXT,
+    transformer_name TEXT,
+    customers_on_transformer INTEGER,
+    start_time TEXT,
+    end_time TEXT,
+    status TEXT,
+    duration_minutes REAL
+);
+CREATE TABLE suburb_limits (suburb TEXT PRIMARY KEY, duration_limit REAL);
+CREATE TABLE source_meta (source_key TEXT);
+"""
+
+INDEXES = """
+CREATE INDEX idx_outages_suburb_start ON outages (suburb, start_time);
+CREATE INDEX idx_outages_start ON outages (start_time);
+CREATE INDEX idx_outages_transformer ON outages (transformer_name, start_time);
+"""
+
+# Columns the detailed table can be ordered by, as SQL expressions
+SORT_EXPRESSIONS = {
+    'Duration Limit Exceeded': 'o.duration_minutes > l.duration_limit',
+    'duration_limit': 'l.duration_limit',
+}
+
+
+def database_path(outages_path):
+    """Where the pushdown database for a source lives: beside the source file, or in the temp dir"""
+    if outages_path is None:
+        return Path(tempfile.gettempdir()) / 'outage_sample.sqlite'
+    outages_path = Path(outages_path)
+    return outages_path.with_name(f".{outages_path.name}.pushdown.sqlite")
+
+
+def iter_chunks(outages_path, limits_path):
+    """Yield (outages chunk, limits or None) without holding the whole source in memory"""
+    if outages_path is None:
+        df_outages, df_limits = outage_data.sample_frames()
+        yield df_outages, df_limits
+        return
+    path = Path(outages_path)
+    suffix = path.suffix.lower()
+    if suffix in outage_data.SQLITE_SUFFIXES:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            yield None, pd.read_sql_query("SELECT * FROM suburb_limits", conn)
+            for chunk in pd.read_sql_query("SELECT * FROM outages", conn, chunksize=IMPORT_CHUNK_ROWS):
+                yield chunk, None
+        return
+    yield None, outage_data.read_table(limits_path)
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=IMPORT_CHUNK_ROWS):
+            yield batch.to_pandas(), None
+    else:
+        yield from ((chunk, None) for chunk in pd.read_csv(path, chunksize=IMPORT_CHUNK_ROWS))
+
+
+class OutageSqlStore:
+    """Indexed SQLite copy of an outage source that answers the dashboard's queries"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @classmethod
+    def open(cls, outages_path, limits_path, source_key):
+        """Open the pushdown database for a source, (re)importing it if the source has changed"""
+        path = database_path(outages_path)
+        key = repr(source_key)
+        if path.exists():
+            try:
+                with closing(sqlite3.connect(path)) as conn:
+                    if conn.execute("SELECT source_key FROM source_meta").fetchone() == (key,):
+                        return cls(path)
+            except sqlite3.DatabaseError:
+                pass
+            path.unlink()
+        cls.build(path, outages_path, limits_path, key)
+        return cls(path)
+
+    @staticmethod
+    def build(path, outages_path, limits_path, key):
+        """Import the source chunk by chunk, then index it"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.unlink(missing_ok=True)
+        # closing() closes the connection; the inner `with conn` commits the import
+        with closing(sqlite3.connect(tmp_path)) as conn, conn:
+            conn.executescript(SCHEMA)
+            for df_outages, df_limits in iter_chunks(outages_path, limits_path):
+                if df_limits is not None:
+                    df_limits[outage_data.LIMIT_COLUMNS].to_sql('suburb_limits', conn, if_exists='append', index=False)
+                if df_outages is not None:
+                    chunk = df_outages[outage_data.OUTAGE_COLUMNS].copy()
+                    for column in ('start_time', 'end_time'):
+                        chunk[column] = outage_data.parse_times(chunk[column]).dt.strftime(SQL_TIME_FORMAT)
+                    chunk.to_sql('outages', conn, if_exists='append', index=False)
+            conn.executescript(INDEXES)
+            conn.execute("INSERT INTO source_meta VALUES (?)", (key,))
+            conn.execute("ANALYZE")
+        tmp_path.replace(path)
+
+    def query(self, sql, params=()):
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    @staticmethod
+    def where(start_date=None, end_date=None, suburbs=None):
+        """WHERE clause and parameters for the dashboard filters; dates are inclusive days"""
+        clauses, params = [], []
+        if suburbs is not None:
+            suburbs = list(suburbs)
+            if not suburbs:
+                return "WHERE 0", []
+            clauses.append(f"o.suburb IN ({', '.join('?' * len(suburbs))})")
+            params.extend(suburbs)
+        if start_date is not None:
+            clauses.append("o.start_time >= ?")
+            params.append(pd.Timestamp(start_date).strftime(SQL_TIME_FORMAT))
+        if end_date is not None:
+            clauses.append("o.start_time < ?")
+            params.append((pd.Timestamp(end_date) + pd.Timedelta(days=1)).strftime(SQL_TIME_FORMAT))
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def parse(df):
+        for column in ('start_time', 'end_time'):
+            if column in df:
+                df[column] = pd.to_datetime(df[column], format=SQL_TIME_FORMAT)
+        return df
+
+    def summary(self):
+        """(distinct outages, open outage rows, customers affected) over the whole table"""
+        row = self.query("""
+            SELECT COUNT(DISTINCT outage_id) AS outages,
+                   COALESCE(SUM(status = 'Open'), 0) AS open_outages,
+                   COALESCE(SUM(customers_on_transformer), 0) AS customers
+            FROM outages
+        """).iloc[0]
+        return int(row['outages']), int(row['open_outages']), int(row['customers'])
+
+    def suburbs(self):
+        return self.query("SELECT DISTINCT suburb FROM outages ORDER BY suburb")['suburb'].tolist()
+
+    def date_bounds(self):
+        row = self.query("SELECT MIN(start_time) AS lo, MAX(start_time) AS hi FROM outages").iloc[0]
+        return pd.Timestamp(row['lo']).date(), pd.Timestamp(row['hi']).date()
+
+    def suburb_totals(self, start_date=None, end_date=None, suburbs=None):
+        """Same shape as SuburbDayRollup.totals, computed by a GROUP BY in the database"""
+        where, params = self.where(start_date, end_date, suburbs)
+        totals = self.query(f"""
+            SELECT o.suburb,
+                   SUM(o.duration_minutes) AS duration_minutes,
+                   SUM(o.customers_on_transformer) AS customers_on_transformer,
+                   COUNT(*) AS outages,
+                   l.duration_limit
+            FROM outages o LEFT JOIN suburb_limits l ON l.suburb = o.suburb
+            {where}
+            GROUP BY o.suburb
+            ORDER BY o.suburb
+        """, params)
+        totals['limit_exceeded'] = totals['duration_minutes'] > totals['duration_limit']
+        return totals
+
+    def count(self, start_date=None, end_date=None, suburbs=None):
+        where, params = self.where(start_date, end_date, suburbs)
+        return int(self.query(f"SELECT COUNT(*) AS n FROM outages o {where}", params)['n'].iloc[0])
+
+    def page(self, start_date=None, end_date=None, suburbs=None, sort_column='start_time',
+             descending=False, limit=50, offset=0):
+        """One sorted page of outage rows joined to their limits"""
+        where, params = self.where(start_date, end_date, suburbs)
+        order = SORT_EXPRESSIONS.get(sort_column, f"o.{sort_column}")
+        direction = 'DESC' if descending else 'ASC'
+        return self.parse(self.query(f"""
+            SELECT o.*, l.duration_limit
+            FROM outages o LEFT JOIN suburb_limits l ON l.suburb = o.suburb
+            {where}
+            ORDER BY {order} {direction}
+            LIMIT ? OFFSET ?
+        """, params + [int(limit), int(offset)]))
+
+    def overlapping(self, window_start, window_end, suburbs=None, limit=-1):
+        """Outage rows whose [start_time, end_time) overlaps the window; open outages have no end_time"""
+        where, params = self.where(suburbs=suburbs)
+        overlap = "o.start_time < ? AND (o.end_time IS NULL OR o.end_time > ?)"
+        where = f"{where} AND {overlap}" if where else f"WHERE {overlap}"
+        params = params + [pd.Timestamp(window_end).strftime(SQL_TIME_FORMAT),
+                           pd.Timestamp(window_start).strftime(SQL_TIME_FORMAT)]
+        return self.parse(self.query(f"SELECT o.* FROM outages o {where} LIMIT ?", params + [int(limit)]))
+
+    def timeline(self, start_date=None, end_date=None, suburbs=None, max_bars=10_000, now=None):
+        """Rows for the Gantt chart, merged per transformer and time bucket in SQL above max_bars.
+
+        Returns (frame, downsampled); a downsampled frame has the columns of downsample_outages.
+        """
+        where, params = self.where(start_date, end_date, suburbs)
+        now = pd.Timestamp(now or pd.Timestamp.now()).strftime(SQL_TIME_FORMAT)
+        if self.count(start_date, end_date, suburbs) <= max_bars:
+            rows = self.parse(self.query(f"SELECT o.* FROM outages o {where}", params))
+            rows['end_time'] = rows['end_time'].fillna(pd.Timestamp(now))
+            return rows, False
+
+        bounds = self.query(f"""
+            SELECT MIN(julianday(o.start_time)) AS lo, MAX(julianday(o.start_time)) AS hi,
+                   COUNT(DISTINCT o.transformer_name) AS transformers
+            FROM outages o {where}
+        """, params).iloc[0]
+        buckets_per_transformer = max(1, max_bars // max(int(bounds['transformers']), 1))
+        bucket_days = max((bounds['hi'] - bounds['lo']) / buckets_per_transformer, 1 / (24 * 60))
+        bars = self.query(f"""
+            SELECT o.transformer_name, o.suburb,
+                   CAST((julianday(o.start_time) - ?) / ? AS INTEGER) AS bucket,
+                   MIN(o.start_time) AS start_time,
+                   MAX(COALESCE(o.end_time, ?)) AS end_time,
+                   SUM(o.duration_minutes) AS duration_minutes,
+                   MAX(o.customers_on_transformer) AS customers_on_transformer,
+                   COUNT(*) AS outages,
+                   MAX(o.status = 'Open') AS is_open
+            FROM outages o {where}
+            GROUP BY o.transformer_name, o.suburb, bucket
+        """, [bounds['lo'], bucket_days, now] + params)
+        bars = self.parse(bars)
+        bars['status'] = bars['is_open'].map({1: 'Open', 0: 'Closed'})
+        return bars, True
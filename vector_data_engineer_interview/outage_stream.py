@@ -0,0 +1,222 @@
+# outage_stream.py is the live-feed mode for transformer_outage_dashboard.py.
+# It tails an append-only JSONL file of outage events and applies each event to the in-memory
+# outage rows, suburb rollups and reliability rollups, so history is never re-read to pick up a change.
+# Kane Williams  17-Dec-2024.
+#
+# One event per line, timestamps in ISO 8601, keyed on (outage_id, transformer_name):
+#   {"event": "open", "outage_id": 13350, "transformer_name": "KCN ME01", "suburb": "Ponsonby",
+#    "customers_on_transformer": 1200, "start_time": "2024-09-01T10:00:00"}
+#   {"event": "update", "outage_id": 13350, "transformer_name": "KCN ME01", "customers_on_transformer": 900}
+#   {"event": "close", "outage_id": 13350, "transformer_name": "KCN ME01", "end_time": "2024-09-01T11:30:00"}
+
+import functools
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from outage_data import OUTAGE_COLUMNS
+
+KEY = ['outage_id', 'transformer_name']
+
+
+class JsonlTail:
+    """Reads the lines appended to a JSONL file since the last call"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.offset = 0
+
+    def read(self):
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            # The file was truncated or rotated, so start again from the top
+            self.offset = 0
+        if size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        # Leave a half-written last line for the next read
+        complete = data[:data.rfind(b'\n') + 1]
+        self.offset += len(complete)
+        return [json.loads(line) for line in complete.splitlines() if line.strip()]
+
+
+class LockedRollup:
+    """Read access to a rollup that a feed updates: every method call holds the feed's lock.
+
+    The feed's rollups are shared by every session and change under the lock when any session
+    polls, so a read must not run while buckets are being grown or swapped.
+    """
+
+    def __init__(self, rollup, lock):
+        self._rollup = rollup
+        self._lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self._rollup, name)
+
+        @functools.wraps(method)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return method(*args, **kwargs)
+        return locked
+
+
+def minutes_between(start, end):
+    return (end - start).total_seconds() / 60
+
+
+class LiveOutageFeed:
+    """In-memory outage state kept current from an event source.
+
+    Rows that can still change (open outages and anything touched by an event) live in a small
+    dict; everything else stays in the immutable history frame it was loaded with. The rollup, and
+    any reliability rollups ({level: ReliabilityRollup}), are updated by swapping only the changed
+    rows in and out of their buckets.
+    """
+
+    def __init__(self, df, rollup, source, reliability=None):
+        self.source = source
+        self.rollup = rollup
+        self.reliability = dict(reliability or {})
+        self.limits = dict(rollup.limits)
+        self.lock = threading.Lock()
+        self.version = 0  # bumped whenever an event changes the rows
+        self.history_version = 0  # bumped whenever a row leaves the history frame for self.live
+
+        is_open = df['status'] == 'Open'
+        self.history = df[~is_open].set_index(KEY, drop=False)
+        self.superseded = set()  # history keys that now live in self.live
+        self.live = {tuple(row[k] for k in KEY): row for row in df[is_open].to_dict('records')}
+        self._frame = None
+        self._n_history = 0  # rows of self._frame that come from history; the live rows follow
+
+    def readers(self):
+        """(suburb rollup, {level: reliability rollup}) to read from, each call holding the lock"""
+        return (LockedRollup(self.rollup, self.lock),
+                {level: LockedRollup(rollup, self.lock) for level, rollup in self.reliability.items()})
+
+    def _replace(self, old_rows, new_rows):
+        for rollup in [self.rollup, *self.reliability.values()]:
+            rollup.replace(old_rows, new_rows)
+
+    def _current(self, key):
+        """The live row for a key, pulling it out of history the first time it changes"""
+        if key in self.live:
+            return self.live[key]
+        if key not in self.superseded and key in self.history.index:
+            self.superseded.add(key)
+            self.history_version += 1
+            row = self.history.loc[[key]].iloc[-1].to_dict()
+            self.live[key] = row
+            return row
+        return None
+
+    def _apply_event(self, event, now):
+        """Returns (old row or None, new row) for the rollup, or None if the event changes nothing"""
+        key = (event['outage_id'], event['transformer_name'])
+        old = self._current(key)
+        row = dict(old) if old is not None else {column: None for column in OUTAGE_COLUMNS}
+        row.update({k: v for k, v in event.items() if k != 'event'})
+        for column in ('start_time', 'end_time'):
+            if row.get(column) is not None and not isinstance(row[column], pd.Timestamp):
+                row[column] = pd.Timestamp(row[column])
+        if pd.isna(row.get('end_time')):
+            row['end_time'] = pd.NaT
+        if row.get('start_time') is None or row.get('suburb') is None:
+            # An update or close for an outage we never saw open
+            return None
+
+        kind = event.get('event', 'update')
+        if kind == 'close':
+            if pd.isna(row['end_time']):
+                row['end_time'] = now
+            row['status'] = 'Closed'
+        elif kind == 'open' and old is None:
+            row['status'] = 'Open'
+        if row['status'] == 'Closed':
+            row['duration_minutes'] = minutes_between(row['start_time'], row['end_time'])
+        else:
+            row['duration_minutes'] = max(minutes_between(row['start_time'], now), 0)
+        row['duration_limit'] = self.limits.get(row['suburb'])
+
+        self.live[key] = row
+        return old, row
+
+    def poll(self, now=None):
+        """Apply any new events; returns how many were applied"""
+        now = now or pd.Timestamp.now()
+        with self.lock:
+            events = self.source.read()
+            if not events:
+                return 0
+            old_rows, new_rows = [], []
+            for event in events:
+                change = self._apply_event(event, now)
+                if change is None:
+                    continue
+                old, new = change
+                if old is not None:
+                    old_rows.append(old)
+                new_rows.append(dict(new))
+            if new_rows:
+                self._replace(pd.DataFrame(old_rows, columns=list(new_rows[0])), pd.DataFrame(new_rows))
+            self.version += 1
+            self._frame = None
+            return len(events)
+
+    def refresh_open_durations(self, now=None):
+        """Bring the durations of open outages up to now; only open rows and their buckets are touched"""
+        now = now or pd.Timestamp.now()
+        with self.lock:
+            open_keys = [key for key, row in self.live.items() if row['status'] == 'Open']
+            if not open_keys:
+                return
+            old_rows = [dict(self.live[key]) for key in open_keys]
+            for key in open_keys:
+                row = self.live[key]
+                row['duration_minutes'] = max(minutes_between(row['start_time'], now), 0)
+            self._replace(pd.DataFrame(old_rows), pd.DataFrame([self.live[key] for key in open_keys]))
+            if self._frame is not None:
+                # Only durations changed, so the cached frame keeps its rows and version: its live rows
+                # get their new durations in a copy, leaving any frame already handed out untouched
+                live_position = {key: i for i, key in enumerate(self.live)}
+                positions = self._n_history + np.array([live_position[key] for key in open_keys])
+                durations = self._frame['duration_minutes'].to_numpy(dtype=float, copy=True)
+                durations[positions] = [self.live[key]['duration_minutes'] for key in open_keys]
+                self._frame = self._frame.assign(duration_minutes=durations)
+
+    def open_outages(self, now=None):
+        """The open outages, with durations as of now"""
+        now = now or pd.Timestamp.now()
+        with self.lock:
+            rows = [dict(row) for row in self.live.values() if row['status'] == 'Open']
+        open_df = pd.DataFrame(rows, columns=OUTAGE_COLUMNS + ['duration_limit'])
+        if not open_df.empty:
+            open_df['duration_minutes'] = ((now - open_df['start_time']).dt.total_seconds() / 60).clip(lower=0)
+        return open_df
+
+    def frame(self):
+        """(history version, history rows, full outage frame), taken together under the lock.
+
+        The frame is the history rows still current followed by the live rows, and is rebuilt only
+        when an event changed its rows. Its first `history rows` rows change only with the history
+        version, so caches over them can be keyed on it.
+        """
+        with self.lock:
+            if self._frame is None:
+                history = self.history
+                if self.superseded:
+                    history = history[~history.index.isin(list(self.superseded))]
+                live = pd.DataFrame(list(self.live.values()), columns=self.history.columns)
+                self._frame = pd.concat([history.reset_index(drop=True), live], ignore_index=True)
+                self._n_history = len(history)
+            return self.history_version, self._n_history, self._frame
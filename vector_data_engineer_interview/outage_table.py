@@ -0,0 +1,69 @@
+# outage_table.py pages the "Detailed Outage Data" table for transformer_outage_dashboard.py.
+# Sort orders are precomputed once over the whole frame; a filtered, sorted page is then a
+# mask lookup and a slice, and only the rows on that page are formatted for display.
+# Kane Williams  17-Dec-2024.
+
+import numpy as np
+import pandas as pd
+
+DISPLAY_COLUMNS = ['outage_id', 'suburb', 'transformer_name', 'customers_on_transformer',
+                   'start_time', 'duration_minutes', 'duration_limit', 'Duration Limit Exceeded', 'status']
+SORT_COLUMNS = ['start_time', 'duration_minutes', 'customers_on_transformer', 'outage_id',
+                'suburb', 'transformer_name', 'duration_limit', 'Duration Limit Exceeded', 'status']
+
+
+def exceeded_flag(df):
+    """'YES'/'No' per row for duration_minutes over duration_limit, without a row-wise apply"""
+    exceeded = (df['duration_minutes'] > df['duration_limit']).to_numpy()
+    return pd.Series(np.where(exceeded, 'YES', 'No'), index=df.index)
+
+
+def build_sort_index(df):
+    """Row positions of df in ascending order of each sortable column"""
+    flagged = df.assign(**{'Duration Limit Exceeded': exceeded_flag(df)})
+    return {column: np.argsort(flagged[column].to_numpy(), kind='stable') for column in SORT_COLUMNS}
+
+
+class LiveSortIndex:
+    """Sort orders of a frame whose first n_history rows are static, from their precomputed
+    build_sort_index, with the live rows after them sorted at each lookup and merged in"""
+
+    def __init__(self, history_index, df, n_history):
+        self.history_index = history_index
+        self.df = df
+        self.n_history = n_history
+
+    def __getitem__(self, column):
+        values = (exceeded_flag(self.df) if column == 'Duration Limit Exceeded' else self.df[column]).to_numpy()
+        history_order = self.history_index[column]
+        live_values = values[self.n_history:]
+        live_order = np.argsort(live_values, kind='stable')
+        # The same order as one stable argsort: a live row goes after history rows with its value
+        at = np.searchsorted(values[:self.n_history][history_order], live_values[live_order], side='right')
+        return np.insert(history_order, at, live_order + self.n_history)
+
+
+def sorted_positions(sort_index, n_rows, positions, column, descending=False):
+    """The given row positions in sort order, by filtering the precomputed order (no sort)"""
+    keep = np.zeros(n_rows, dtype=bool)
+    keep[positions] = True
+    order = sort_index[column]
+    order = order[keep[order]]
+    return order[::-1] if descending else order
+
+
+def format_page(page_df):
+    """Display strings for one page of rows"""
+    page = page_df.assign(**{'Duration Limit Exceeded': exceeded_flag(page_df)})[DISPLAY_COLUMNS]
+    return page.assign(
+        customers_on_transformer=page['customers_on_transformer'].map('{:,}'.format),
+        duration_minutes=page['duration_minutes'].map('{:,.0f}'.format),
+        duration_limit=page['duration_limit'].map('{:,.0f}'.format),
+        start_time=page['start_time'].dt.strftime('%Y-%m-%d %H:%M'),
+    )
+
+
+def page_of(df, positions, page, page_size):
+    """Rows of df at positions[page * page_size:(page + 1) * page_size], formatted"""
+    visible = positions[page * page_size:(page + 1) * page_size]
+    return format_page(df.iloc[visible])
@@ -2,94 +2,255 @@
 # It is a streamlit app to build a simple dashboard.
 # Kane Williams  17-Dec-2024.
 
+import os
+import sys
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 from datetime import datetime, timedelta
 
+import outage_data
+from outage_intervals import OutageIndex
+from outage_reliability import WINDOWS, ReliabilityRollup
+from outage_rollups import SuburbDayRollup
+from outage_stream import JsonlTail, LiveOutageFeed
+import outage_table
+from outage_sql import OutageSqlStore
+
+# Shared with the Amazon products dashboard
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'shared'))
+import instrumentation  # noqa: E402
+
 # Set page config
 st.set_page_config(page_title="Outage Dashboard", layout="wide")
 
+@st.cache_resource(show_spinner="Loading outage data...", max_entries=4)
+def load_source(outages_path, limits_path, source_key):
+    """Parse and merge a source once per process; source_key changes only when the files do"""
+    with instrumentation.stage("read and merge source") as stage:
+        df_combined = outage_data.combine(*outage_data.read_source(outages_path, limits_path))
+        stage['rows'] = len(df_combined)
+    return df_combined
+
+def current_source():
+    # OUTAGE_DATA points at a CSV/Parquet outages file (with OUTAGE_LIMITS) or a SQLite file;
+    # unset, the dashboard shows the sample data. OUTAGE_DATA_HASH=1 keys the cache on file contents.
+    outages_path, limits_path = outage_data.source_paths()
+    use_hash = os.environ.get('OUTAGE_DATA_HASH', '') == '1'
+    source_key = outage_data.fingerprint((outages_path, limits_path), use_hash=use_hash)
+    return outages_path, limits_path, source_key
+
+@instrumentation.timed()
 def load_data():
-    # Outage data
-    df_q3 = {
-        'outage_id': [12345, 12346, 12347, 12347, 12347, 13349],
-        'suburb': ['Ponsonby', 'Albany', 'Remuera', 'Remuera', 'Remuera', 'Ponsonby'],
-        'transformer_name': ['KCN ME01', 'KNN CEP1', 'REMU MK01', 'REMU MK09', 'REMU MU78', 'KCN ME01'],
-        'customers_on_transformer': [1200, 500, 30, 2000, 100, 13],
-        'start_time': ['25/06/2024 8:00', '25/07/2024 8:30', '27/08/2024 8:30', '27/08/2024 8:30', 
-                       '27/08/2024 8:30', '31/08/2024 20:00'],
-        'end_time': ['25/06/2024 9:00', '25/07/2024 10:30', '27/08/2024 10:30', '27/08/2024 9:00',
-                     '27/08/2024 8:50', None],
-        'status': ['Closed', 'Closed', 'Closed', 'Closed', 'Closed', 'Open'],
-        'duration_minutes': [60, 120, 120, 30, 20, 300]
-    }
-    
-    # Suburb limits data
-    df_q4 = {
-        'suburb': ['Ponsonby', 'Albany', 'Remuera'],
-        'duration_limit': [500, 100, 150]
-    }
-    
-    # Convert to DataFrames
-    df_outages = pd.DataFrame(df_q3)
-    df_limits = pd.DataFrame(df_q4)
-    
-    # Convert datetime strings to datetime objects
-    df_outages['start_time'] = pd.to_datetime(df_outages['start_time'], format='%d/%m/%Y %H:%M')
-    df_outages['end_time'] = pd.to_datetime(df_outages['end_time'], format='%d/%m/%Y %H:%M')
+    # The cached frame is shared across sessions, so open outages are filled on a new frame
+    df_combined = load_source(*current_source())
     
     # Handle None in end_time by using current time
-    df_outages['end_time'] = df_outages['end_time'].fillna(pd.Timestamp.now())
-    
-    # Join the dataframes
-    df_combined = pd.merge(df_outages, df_limits, on='suburb', how='left')
-    
-    return df_combined
+    return df_combined.assign(end_time=df_combined['end_time'].fillna(pd.Timestamp.now()))
 
-def create_gantt_chart(df):
-    """Create a horizontal timeline showing outages by transformer, colored by suburb"""
-    fig = go.Figure()
+@st.cache_resource(show_spinner="Indexing outages...", max_entries=4)
+def load_interval_index(outages_path, limits_path, source_key):
+    """Interval index over the cached frame; open outages stay open rather than ending at now"""
+    return OutageIndex(load_source(outages_path, limits_path, source_key))
+
+@st.cache_resource(show_spinner="Building suburb rollups...", max_entries=4)
+def load_rollup(outages_path, limits_path, source_key):
+    """Suburb x day totals over the cached frame, shared across sessions"""
+    return SuburbDayRollup.from_frame(load_source(outages_path, limits_path, source_key))
+
+# Reliability indices are kept per suburb and per transformer
+RELIABILITY_LEVELS = {'Suburb': 'suburb', 'Transformer': 'transformer_name'}
+# Transformers drawn in the rolling reliability chart, worst first
+RELIABILITY_CHART_MAX_LINES = 10
+
+def reliability_rollups(df):
+    return {level: ReliabilityRollup.from_frame(df, level) for level in RELIABILITY_LEVELS.values()}
+
+@st.cache_resource(show_spinner="Building reliability rollups...", max_entries=4)
+def load_reliability(outages_path, limits_path, source_key):
+    """Customer-weighted day totals and running sums per suburb and transformer, shared across sessions"""
+    return reliability_rollups(load_source(outages_path, limits_path, source_key))
+
+@st.cache_resource(max_entries=4)
+def load_sort_index(outages_path, limits_path, source_key):
+    """Sort orders for the detailed table over the cached frame"""
+    return outage_table.build_sort_index(load_source(outages_path, limits_path, source_key))
+
+@st.cache_resource(max_entries=2)
+def load_history_sort_index(events_path, source_key, history_version, _history):
+    """Sort orders for the live feed's history rows, rebuilt only when rows leave the history"""
+    return outage_table.build_sort_index(_history)
+
+# OUTAGE_BACKEND=sqlite pushes filters, group-bys and paging down to an indexed SQLite copy of the source
+@st.cache_resource(show_spinner="Preparing SQL backend...", max_entries=4)
+def load_sql_store(outages_path, limits_path, source_key):
+    return OutageSqlStore.open(outages_path, limits_path, source_key)
+
+# In SQL mode the off-supply view indexes at most this many outages from the selected window
+SQL_OFF_SUPPLY_MAX_ROWS = 100_000
+
+# OUTAGE_EVENTS points at an append-only JSONL file of outage events (see outage_stream.py)
+LIVE_REFRESH_SECONDS = float(os.environ.get('OUTAGE_REFRESH_SECONDS', 5))
+
+@st.cache_resource(show_spinner="Starting live outage feed...", max_entries=4)
+def load_live_feed(events_path, outages_path, limits_path, source_key):
+    """One live feed per process, seeded from the cached history and its own rollups"""
+    df = load_source(outages_path, limits_path, source_key)
+    return LiveOutageFeed(df, SuburbDayRollup.from_frame(df), JsonlTail(events_path), reliability_rollups(df))
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_open_outages(feed):
+    """Reruns on its own timer: applies new events and ages open outages without a full page rerun"""
+    feed.poll()
+    feed.refresh_open_durations()
+    open_df = feed.open_outages()
     
+    st.subheader("Open Outages (live)")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Open Outages", len(open_df))
+    with col2:
+        st.metric("Customers Off Supply Now", f"{int(open_df['customers_on_transformer'].sum()):,}")
+    if not open_df.empty:
+        st.dataframe(open_df[['outage_id', 'suburb', 'transformer_name', 'customers_on_transformer',
+                              'start_time', 'duration_minutes', 'duration_limit']], hide_index=True)
+    st.caption(f"Updated {pd.Timestamp.now():%H:%M:%S}")
+
+# Above this many bars the timeline is drawn with WebGL line segments instead of SVG bars
+GANTT_WEBGL_THRESHOLD = 2_000
+# Above this many bars, outages are merged per transformer and time bucket (level of detail)
+GANTT_MAX_BARS = 10_000
+
+MIN_VISIBLE_MS = 24 * 60 * 60 * 1000  # 24 hours in milliseconds
+
+def suburb_color_map(suburbs):
+    """Fixed colours for the known suburbs, cycling the plotly palette for any others"""
     colors = {
         'Ponsonby': '#1f77b4',
         'Albany': '#2ca02c',
         'Remuera': '#ff7f0e'
     }
+    palette = px.colors.qualitative.Plotly
+    others = [s for s in sorted(suburbs) if s not in colors]
+    colors.update({suburb: palette[i % len(palette)] for i, suburb in enumerate(others)})
+    return colors
+
+def downsample_outages(df, max_bars):
+    """Merge outages on the same transformer within one time bucket into a single bar"""
+    t0 = df['start_time'].min()
+    span = df['start_time'].max() - t0
+    buckets_per_transformer = max(1, max_bars // max(df['transformer_name'].nunique(), 1))
+    bucket_width = max(span / buckets_per_transformer, pd.Timedelta(minutes=1))
+    
+    merged = df.assign(
+        bucket=(df['start_time'] - t0) // bucket_width,
+        is_open=df['status'] == 'Open'
+    ).groupby(['transformer_name', 'suburb', 'bucket'], sort=False, observed=True).agg(
+        start_time=('start_time', 'min'),
+        end_time=('end_time', 'max'),
+        duration_minutes=('duration_minutes', 'sum'),
+        customers_on_transformer=('customers_on_transformer', 'max'),
+        outages=('start_time', 'size'),
+        is_open=('is_open', 'any')
+    ).reset_index()
+    merged['status'] = merged['is_open'].map({True: 'Open', False: 'Closed'})
+    return merged
+
+def gantt_bars(df, max_bars=GANTT_MAX_BARS, downsampled=False):
+    """Column arrays for the timeline, downsampled when there are more rows than max_bars.
+    
+    downsampled=True means df is already merged into buckets (e.g. by the SQL backend).
+    """
+    if downsampled or len(df) > max_bars:
+        merged = df if downsampled else downsample_outages(df, max_bars)
+        # A merged bar covers its whole bucket rather than the summed durations
+        visible_ms = (merged['end_time'] - merged['start_time']).dt.total_seconds() * 1000
+        return merged.assign(visible_ms=visible_ms.clip(lower=MIN_VISIBLE_MS)), True
+    
+    # Convert to milliseconds, ensure minimum visibility of 24 hours
+    bars = df.assign(
+        visible_ms=(df['duration_minutes'] * 60 * 1000).clip(lower=MIN_VISIBLE_MS),
+        outages=1
+    )
+    return bars, False
+
+@instrumentation.timed()
+def create_gantt_chart(df, visible_range=None, render_mode='auto', max_bars=GANTT_MAX_BARS, downsampled=False):
+    """Create a horizontal timeline showing outages by transformer, colored by suburb.
+    
+    One trace is built per suburb from column arrays. render_mode is 'bar', 'webgl' or 'auto'
+    (WebGL above GANTT_WEBGL_THRESHOLD bars); visible_range=(start, end) clips the timeline
+    before deciding how far to downsample.
+    """
+    fig = go.Figure()
+    
+    if visible_range is not None:
+        window_start, window_end = pd.Timestamp(visible_range[0]), pd.Timestamp(visible_range[1])
+        df = df[(df['start_time'] <= window_end) & (df['end_time'] >= window_start)]
+    
+    bars, downsampled = gantt_bars(df, max_bars, downsampled)
+    if render_mode == 'auto':
+        render_mode = 'webgl' if len(bars) > GANTT_WEBGL_THRESHOLD else 'bar'
+    
+    colors = suburb_color_map(bars['suburb'].unique())
+    hover_lines = (
+        "Transformer: %{y}<br>" +
+        "Suburb: %{customdata[0]}<br>" +
+        ("Start: %{base|%Y-%m-%d %H:%M}<br>" if render_mode == 'bar' else "Time: %{x|%Y-%m-%d %H:%M}<br>") +
+        "Duration: %{customdata[1]:,.0f} mins<br>" +
+        "Customers: %{customdata[2]:,}<br>" +
+        "Status: %{customdata[3]}<br>" +
+        ("Outages: %{customdata[4]:,}<br>" if downsampled else "") +
+        "<extra></extra>"
+    )
+    hover_columns = ['suburb', 'duration_minutes', 'customers_on_transformer', 'status', 'outages']
+    
+    for suburb, group in bars.groupby('suburb', sort=True, observed=True):
+        customdata = group[hover_columns].to_numpy()
+        # Epoch milliseconds travel as typed arrays, where timestamps would be serialised as strings
+        start_ms = group['start_time'].to_numpy(dtype='datetime64[ms]').astype('int64').astype(float)
+        if render_mode == 'bar':
+            fig.add_trace(go.Bar(
+                base=start_ms,
+                x=group['visible_ms'].to_numpy(dtype=float),  # Use duration in milliseconds
+                y=group['transformer_name'],
+                orientation='h',
+                marker_color=colors[suburb],
+                name=suburb,
+                customdata=customdata,
+                hovertemplate=hover_lines,
+                showlegend=True
+            ))
+        else:
+            # Each outage is a thick line segment: start, end, gap
+            n = len(group)
+            x = np.full(3 * n, np.nan)
+            x[0::3] = start_ms
+            x[1::3] = start_ms + group['visible_ms'].to_numpy(dtype=float)
+            y = np.empty(3 * n, dtype=object)
+            y[0::3] = y[1::3] = group['transformer_name'].to_numpy()
+            y[2::3] = None
+            fig.add_trace(go.Scattergl(
+                x=x,
+                y=y,
+                mode='lines',
+                line=dict(color=colors[suburb], width=10),
+                name=suburb,
+                customdata=np.repeat(customdata, 3, axis=0),
+                hovertemplate=hover_lines,
+                connectgaps=False,
+                showlegend=True
+            ))
     
-    # Function to calculate end time based on duration_minutes
-    def get_visible_duration(duration_minutes):
-        # Convert to milliseconds, ensure minimum visibility of 24 hours
-        duration_ms = duration_minutes * 60 * 1000  # Convert minutes to milliseconds
-        min_duration_ms = 24 * 60 * 60 * 1000  # 24 hours in milliseconds
-        return max(duration_ms, min_duration_ms)
-    
-    for idx, row in df.iterrows():
-        duration_ms = get_visible_duration(row['duration_minutes'])
-        
-        fig.add_trace(go.Bar(
-            base=row['start_time'],
-            x=[duration_ms],  # Use duration in milliseconds
-            y=[row['transformer_name']],
-            orientation='h',
-            marker_color=colors[row['suburb']],
-            name=row['suburb'],
-            text=f"{row['suburb']}",
-            hovertemplate=(
-                f"Transformer: {row['transformer_name']}<br>" +
-                f"Suburb: {row['suburb']}<br>" +
-                f"Start: {row['start_time'].strftime('%Y-%m-%d %H:%M')}<br>" +
-                f"Duration: {row['duration_minutes']} mins<br>" +
-                f"Customers: {row['customers_on_transformer']:,}<br>" +
-                f"Status: {row['status']}<br>" +
-                "<extra></extra>"
-            ),
-            showlegend=True
-        ))
-    
-    min_time = df['start_time'].min() - pd.Timedelta(days=1)
-    max_time = df['start_time'].max() + pd.Timedelta(days=30)  # Extended to show full duration bars
+    if visible_range is not None:
+        min_time, max_time = window_start, window_end
+    else:
+        min_time = df['start_time'].min() - pd.Timedelta(days=1)
+        max_time = df['start_time'].max() + pd.Timedelta(days=30)  # Extended to show full duration bars
     
     fig.update_layout(
         title="Outage Timeline by Transformer",
@@ -103,7 +264,7 @@ def create_gantt_chart(df):
         yaxis=dict(
             title="Transformer",
             categoryorder='array',
-            categoryarray=sorted(df['transformer_name'].unique())
+            categoryarray=sorted(bars['transformer_name'].unique())
         ),
         showlegend=True,
         legend_title="Suburbs",
@@ -113,109 +274,108 @@ def create_gantt_chart(df):
     
     return fig
 
-def main():
-    st.title("Electricity Outage Dashboard")
+def create_limits_chart(suburb_durations):
+    """Total outage minutes per suburb next to its duration limit"""
+    fig_limits = go.Figure()
     
-    df = load_data()
+    fig_limits.add_trace(go.Bar(
+        name='Total Outage Time',
+        x=suburb_durations['suburb'],
+        y=suburb_durations['duration_minutes'],
+        marker_color=['red' if d > l else 'green' for d, l in 
+                     zip(suburb_durations['duration_minutes'], suburb_durations['duration_limit'])],
+    ))
     
-    # Calculate suburb-level durations and compare with limits
-    suburb_durations = df.groupby('suburb').agg({
-        'duration_minutes': 'sum',
-        'duration_limit': 'first'
-    }).reset_index()
-    suburb_durations['limit_exceeded'] = suburb_durations['duration_minutes'] > suburb_durations['duration_limit']
+    fig_limits.add_trace(go.Bar(
+        name='Duration Limit',
+        x=suburb_durations['suburb'],
+        y=suburb_durations['duration_limit'],
+        marker_color='black',
+    ))
+    
+    fig_limits.update_layout(
+        barmode='group',
+        yaxis_title="Minutes",
+        height=400
+    )
+    return fig_limits
+
+def create_customers_pie(customers_by_suburb):
+    """Share of affected customers by suburb"""
+    colors = {
+        'Ponsonby': '#1f77b4',    # medium blue
+        'Albany': '#7aa6c2',      # light blue
+        'Remuera': '#084081'      # dark blue
+    }
+    
+    # Suburbs beyond the original three fall back to the plotly blues
+    blues = px.colors.sequential.Blues[2:]
+    color_list = [colors.get(suburb, blues[i % len(blues)]) for i, suburb in enumerate(customers_by_suburb.index)]
     
+    fig_pie = px.pie(
+        values=customers_by_suburb.values, 
+        names=customers_by_suburb.index,
+        color_discrete_sequence=color_list
+    )
+    fig_pie.update_layout(height=400)
+    return fig_pie
+
+def create_reliability_chart(rolling, window_days, measure='SAIDI'):
+    """Trailing-window reliability index per suburb or transformer (one column each) over time"""
+    fig_reliability = px.line(
+        rolling,
+        labels={'day': 'Day', 'value': f"{measure}, last {window_days} days", 'variable': ''}
+    )
+    fig_reliability.update_layout(height=350)
+    return fig_reliability
+
+def show_metrics(total_outages, open_outages, total_customers):
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Outages", len(df['outage_id'].unique()))
+        st.metric("Total Outages", total_outages)
     with col2:
-        st.metric("Open Outages", len(df[df['status'] == 'Open']))
+        st.metric("Open Outages", open_outages)
     with col3:
-        total_customers = df['customers_on_transformer'].sum()
         st.metric("Total Customers Affected", f"{total_customers:,}")
-    
-    # Sidebar filters
+
+def sidebar_filters(all_suburbs, min_date, max_date):
+    """Draw the sidebar filters; returns (show_exceeded_only, selected_suburb, date_range)"""
     st.sidebar.header("Filters")
     
     show_exceeded_only = st.sidebar.checkbox("Show Only Suburbs Exceeding Duration Limits")
-    suburbs = ['All'] + sorted(df['suburb'].unique().tolist())
+    suburbs = ['All'] + sorted(all_suburbs)
     selected_suburb = st.sidebar.selectbox("Select Suburb", suburbs)
     
-    min_date = df['start_time'].min().date()
-    max_date = df['start_time'].max().date()
     date_range = st.sidebar.date_input(
         "Select Date Range",
         value=(min_date, max_date),
         min_value=min_date,
         max_value=max_date
     )
-    
-    # Filter data based on selections
-    filtered_df = df.copy()
+    return show_exceeded_only, selected_suburb, date_range
+
+def selected_suburb_list(all_suburbs, suburb_durations, show_exceeded_only, selected_suburb):
+    """The suburbs left in view by the exceeded-only checkbox and the suburb selectbox"""
+    selected_suburbs = sorted(all_suburbs)
     if show_exceeded_only:
         exceeded_suburbs = suburb_durations[suburb_durations['limit_exceeded']]['suburb'].tolist()
-        filtered_df = filtered_df[filtered_df['suburb'].isin(exceeded_suburbs)]
+        selected_suburbs = [s for s in selected_suburbs if s in exceeded_suburbs]
     if selected_suburb != 'All':
-        filtered_df = filtered_df[filtered_df['suburb'] == selected_suburb]
-    if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df['start_time'].dt.date >= date_range[0]) &
-            (filtered_df['start_time'].dt.date <= date_range[1])
-        ]
-    
+        selected_suburbs = [s for s in selected_suburbs if s == selected_suburb]
+    return selected_suburbs
+
+def show_suburb_panels(suburb_durations):
+    """Limits chart, customers pie and the exceeded-limits warning for the filtered totals"""
     col_left, col_right = st.columns(2)
     
     with col_left:
         st.subheader("Total Outage Duration vs Limits by Suburb")
-        suburb_durations = filtered_df.groupby('suburb').agg({
-            'duration_minutes': 'sum',
-            'duration_limit': 'first'
-        }).reset_index()
-        
-        fig_limits = go.Figure()
-        
-        fig_limits.add_trace(go.Bar(
-            name='Total Outage Time',
-            x=suburb_durations['suburb'],
-            y=suburb_durations['duration_minutes'],
-            marker_color=['red' if d > l else 'green' for d, l in 
-                         zip(suburb_durations['duration_minutes'], suburb_durations['duration_limit'])],
-        ))
-        
-        fig_limits.add_trace(go.Bar(
-            name='Duration Limit',
-            x=suburb_durations['suburb'],
-            y=suburb_durations['duration_limit'],
-            marker_color='black',
-        ))
-        
-        fig_limits.update_layout(
-            barmode='group',
-            yaxis_title="Minutes",
-            height=400
-        )
-        
-        st.plotly_chart(fig_limits, use_container_width=True)
+        st.plotly_chart(create_limits_chart(suburb_durations), use_container_width=True)
 
     with col_right:
         st.subheader("Customers Affected by Suburb")
-        customers_by_suburb = filtered_df.groupby('suburb')['customers_on_transformer'].sum()
-        
-        colors = {
-            'Ponsonby': '#1f77b4',    # medium blue
-            'Albany': '#7aa6c2',      # light blue
-            'Remuera': '#084081'      # dark blue
-        }
-        
-        color_list = [colors[suburb] for suburb in customers_by_suburb.index]
-        
-        fig_pie = px.pie(
-            values=customers_by_suburb.values, 
-            names=customers_by_suburb.index,
-            color_discrete_sequence=color_list
-        )
-        fig_pie.update_layout(height=400)
-        st.plotly_chart(fig_pie, use_container_width=True)
+        customers_by_suburb = suburb_durations.set_index('suburb')['customers_on_transformer']
+        st.plotly_chart(create_customers_pie(customers_by_suburb), use_container_width=True)
     
     # Warning message for exceeded limits
     exceeded_suburbs = suburb_durations[
@@ -224,27 +384,228 @@ def main():
     
     if exceeded_suburbs:
         st.warning(f"Duration limits exceeded in: {', '.join(exceeded_suburbs)}")
+
+def date_window(date_range, min_date, max_date):
+    """The selected dates as a [start, end) timestamp window, ending no later than now"""
+    if len(date_range) == 2:
+        window_start = pd.Timestamp(date_range[0])
+        window_end = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+    else:
+        window_start, window_end = pd.Timestamp(min_date), pd.Timestamp(max_date) + pd.Timedelta(days=1)
+    return window_start, min(window_end, pd.Timestamp.now())
+
+def show_off_supply(interval_index, suburbs_in_view, window_start, window_end):
+    """Customers off supply over time, from an interval index rather than the filtered rows"""
+    st.subheader("Customers Off Supply")
+    col_series, col_peaks = st.columns([2, 1])
+    with col_series:
+        if suburbs_in_view and window_end > window_start:
+            off_supply = interval_index.customers_off_supply(window_start, window_end, suburbs=suburbs_in_view)
+            fig_off_supply = px.line(
+                x=off_supply.index,
+                y=off_supply.values,
+                line_shape='hv',
+                labels={'x': 'Time', 'y': 'Customers off supply'}
+            )
+            fig_off_supply.update_layout(height=300)
+            st.plotly_chart(fig_off_supply, use_container_width=True)
+    with col_peaks:
+        st.write("Peak concurrent outages")
+        st.dataframe(interval_index.peak_concurrent(suburbs_in_view), hide_index=True)
+
+def show_reliability(reliability, suburbs_in_view, end_date):
+    """SAIDI/SAIFI-style indices over the last 30/90/365 days to end_date, from running sums"""
+    st.subheader("Reliability")
+    col_level, col_window = st.columns(2)
+    with col_level:
+        level = RELIABILITY_LEVELS[st.radio("Reliability by", list(RELIABILITY_LEVELS), horizontal=True)]
+    with col_window:
+        window_days = st.selectbox("Rolling window (days)", WINDOWS, index=len(WINDOWS) - 1)
+    
+    rollup = reliability[level]
+    if level == 'suburb':
+        keys = suburbs_in_view
+    else:
+        keys = rollup.transformers_in(suburbs_in_view)
+    windows = rollup.windows(end_date, keys=keys)
+    if windows.empty:
+        return
+    
+    table = windows.pivot(index=level, columns='window_days', values=['saidi', 'saifi', 'customer_minutes'])
+    table.columns = [f"{measure.upper() if measure != 'customer_minutes' else 'Customer-minutes'} {days}d"
+                     for measure, days in table.columns]
+    in_window = windows[windows['window_days'] == window_days].sort_values('saidi', ascending=False)
+    st.dataframe(table.loc[in_window[level]], column_config={
+        column: st.column_config.NumberColumn(format="%.2f") for column in table.columns
+    })
+    
+    chart_keys = in_window[level].tolist()[:RELIABILITY_CHART_MAX_LINES]
+    rolling = rollup.rolling(window_days, 'saidi', keys=chart_keys)
+    st.plotly_chart(create_reliability_chart(rolling.loc[:pd.Timestamp(end_date)], window_days),
+                    use_container_width=True)
+    st.caption("SAIDI: customer-minutes lost per customer served. SAIFI: interruptions per customer served. "
+               "Customers served counts the customers on transformers that appear in the outage data.")
+
+def table_controls(n_rows):
+    """Sort and paging widgets for the detailed table; returns (sort_column, descending, page, page_size)"""
+    col_sort, col_order, col_size, col_page = st.columns([2, 1, 1, 1])
+    with col_sort:
+        sort_column = st.selectbox("Sort by", outage_table.SORT_COLUMNS)
+    with col_order:
+        descending = st.checkbox("Descending", value=True)
+    with col_size:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 500], index=1)
+    n_pages = max((n_rows - 1) // page_size + 1, 1)
+    with col_page:
+        page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1) - 1
+    return sort_column, descending, page, page_size
+
+def show_page(page_df, page, page_size, n_rows):
+    st.dataframe(page_df, hide_index=True)
+    st.caption(f"Showing rows {page * page_size + 1:,}-{min((page + 1) * page_size, n_rows):,} of {n_rows:,}")
+
+def main():
+    # Stages of this rerun, for the performance panel and the logs
+    with instrumentation.run('outages', trace_memory=instrumentation.panel_requested()):
+        show_dashboard()
+
+def show_dashboard():
+    st.title("Electricity Outage Dashboard")
+    
+    if os.environ.get('OUTAGE_BACKEND') == 'sqlite':
+        with instrumentation.stage("open SQL backend"):
+            store = load_sql_store(*current_source())
+        main_sql(store)
+        return
+    
+    events_path = os.environ.get('OUTAGE_EVENTS')
+    feed = load_live_feed(events_path, *current_source()) if events_path else None
+    if feed is not None:
+        feed.poll()
+        # The history version is the frame's own, so a later poll cannot key its sort index
+        history_version, n_history, df_live = feed.frame()
+        df = df_live.assign(end_time=df_live['end_time'].fillna(pd.Timestamp.now()))
+        # Shared with every session's poll, so read under the feed's lock
+        rollup, reliability = feed.readers()
+    else:
+        df = load_data()
+        with instrumentation.stage("suburb rollup", len(df)):
+            rollup = load_rollup(*current_source())
+        with instrumentation.stage("reliability rollups", len(df)):
+            reliability = load_reliability(*current_source())
+    
+    # Calculate suburb-level durations and compare with limits
+    suburb_durations = rollup.totals()
+    
+    show_metrics(
+        len(df['outage_id'].unique()),
+        len(df[df['status'] == 'Open']),
+        df['customers_on_transformer'].sum()
+    )
+    
+    if feed is not None:
+        live_open_outages(feed)
+    
+    # Sidebar filters
+    all_suburbs = df['suburb'].unique().tolist()
+    min_date = df['start_time'].min().date()
+    max_date = df['start_time'].max().date()
+    show_exceeded_only, selected_suburb, date_range = sidebar_filters(all_suburbs, min_date, max_date)
+    selected_suburbs = selected_suburb_list(all_suburbs, suburb_durations, show_exceeded_only, selected_suburb)
+    
+    # Filter data based on selections
+    with instrumentation.stage("filter", len(df)):
+        filtered_df = df[df['suburb'].isin(selected_suburbs)]
+        if len(date_range) == 2:
+            filtered_df = filtered_df[
+                (filtered_df['start_time'].dt.date >= date_range[0]) &
+                (filtered_df['start_time'].dt.date <= date_range[1])
+            ]
+    
+    # Summed from the day buckets rather than by rescanning filtered_df
+    with instrumentation.stage("suburb panels", len(filtered_df)):
+        if len(date_range) == 2:
+            suburb_durations = rollup.totals(date_range[0], date_range[1], suburbs=selected_suburbs)
+        else:
+            suburb_durations = rollup.totals(suburbs=selected_suburbs)
+        show_suburb_panels(suburb_durations)
+    
+    # Windows ending at the last selected day, answered from the running sums
+    with instrumentation.stage("reliability"):
+        show_reliability(reliability, selected_suburbs, date_range[1] if len(date_range) == 2 else max_date)
     
     # Timeline visualization
     st.subheader("Outage Timeline by Transformer")
-    st.plotly_chart(create_gantt_chart(filtered_df), use_container_width=True)
+    with instrumentation.stage("timeline", len(filtered_df)):
+        st.plotly_chart(create_gantt_chart(filtered_df), use_container_width=True)
+    
+    with instrumentation.stage("off supply", len(filtered_df)):
+        show_off_supply(
+            load_interval_index(*current_source()),
+            sorted(filtered_df['suburb'].unique()),
+            *date_window(date_range, min_date, max_date)
+        )
     
     # Detailed data view
     st.subheader("Detailed Outage Data")
-    display_df = filtered_df.copy()
-    display_df['Duration Limit Exceeded'] = display_df.apply(
-        lambda x: 'YES' if x['duration_minutes'] > x['duration_limit'] else 'No', 
-        axis=1
-    )
-    display_cols = ['outage_id', 'suburb', 'transformer_name', 'customers_on_transformer', 
-                    'start_time', 'duration_minutes', 'duration_limit', 'Duration Limit Exceeded', 'status']
+    if feed is not None:
+        # Only the live rows are sorted on each rerun
+        sort_index = outage_table.LiveSortIndex(
+            load_history_sort_index(events_path, current_source()[2], history_version, df.iloc[:n_history]),
+            df, n_history
+        )
+    else:
+        sort_index = load_sort_index(*current_source())
+    
+    sort_column, descending, page, page_size = table_controls(len(filtered_df))
+    
+    # Only the visible page is sliced out and formatted
+    with instrumentation.stage("detailed table page", len(filtered_df)):
+        positions = outage_table.sorted_positions(
+            sort_index, len(df), filtered_df.index.to_numpy(), sort_column, descending
+        )
+        show_page(outage_table.page_of(df, positions, page, page_size), page, page_size, len(filtered_df))
+
+def main_sql(store):
+    """The same dashboard with every filter and aggregate answered by the SQL backend"""
+    show_metrics(*store.summary())
     
-    st.dataframe(display_df[display_cols].style.format({
-        'customers_on_transformer': '{:,}'.format,
-        'duration_minutes': '{:,.0f}'.format,
-        'duration_limit': '{:,.0f}'.format,
-        'start_time': lambda x: x.strftime('%Y-%m-%d %H:%M'),
-    }))
+    all_suburbs = store.suburbs()
+    min_date, max_date = store.date_bounds()
+    suburb_durations = store.suburb_totals()
+    show_exceeded_only, selected_suburb, date_range = sidebar_filters(all_suburbs, min_date, max_date)
+    selected_suburbs = selected_suburb_list(all_suburbs, suburb_durations, show_exceeded_only, selected_suburb)
+    start_date, end_date = date_range if len(date_range) == 2 else (None, None)
+    
+    with instrumentation.stage("suburb panels"):
+        suburb_durations = store.suburb_totals(start_date, end_date, selected_suburbs)
+        show_suburb_panels(suburb_durations)
+    
+    # Timeline visualization, merged per transformer and bucket in SQL when there are too many rows
+    st.subheader("Outage Timeline by Transformer")
+    with instrumentation.stage("timeline") as stage:
+        bars, downsampled = store.timeline(start_date, end_date, selected_suburbs, max_bars=GANTT_MAX_BARS)
+        stage['rows'] = len(bars)
+        if not bars.empty:
+            st.plotly_chart(create_gantt_chart(bars, downsampled=downsampled), use_container_width=True)
+    
+    # Only the outages overlapping the window are fetched and indexed
+    window_start, window_end = date_window(date_range, min_date, max_date)
+    in_window = store.overlapping(window_start, window_end, selected_suburbs, limit=SQL_OFF_SUPPLY_MAX_ROWS + 1)
+    if len(in_window) > SQL_OFF_SUPPLY_MAX_ROWS:
+        st.subheader("Customers Off Supply")
+        st.info(f"More than {SQL_OFF_SUPPLY_MAX_ROWS:,} outages in this window; narrow the date range to see customers off supply.")
+    elif not in_window.empty:
+        show_off_supply(OutageIndex(in_window), sorted(in_window['suburb'].unique()), window_start, window_end)
+    
+    # Detailed data view
+    st.subheader("Detailed Outage Data")
+    n_rows = store.count(start_date, end_date, selected_suburbs)
+    sort_column, descending, page, page_size = table_controls(n_rows)
+    with instrumentation.stage("detailed table page", n_rows):
+        page_df = store.page(start_date, end_date, selected_suburbs, sort_column, descending,
+                             limit=page_size, offset=page * page_size)
+        show_page(outage_table.format_page(page_df), page, page_size, n_rows)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()